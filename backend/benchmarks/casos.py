@@ -0,0 +1,142 @@
+"""Casos de benchmark de las funciones puras que corren en cada turno.
+
+Cada caso es una función sin argumentos que ejecuta una vez la operación a
+medir sobre datos realistas: respuestas de María en español y audio MP3 del
+tamaño que produce el TTS (de 100 KB a 2 MB).
+"""
+
+from typing import Callable, Dict, List
+from config import settings
+from services.search_service import parsear_propuesta
+from services.tts_service import TTSService
+import base64
+import json
+import random
+import time
+
+# Respuestas típicas de la entrevistadora (lo que se divide y sintetiza)
+RESPUESTA_CORTA = (
+    "Gracias por compartirlo. ¿Podrías contarme un proyecto en el que hayas "
+    "trabajado con SQL y qué resultado obtuvo el equipo?"
+)
+
+RESPUESTA_LARGA = (
+    "Muy interesante lo que me comentas sobre la automatización de reportes. "
+    "En el BCP trabajamos con volúmenes grandes de información transaccional, "
+    "así que valoramos mucho a quien sabe optimizar consultas. Sí. "
+    "Además, el equipo de analítica colabora a diario con las áreas comerciales "
+    "y de riesgos, por lo que la comunicación es clave. Bien. "
+    "Cuéntame, ¿cómo explicarías un hallazgo técnico, por ejemplo una caída en "
+    "la conversión de un producto, a un gerente que no maneja estadística? "
+    "¿Qué gráficos usarías y qué recomendación le darías?"
+)
+
+# Respuesta del modelo en la extracción de propuestas, en sus dos variantes
+PROPUESTA_TEXTO = json.dumps(
+    {
+        "empresa": "Banco de Crédito del Perú",
+        "puesto": "Analista de Datos Junior",
+        "descripcion": (
+            "Responsable de construir reportes de gestión, automatizar procesos "
+            "de extracción de datos y apoyar al área comercial con análisis "
+            "ad hoc sobre el comportamiento de clientes."
+        ),
+        "requisitos": (
+            "Bachiller en Ingeniería, Estadística o afines; SQL intermedio; "
+            "Python o R; Power BI; inglés intermedio; deseable experiencia en banca"
+        ),
+    },
+    ensure_ascii=False,
+)
+
+PROPUESTA_REQUISITOS_DICT = json.dumps(
+    {
+        "empresa": "Banco de Crédito del Perú",
+        "puesto": "Analista de Datos Junior",
+        "descripcion": "Construcción de reportes de gestión y análisis ad hoc.",
+        "requisitos": {
+            "formación": "Bachiller en Ingeniería, Estadística o afines",
+            "técnicos": "SQL intermedio, Python o R, Power BI",
+            "idiomas": "Inglés intermedio",
+            "experiencia": "Deseable un año en banca o retail",
+        },
+    },
+    ensure_ascii=False,
+)
+
+# Frame MP3 (MPEG-1 Layer III, 128 kbps, 44.1 kHz): 4 bytes de cabecera y 413 de datos
+_CABECERA_MP3 = b"\xff\xfb\x90\x64"
+_TAMANO_FRAME_MP3 = 417
+
+# Del audio de una respuesta corta al de la presentación completa
+TAMANOS_AUDIO = {"100k": 100 * 1024, "500k": 500 * 1024, "2m": 2 * 1024 * 1024}
+
+
+def audio_mp3(tamano: int, semilla: int = 0) -> bytes:
+    """MP3 con frames válidos y datos pseudoaleatorios (no comprimibles)"""
+    rng = random.Random(semilla)
+    frames = max(1, tamano // _TAMANO_FRAME_MP3)
+    return b"".join(
+        _CABECERA_MP3 + rng.randbytes(_TAMANO_FRAME_MP3 - 4) for _ in range(frames)
+    )
+
+
+def fragmentos_mp3(total: int, tamano_fragmento: int = 40 * 1024) -> List[bytes]:
+    """Audio de una respuesta dividido en fragmentos, como llega del TTS paralelo"""
+    cantidad = max(1, total // tamano_fragmento)
+    return [audio_mp3(tamano_fragmento, semilla=i) for i in range(cantidad)]
+
+
+def _tts_service() -> TTSService:
+    # Solo se usan métodos puros: no hace falta clave ni cliente de OpenAI
+    tts = object.__new__(TTSService)
+    tts.min_words = settings.min_words_per_chunk
+    return tts
+
+
+def cargar_casos() -> Dict[str, Callable[[], object]]:
+    """Arma los datos una sola vez y devuelve {nombre: operación}"""
+    tts = _tts_service()
+    casos: Dict[str, Callable[[], object]] = {
+        "split_text.corta": lambda: tts._split_text_into_chunks(RESPUESTA_CORTA),
+        "split_text.larga": lambda: tts._split_text_into_chunks(RESPUESTA_LARGA),
+        "chat_delta.json_dumps": lambda: json.dumps(
+            {"type": "chat_delta", "data": " conversión", "timestamp": time.time()}
+        ),
+        "extraccion.requisitos_texto": lambda: parsear_propuesta(PROPUESTA_TEXTO),
+        "extraccion.requisitos_dict": lambda: parsear_propuesta(
+            PROPUESTA_REQUISITOS_DICT
+        ),
+    }
+
+    for etiqueta, tamano in TAMANOS_AUDIO.items():
+        audio = audio_mp3(tamano)
+        audio_base64 = base64.b64encode(audio).decode("utf-8")
+        mensaje_audio = json.dumps({"type": "audio", "data": audio_base64})
+        fragmentos = fragmentos_mp3(tamano)
+
+        casos.update(
+            {
+                # _send_tts_complete / _send_tts_progressive
+                f"combine_audio.{etiqueta}": (
+                    lambda f=fragmentos: tts._combine_audio_chunks(f)
+                ),
+                f"base64_encode.{etiqueta}": (
+                    lambda a=audio: base64.b64encode(a).decode("utf-8")
+                ),
+                f"tts_result.json_dumps.{etiqueta}": (
+                    lambda b=audio_base64: json.dumps(
+                        {"type": "tts_result", "data": b, "timestamp": time.time()}
+                    )
+                ),
+                # handle_message + _process_audio_message (subida del candidato)
+                f"audio_upload.json_loads.{etiqueta}": (
+                    lambda m=mensaje_audio: json.loads(m)
+                ),
+                f"base64_decode.{etiqueta}": (
+                    lambda b=audio_base64: base64.b64decode(b)
+                ),
+            }
+        )
+
+    return casos
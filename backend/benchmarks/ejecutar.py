@@ -0,0 +1,126 @@
+"""Ejecuta los microbenchmarks del turno y los compara con la línea base.
+
+Uso:
+    python -m benchmarks.ejecutar [--umbral 0.25] [--filtro base64] [--guardar-base]
+
+Cada caso se mide varias veces y se toma el mínimo por operación (el menos
+afectado por ruido del sistema). Si un caso queda más de `--umbral` por encima
+de benchmarks/linea_base.json, el comando termina con código 1.
+
+La línea base depende de la máquina: se graba con --guardar-base en la misma
+máquina (o runner de CI) donde luego se compara.
+"""
+
+from typing import Callable, Dict, Optional
+from benchmarks.casos import cargar_casos
+import argparse
+import json
+import os
+import platform
+import timeit
+
+LINEA_BASE = os.path.join(os.path.dirname(__file__), "linea_base.json")
+
+
+def medir(operacion: Callable[[], object], repeticiones: int) -> float:
+    """Segundos por llamada (mínimo entre repeticiones de ~0,2 s cada una)"""
+    timer = timeit.Timer(operacion)
+    numero, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeticiones, number=numero)) / numero
+
+
+def entorno() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "implementacion": platform.python_implementation(),
+        "plataforma": platform.platform(),
+        "procesador": platform.machine(),
+    }
+
+
+def leer_linea_base(ruta: str) -> Optional[Dict]:
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--umbral",
+        type=float,
+        default=0.25,
+        help="Regresión tolerada sobre la línea base (0.25 = 25%%)",
+    )
+    parser.add_argument("--repeticiones", type=int, default=7)
+    parser.add_argument("--filtro", default="", help="Solo casos que contengan esto")
+    parser.add_argument(
+        "--guardar-base",
+        action="store_true",
+        help="Grabar los resultados como nueva línea base",
+    )
+    parser.add_argument("--linea-base", default=LINEA_BASE)
+    args = parser.parse_args()
+
+    casos = {
+        nombre: operacion
+        for nombre, operacion in cargar_casos().items()
+        if args.filtro in nombre
+    }
+    base = leer_linea_base(args.linea_base)
+    resultados_base = (base or {}).get("resultados", {})
+    if base and base.get("entorno") != entorno():
+        print(
+            "Aviso: la línea base se grabó en otro entorno "
+            f"({base.get('entorno')}); la comparación es orientativa"
+        )
+
+    resultados = {}
+    regresiones = []
+    print(f"{'caso':<36}{'µs/op':>12}{'base':>12}{'cambio':>9}")
+    for nombre, operacion in casos.items():
+        segundos = medir(operacion, args.repeticiones)
+        resultados[nombre] = segundos
+
+        referencia = resultados_base.get(nombre)
+        if referencia:
+            cambio = segundos / referencia - 1
+            marca = "  REGRESIÓN" if cambio > args.umbral else ""
+            if marca:
+                regresiones.append(nombre)
+            print(
+                f"{nombre:<36}{segundos * 1e6:>12.2f}{referencia * 1e6:>12.2f}"
+                f"{cambio:>+9.1%}{marca}"
+            )
+        else:
+            print(f"{nombre:<36}{segundos * 1e6:>12.2f}{'-':>12}{'-':>9}")
+
+    if args.guardar_base:
+        # Con --filtro se actualizan solo los casos medidos
+        resultados_base.update(resultados)
+        with open(args.linea_base, "w", encoding="utf-8") as f:
+            json.dump(
+                {"entorno": entorno(), "resultados": resultados_base},
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+            f.write("\n")
+        print(f"Línea base guardada en {args.linea_base}")
+        return
+
+    if base is None:
+        print("No hay línea base: ejecutar con --guardar-base para grabarla")
+        return
+
+    if regresiones:
+        print(
+            f"{len(regresiones)} caso(s) más de {args.umbral:.0%} más lentos "
+            f"que la línea base: {', '.join(regresiones)}"
+        )
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
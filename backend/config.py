@@ -9,6 +9,14 @@ class Settings(BaseSettings):
     openai_api_key: Optional[str] = Field(default=None, alias="OPENAI_API_KEY")
     sonar_api_key: Optional[str] = Field(default=None, alias="SONAR_API_KEY")
 
+    # URLs base de los proveedores (vacías = las oficiales). Permiten apuntar a
+    # los proveedores simulados de loadtest/ para pruebas de carga sin costo
+    openai_base_url: Optional[str] = Field(default=None, alias="OPENAI_BASE_URL")
+    groq_base_url: Optional[str] = Field(default=None, alias="GROQ_BASE_URL")
+    sonar_base_url: str = Field(
+        default="https://api.perplexity.ai", alias="SONAR_BASE_URL"
+    )
+
     # Modelos
     whisper_model: str = "whisper-large-v3-turbo"
     chat_model: str = "gpt-4.1-mini"
@@ -19,6 +27,102 @@ class Settings(BaseSettings):
     max_concurrent_tts: int = Field(default=10, alias="MAX_CONCURRENT_TTS")
     min_words_per_chunk: int = Field(default=4, alias="MIN_WORDS_PER_CHUNK")
 
+    # Ventana de contexto del chat (tokens del prompt por turno)
+    chat_max_prompt_tokens: int = Field(default=3000, alias="CHAT_MAX_PROMPT_TOKENS")
+    chat_summary_max_tokens: int = Field(default=400, alias="CHAT_SUMMARY_MAX_TOKENS")
+    chat_summary_chars_per_turn: int = Field(
+        default=160, alias="CHAT_SUMMARY_CHARS_PER_TURN"
+    )
+
+    # Validación de audio antes de transcribir
+    stt_min_audio_bytes: int = Field(default=1024, alias="STT_MIN_AUDIO_BYTES")
+    stt_max_audio_bytes: int = Field(
+        default=25 * 1024 * 1024, alias="STT_MAX_AUDIO_BYTES"
+    )
+    stt_min_duration_seconds: float = Field(
+        default=0.3, alias="STT_MIN_DURATION_SECONDS"
+    )
+    stt_silence_rms: float = Field(default=60.0, alias="STT_SILENCE_RMS")
+
+    # Detección de voz (VAD) para el micrófono en streaming
+    vad_threshold_ratio: float = Field(default=3.0, alias="VAD_THRESHOLD_RATIO")
+    vad_min_rms: float = Field(default=150.0, alias="VAD_MIN_RMS")
+    vad_hangover_ms: int = Field(default=500, alias="VAD_HANGOVER_MS")
+    # Silencio tras la última frase que cierra el turno (0 = solo audio_stream_end)
+    vad_end_of_turn_ms: int = Field(default=1200, alias="VAD_END_OF_TURN_MS")
+
+    # Caché de audio TTS (memoria LRU + disco)
+    tts_cache_memory_bytes: int = Field(
+        default=64 * 1024 * 1024, alias="TTS_CACHE_MEMORY_BYTES"
+    )
+    tts_cache_dir: str = Field(default="cache/tts", alias="TTS_CACHE_DIR")
+    # Tope del nivel en disco; al superarlo se borran los audios usados hace más tiempo
+    tts_cache_disk_bytes: int = Field(
+        default=1024 * 1024 * 1024, alias="TTS_CACHE_DISK_BYTES"
+    )
+
+    # Almacén de sesiones: "memory" (un solo worker) o "redis" (varios workers)
+    session_store: str = Field(default="memory", alias="SESSION_STORE")
+    redis_url: str = Field(default="redis://localhost:6379/0", alias="REDIS_URL")
+    redis_prefix: str = Field(default="entrevistas", alias="REDIS_PREFIX")
+    session_ttl_seconds: int = Field(default=3600, alias="SESSION_TTL_SECONDS")
+    session_max_sessions: int = Field(default=10000, alias="SESSION_MAX_SESSIONS")
+    session_sweep_interval_seconds: float = Field(
+        default=60.0, alias="SESSION_SWEEP_INTERVAL_SECONDS"
+    )
+    workers: int = Field(default=1, alias="WORKERS")
+
+    # Perfiles de entrevista (un subdirectorio por perfil; ?perfil= en /ws)
+    profiles_dir: str = Field(default="perfiles", alias="PROFILES_DIR")
+    default_profile: str = Field(default="bcp_analista_datos", alias="DEFAULT_PROFILE")
+
+    # Caché de investigaciones de Sonar (empresa, mercado, entrevistador)
+    research_cache_path: str = Field(
+        default="cache/research.sqlite3", alias="RESEARCH_CACHE_PATH"
+    )
+    research_cache_ttl_seconds: float = Field(
+        default=7 * 24 * 3600, alias="RESEARCH_CACHE_TTL_SECONDS"
+    )
+    research_cache_stale_seconds: float = Field(
+        default=7 * 24 * 3600, alias="RESEARCH_CACHE_STALE_SECONDS"
+    )
+
+    # Memo persistente de la extracción de propuestas (por hash del texto)
+    extraction_cache_path: str = Field(
+        default="cache/extraction.sqlite3", alias="EXTRACTION_CACHE_PATH"
+    )
+    extraction_cache_max_entries: int = Field(
+        default=5000, alias="EXTRACTION_CACHE_MAX_ENTRIES"
+    )
+
+    # Generación de entrevistas en lote
+    batch_max_items: int = Field(default=100, alias="BATCH_MAX_ITEMS")
+    batch_concurrency: int = Field(default=4, alias="BATCH_CONCURRENCY")
+
+    # Cola persistente de trabajos de generación
+    jobs_db_path: str = Field(default="cache/jobs.sqlite3", alias="JOBS_DB_PATH")
+    job_workers: int = Field(default=2, alias="JOB_WORKERS")
+    job_poll_interval_seconds: float = Field(
+        default=1.0, alias="JOB_POLL_INTERVAL_SECONDS"
+    )
+    job_lease_seconds: float = Field(default=30.0, alias="JOB_LEASE_SECONDS")
+    job_max_attempts: int = Field(default=3, alias="JOB_MAX_ATTEMPTS")
+    job_retention_seconds: float = Field(
+        default=7 * 24 * 3600, alias="JOB_RETENTION_SECONDS"
+    )
+
+    # Nivel de logging (los mensajes se escriben desde un hilo aparte)
+    log_level: str = Field(default="INFO", alias="LOG_LEVEL")
+
+    # Pools de conexiones HTTP compartidos (clientes asíncronos)
+    http_max_connections: int = Field(default=100, alias="HTTP_MAX_CONNECTIONS")
+    http_max_keepalive_connections: int = Field(
+        default=20, alias="HTTP_MAX_KEEPALIVE_CONNECTIONS"
+    )
+    http_keepalive_expiry: float = Field(default=30.0, alias="HTTP_KEEPALIVE_EXPIRY")
+    groq_timeout: float = Field(default=60.0, alias="GROQ_TIMEOUT")
+    sonar_timeout: float = Field(default=30.0, alias="SONAR_TIMEOUT")
+
     model_config = {"env_file": ".env", "case_sensitive": False, "extra": "ignore"}
 
 
@@ -30,7 +134,50 @@ GROQ_API_KEY=tu_clave_api_groq_aqui
 OPENAI_API_KEY=tu_clave_api_openai_aqui
 SONAR_API_KEY=tu_clave_api_sonar_aqui
 
+# Proveedores simulados para pruebas de carga (python -m loadtest.proveedores_simulados)
+OPENAI_BASE_URL=http://localhost:9000/v1
+GROQ_BASE_URL=http://localhost:9000
+SONAR_BASE_URL=http://localhost:9000/sonar
+
 # Configuración opcional de procesamiento paralelo
 MAX_CONCURRENT_TTS=10
 MIN_WORDS_PER_CHUNK=4
+
+# Caché de audio TTS (TTS_CACHE_DIR vacío desactiva el nivel en disco)
+TTS_CACHE_MEMORY_BYTES=67108864
+TTS_CACHE_DIR=cache/tts
+TTS_CACHE_DISK_BYTES=1073741824
+
+# Sesiones compartidas para correr varios workers de uvicorn
+SESSION_STORE=redis
+REDIS_URL=redis://localhost:6379/0
+WORKERS=4
+
+# Perfiles de entrevista disponibles y el que se usa sin ?perfil=
+PROFILES_DIR=perfiles
+DEFAULT_PROFILE=bcp_analista_datos
+
+# Caché de investigaciones: vigencia y ventana extra de refresco en segundo plano
+RESEARCH_CACHE_PATH=cache/research.sqlite3
+RESEARCH_CACHE_TTL_SECONDS=604800
+RESEARCH_CACHE_STALE_SECONDS=604800
+EXTRACTION_CACHE_MAX_ENTRIES=5000
+
+# Lote de entrevistas: tamaño máximo y cuántas se generan a la vez
+BATCH_MAX_ITEMS=100
+BATCH_CONCURRENCY=4
+
+# Cola de trabajos: workers por proceso y reintentos si un worker se cae
+JOB_WORKERS=2
+JOB_MAX_ATTEMPTS=3
+
+# Logging y métricas (/metrics). Con WORKERS > 1, PROMETHEUS_MULTIPROC_DIR
+# debe apuntar a un directorio vacío para sumar las métricas de todos los workers
+LOG_LEVEL=INFO
+PROMETHEUS_MULTIPROC_DIR=/tmp/entrevistas-metrics
+
+# Configuración opcional de los pools HTTP
+HTTP_MAX_CONNECTIONS=100
+HTTP_MAX_KEEPALIVE_CONNECTIONS=20
+SONAR_TIMEOUT=30
 """
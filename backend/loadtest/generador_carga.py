@@ -0,0 +1,317 @@
+"""Generador de carga: reproduce entrevistas guionadas contra /ws en paralelo.
+
+Uso:
+    python -m loadtest.generador_carga --sesiones 50 [--url ws://localhost:8000/ws]
+        [--modo texto|audio] [--stream | --progresivo] [--binario]
+        [--perfil ID] [--formato opus] [--json salida.json]
+
+Cada sesión se conecta, espera la presentación de María y responde las líneas
+del guion una por una. Por turno se mide, desde que se envía la respuesta:
+
+    transcripcion       texto transcrito (solo en --modo audio)
+    primera_respuesta   primer texto de la entrevistadora (chat_delta o chat_response)
+    primer_audio        primer audio recibido (tts_chunk o tts_result)
+    turno               turno completo (audio terminado)
+
+Al final se informan percentiles por métrica y turnos completados por segundo.
+Para no gastar crédito, el backend debería apuntar a los proveedores simulados
+(ver loadtest/proveedores_simulados.py).
+"""
+
+from typing import Dict, List, Optional
+from urllib.parse import urlencode
+from websocket import protocol
+import argparse
+import asyncio
+import base64
+import json
+import math
+import os
+import random
+import struct
+import time
+import websockets
+
+GUION_PREDETERMINADO = os.path.join(os.path.dirname(__file__), "guion_entrevista.json")
+
+METRICAS = (
+    "presentacion",
+    "transcripcion",
+    "primera_respuesta",
+    "primer_audio",
+    "turno",
+)
+
+
+class Resultados:
+    """Latencias acumuladas por métrica y conteo de fallas"""
+
+    def __init__(self):
+        self.latencias: Dict[str, List[float]] = {m: [] for m in METRICAS}
+        self.turnos = 0
+        self.errores: Dict[str, int] = {}
+
+    def error(self, motivo: str):
+        self.errores[motivo] = self.errores.get(motivo, 0) + 1
+
+    def resumen(self, duracion: float) -> Dict:
+        return {
+            "duracion_s": round(duracion, 2),
+            "turnos": self.turnos,
+            "turnos_por_s": round(self.turnos / duracion, 2) if duracion else 0.0,
+            "errores": self.errores,
+            "latencias_ms": {
+                metrica: _percentiles(valores)
+                for metrica, valores in self.latencias.items()
+                if valores
+            },
+        }
+
+
+class Turno:
+    """Sigue los mensajes de un turno hasta que el audio termina"""
+
+    def __init__(self, inicio: float):
+        self.inicio = inicio
+        self.marcas: Dict[str, float] = {}
+        self.chat = False
+        self.audio = False
+        self.error: Optional[str] = None
+
+    def marcar(self, metrica: str):
+        self.marcas.setdefault(metrica, time.perf_counter() - self.inicio)
+
+    def recibir(self, mensaje) -> bool:
+        """Procesa un mensaje del servidor; devuelve True si el turno terminó"""
+        if isinstance(mensaje, bytes):
+            kind, _, _ = protocol.decode_frame(mensaje)
+            self.marcar("primer_audio")
+            # En modo progresivo binario el cierre sigue llegando como tts_end
+            self.audio = self.audio or kind == protocol.FRAME_TTS_RESULT
+            return self.chat and self.audio
+
+        datos = json.loads(mensaje)
+        tipo = datos.get("type")
+        if tipo == "stt_result":
+            self.marcar("transcripcion")
+        elif tipo in ("chat_delta", "chat_response"):
+            self.marcar("primera_respuesta")
+            self.chat = self.chat or tipo == "chat_response"
+        elif tipo in ("tts_chunk", "tts_result"):
+            self.marcar("primer_audio")
+            self.audio = self.audio or tipo == "tts_result"
+        elif tipo == "tts_end":
+            self.audio = True
+        elif tipo == "error":
+            self.error = datos.get("data") or datos.get("message") or "error"
+            return True
+        return self.chat and self.audio
+
+
+async def sesion(
+    numero: int,
+    url: str,
+    mensajes: List,
+    args: argparse.Namespace,
+    resultados: Resultados,
+):
+    subprotocols = [protocol.SUBPROTOCOL] if args.binario else None
+    try:
+        inicio = time.perf_counter()
+        async with websockets.connect(
+            url, subprotocols=subprotocols, max_size=None
+        ) as ws:
+            # La presentación de María llega sola al conectarse
+            presentacion = Turno(inicio)
+            if not await _esperar_turno(ws, presentacion, args.timeout, resultados):
+                return
+            resultados.latencias["presentacion"].append(presentacion.marcas["turno"])
+
+            for mensaje in mensajes:
+                await asyncio.sleep(args.pausa * random.uniform(0.5, 1.5))
+                turno = Turno(time.perf_counter())
+                await ws.send(mensaje)
+                if not await _esperar_turno(ws, turno, args.timeout, resultados):
+                    return
+                resultados.turnos += 1
+                for metrica, valor in turno.marcas.items():
+                    resultados.latencias[metrica].append(valor)
+    except (OSError, websockets.WebSocketException) as e:
+        resultados.error(f"conexion: {type(e).__name__}")
+        if args.verbose:
+            print(f"  sesión {numero}: {e}")
+
+
+async def _esperar_turno(ws, turno: Turno, timeout: float, resultados: Resultados):
+    async def recibir():
+        while not turno.recibir(await ws.recv()):
+            pass
+
+    try:
+        await asyncio.wait_for(recibir(), timeout)
+    except asyncio.TimeoutError:
+        resultados.error("timeout")
+        return False
+    if turno.error is not None:
+        resultados.error(turno.error)
+        return False
+    turno.marcar("turno")
+    return True
+
+
+def _mensaje(linea: str, args: argparse.Namespace):
+    if args.modo == "texto":
+        return json.dumps({"type": "text", "data": linea})
+
+    audio = _wav_hablado(linea)
+    if args.binario:
+        return protocol.encode_frame(protocol.FRAME_AUDIO_UPLOAD, 0, audio)
+    return json.dumps(
+        {"type": "audio", "data": base64.b64encode(audio).decode("ascii")}
+    )
+
+
+def _wav_hablado(linea: str, frecuencia: int = 16000) -> bytes:
+    """WAV con un tono de la duración aproximada de la línea leída en voz alta.
+
+    El tono supera la validación de silencio del backend; la transcripción la
+    inventa el proveedor simulado.
+    """
+    muestras = int(max(1.0, len(linea) * 0.07) * frecuencia)
+    pcm = b"".join(
+        struct.pack("<h", int(3000 * math.sin(2 * math.pi * 220 * i / frecuencia)))
+        for i in range(muestras)
+    )
+    return (
+        b"RIFF"
+        + struct.pack("<I", 36 + len(pcm))
+        + b"WAVEfmt "
+        + struct.pack("<IHHIIHH", 16, 1, 1, frecuencia, frecuencia * 2, 2, 16)
+        + b"data"
+        + struct.pack("<I", len(pcm))
+        + pcm
+    )
+
+
+def _percentiles(valores: List[float]) -> Dict[str, float]:
+    ordenados = sorted(valores)
+
+    def p(q: float) -> float:
+        indice = min(len(ordenados) - 1, math.ceil(q * len(ordenados)) - 1)
+        return round(ordenados[max(0, indice)] * 1000, 1)
+
+    return {
+        "n": len(ordenados),
+        "p50": p(0.50),
+        "p90": p(0.90),
+        "p95": p(0.95),
+        "p99": p(0.99),
+        "max": round(ordenados[-1] * 1000, 1),
+    }
+
+
+def _imprimir(resumen: Dict):
+    print(
+        f"\n{resumen['turnos']} turnos en {resumen['duracion_s']} s "
+        f"({resumen['turnos_por_s']} turnos/s)"
+    )
+    print(f"{'métrica':<18}{'n':>6}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for metrica, p in resumen["latencias_ms"].items():
+        print(
+            f"{metrica:<18}{p['n']:>6}{p['p50']:>9}{p['p90']:>9}"
+            f"{p['p95']:>9}{p['p99']:>9}{p['max']:>9}"
+        )
+    if resumen["errores"]:
+        print("errores:")
+        for motivo, cantidad in sorted(resumen["errores"].items()):
+            print(f"  {cantidad:>5}  {motivo}")
+
+
+async def ejecutar(args: argparse.Namespace) -> Dict:
+    with open(args.guion, "r", encoding="utf-8") as f:
+        guion = json.load(f)
+    # Los mensajes (y el audio sintético) se arman una vez, fuera de la medición
+    mensajes = [_mensaje(linea, args) for linea in guion[: args.turnos or None]]
+
+    params = {}
+    if args.stream:
+        params["stream"] = "1"
+    elif args.progresivo:
+        params["tts"] = "chunks"
+    if args.perfil:
+        params["perfil"] = args.perfil
+    if args.formato:
+        params["audio_format"] = args.formato
+    if args.sample_rate:
+        params["sample_rate"] = args.sample_rate
+    url = f"{args.url}?{urlencode(params)}" if params else args.url
+
+    resultados = Resultados()
+    inicio = time.perf_counter()
+    tareas = []
+    for numero in range(args.sesiones):
+        tareas.append(
+            asyncio.create_task(sesion(numero, url, mensajes, args, resultados))
+        )
+        # Rampa: las sesiones se reparten a lo largo de --rampa segundos
+        if args.rampa and args.sesiones > 1:
+            await asyncio.sleep(args.rampa / (args.sesiones - 1))
+    await asyncio.gather(*tareas)
+    return resultados.resumen(time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="ws://localhost:8000/ws")
+    parser.add_argument("--sesiones", type=int, default=10, help="Sesiones a la vez")
+    parser.add_argument(
+        "--turnos", type=int, default=0, help="Turnos por sesión (0 = todo el guion)"
+    )
+    parser.add_argument("--guion", default=GUION_PREDETERMINADO)
+    parser.add_argument("--modo", choices=("texto", "audio"), default="audio")
+    parser.add_argument(
+        "--stream", action="store_true", help="Chat y TTS en streaming (?stream=1)"
+    )
+    parser.add_argument(
+        "--progresivo",
+        action="store_true",
+        help="Audio por fragmentos sin streaming del chat (?tts=chunks)",
+    )
+    parser.add_argument(
+        "--binario", action="store_true", help="Audio en frames binarios"
+    )
+    parser.add_argument("--perfil", default=None)
+    parser.add_argument(
+        "--formato",
+        choices=("mp3", "opus", "pcm16", "wav"),
+        default=None,
+        help="Formato del audio TTS (?audio_format=)",
+    )
+    parser.add_argument(
+        "--sample-rate", default=None, help="Frecuencia para pcm16 y wav"
+    )
+    parser.add_argument(
+        "--pausa", type=float, default=1.0, help="Segundos que el candidato piensa"
+    )
+    parser.add_argument(
+        "--rampa",
+        type=float,
+        default=0.0,
+        help="Segundos para abrir todas las sesiones",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=60.0, help="Máximo por turno, en segundos"
+    )
+    parser.add_argument("--json", default=None, help="Guardar el resumen en un archivo")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    resumen = asyncio.run(ejecutar(args))
+    _imprimir(resumen)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resumen, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Ogg Opus sintético para el proveedor simulado y los tests de audio_format."""
+
+from typing import List, Optional
+from services.audio_format import _OGG_HEADER, _ogg_crc
+import math
+import random
+import struct
+
+PRE_SKIP = 312
+
+
+def ogg_opus(
+    muestras: int, serial: Optional[int] = None, por_pagina: int = 50
+) -> bytes:
+    """Ogg Opus con paquetes de 20 ms vacíos (el decodificador los rellena con silencio).
+
+    Como un encoder real, el último paquete se rellena hasta 20 ms y el granule
+    final lo recorta a `muestras` (más el pre-skip).
+    """
+    if serial is None:
+        serial = random.getrandbits(32)
+    cabecera = b"OpusHead" + struct.pack("<BBHIhB", 1, 1, PRE_SKIP, 24000, 0, 0)
+    paginas = [
+        pagina_ogg(0x02, 0, serial, 0, [cabecera]),
+        pagina_ogg(0x00, 0, serial, 1, [b"OpusTags" + struct.pack("<II", 0, 0)]),
+    ]
+    # TOC 0xF8: CELT de banda completa, 20 ms (960 muestras a 48 kHz), un frame
+    total = muestras + PRE_SKIP
+    paquetes = math.ceil(total / 960)
+    granule = 0
+    for inicio in range(0, paquetes, por_pagina):
+        cantidad = min(por_pagina, paquetes - inicio)
+        granule += 960 * cantidad
+        ultima = inicio + cantidad >= paquetes
+        paginas.append(
+            pagina_ogg(
+                0x04 if ultima else 0x00,
+                total if ultima else granule,
+                serial,
+                len(paginas),
+                [b"\xf8"] * cantidad,
+            )
+        )
+    return b"".join(paginas)
+
+
+def pagina_ogg(
+    flags: int, granule: int, serial: int, secuencia: int, paquetes: List[bytes]
+) -> bytes:
+    lacing = b"".join(bytes([255] * (len(p) // 255) + [len(p) % 255]) for p in paquetes)
+    pagina = bytearray(
+        _OGG_HEADER.pack(b"OggS", 0, flags, granule, serial, secuencia, 0, len(lacing))
+        + lacing
+        + b"".join(paquetes)
+    )
+    struct.pack_into("<I", pagina, 22, _ogg_crc(pagina))
+    return bytes(pagina)
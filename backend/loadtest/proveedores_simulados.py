@@ -0,0 +1,335 @@
+"""Proveedores simulados (OpenAI, Groq, Sonar) para pruebas de carga sin costo.
+
+Uso:
+    python -m loadtest.proveedores_simulados [--puerto 9000] [--latencia-chat 400-900]
+
+Un solo servidor atiende los cuatro endpoints que usa el backend:
+
+    POST /v1/chat/completions                 chat, chat en streaming y TTS (audio-preview)
+    POST /openai/v1/audio/transcriptions      transcripción de Whisper (Groq)
+    POST /sonar/chat/completions              búsquedas de Sonar (Perplexity)
+
+Para apuntar el backend a este servidor:
+
+    OPENAI_BASE_URL=http://localhost:9000/v1
+    GROQ_BASE_URL=http://localhost:9000
+    SONAR_BASE_URL=http://localhost:9000/sonar
+
+Las latencias aceptan "300" (fija, en ms), "200-600" (uniforme) o
+"lognormal:300:0.5" (mediana en ms y sigma). La tasa de error es la fracción
+de llamadas que responden con --codigo-error.
+"""
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from loadtest.ogg_sintetico import ogg_opus
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import math
+import random
+import struct
+import time
+import uuid
+import uvicorn
+
+# Respuestas de la entrevistadora; se rotan para que los turnos no sean idénticos
+RESPUESTAS_CHAT = [
+    "Gracias por compartirlo. ¿Podrías contarme un proyecto en el que hayas trabajado con SQL?",
+    "Interesante. ¿Cómo priorizas cuando tienes varios pedidos urgentes a la vez?",
+    "Muy bien. ¿Qué herramientas de visualización de datos has usado y para qué?",
+    "Entiendo. ¿Cómo explicarías un hallazgo técnico a alguien del área comercial?",
+    "Perfecto, muchas gracias por tu tiempo. Pronto te contactaremos con los siguientes pasos.",
+]
+
+TRANSCRIPCIONES = [
+    "Hola, mucho gusto. Soy analista de datos con tres años de experiencia.",
+    "En mi último trabajo automaticé reportes de ventas con Python y SQL.",
+    "Suelo usar Power BI y a veces Tableau para los tableros de gestión.",
+    "Primero entiendo el impacto de cada pedido y luego acuerdo plazos con el equipo.",
+]
+
+# JSON genérico que satisface la extracción de propuestas y la generación de preguntas
+RESPUESTA_JSON = {
+    "empresa": "Empresa Simulada",
+    "puesto": "Analista de Datos",
+    "descripcion": "Análisis de información comercial y elaboración de reportes.",
+    "requisitos": "SQL; Python; Power BI; comunicación efectiva",
+    "preguntas": [
+        "Cuéntame sobre ti y tu experiencia.",
+        "¿Qué proyecto de datos te enorgullece más?",
+        "¿Cómo manejas la presión de los plazos?",
+    ],
+    "consejos": ["Prepara ejemplos concretos.", "Investiga a la empresa."],
+}
+
+# Segundos de voz por carácter (~14 caracteres por segundo en español)
+_SEGUNDOS_POR_CARACTER = 0.07
+
+# Frame MP3 en silencio: MPEG-1 Layer III, 128 kbps, 44.1 kHz, 417 bytes, 26 ms
+_FRAME_MP3 = b"\xff\xfb\x90\x64" + bytes(413)
+_DURACION_FRAME_MP3 = 1152 / 44100
+
+
+class Latencia:
+    """Distribución de latencias a partir de una especificación en milisegundos"""
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        if spec.startswith("lognormal:"):
+            _, mediana, sigma = spec.split(":")
+            self._muestra = lambda: random.lognormvariate(
+                math.log(float(mediana)), float(sigma)
+            )
+        elif "-" in spec:
+            minimo, maximo = (float(x) for x in spec.split("-", 1))
+            self._muestra = lambda: random.uniform(minimo, maximo)
+        else:
+            fija = float(spec)
+            self._muestra = lambda: fija
+
+    def muestra(self) -> float:
+        """Una latencia en segundos"""
+        return max(0.0, self._muestra()) / 1000
+
+    async def esperar(self):
+        await asyncio.sleep(self.muestra())
+
+
+class Endpoint:
+    """Latencia, tasa de error y contadores de un endpoint simulado"""
+
+    def __init__(self, latencia: str, tasa_error: float):
+        self.latencia = Latencia(latencia)
+        self.tasa_error = tasa_error
+        self.llamadas = 0
+        self.errores = 0
+
+    def falla(self) -> bool:
+        self.llamadas += 1
+        if random.random() < self.tasa_error:
+            self.errores += 1
+            return True
+        return False
+
+    def stats(self) -> Dict:
+        return {
+            "latencia": self.latencia.spec,
+            "tasa_error": self.tasa_error,
+            "llamadas": self.llamadas,
+            "errores": self.errores,
+        }
+
+
+def crear_app(
+    endpoints: Dict[str, Endpoint],
+    token_ms: Latencia,
+    codigo_error: int = 500,
+) -> FastAPI:
+    app = FastAPI(title="Proveedores simulados de Entre-Vistas")
+    respuestas = itertools.cycle(RESPUESTAS_CHAT)
+    transcripciones = itertools.cycle(TRANSCRIPCIONES)
+
+    def error(endpoint: str) -> JSONResponse:
+        return JSONResponse(
+            {
+                "error": {
+                    "message": f"Error simulado en {endpoint}",
+                    "type": "server_error",
+                }
+            },
+            status_code=codigo_error,
+        )
+
+    @app.get("/stats")
+    async def stats():
+        return {nombre: endpoint.stats() for nombre, endpoint in endpoints.items()}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+
+        if "audio" in (body.get("modalities") or []):
+            endpoint = endpoints["tts"]
+            if endpoint.falla():
+                return error("tts")
+            texto = _ultimo_mensaje(body["messages"])
+            # La síntesis tarda más cuanto más largo es el fragmento
+            await asyncio.sleep(endpoint.latencia.muestra() * (1 + len(texto) / 200))
+            formato = (body.get("audio") or {}).get("format", "mp3")
+            return _completion(
+                body["model"],
+                None,
+                audio={
+                    "id": f"audio_{uuid.uuid4().hex}",
+                    "data": base64.b64encode(_audio(texto, formato)).decode("ascii"),
+                    "expires_at": int(time.time()) + 3600,
+                    "transcript": texto,
+                },
+            )
+
+        endpoint = endpoints["chat"]
+        if endpoint.falla():
+            return error("chat")
+
+        if (body.get("response_format") or {}).get("type") == "json_object":
+            await endpoint.latencia.esperar()
+            return _completion(
+                body["model"], json.dumps(RESPUESTA_JSON, ensure_ascii=False)
+            )
+
+        texto = next(respuestas)
+        if body.get("stream"):
+            return StreamingResponse(
+                _stream_chat(body["model"], texto, endpoint.latencia, token_ms),
+                media_type="text/event-stream",
+            )
+
+        await endpoint.latencia.esperar()
+        # Sin streaming la respuesta llega cuando se "generaron" todos los tokens
+        for _ in texto.split():
+            await token_ms.esperar()
+        return _completion(body["model"], texto)
+
+    @app.post("/openai/v1/audio/transcriptions")
+    async def transcriptions(request: Request):
+        # El multipart no se parsea: solo importa cuánto audio se subió
+        audio = await request.body()
+        endpoint = endpoints["stt"]
+        if endpoint.falla():
+            return error("stt")
+        await asyncio.sleep(endpoint.latencia.muestra() * (1 + len(audio) / 500_000))
+        return {"text": next(transcripciones)}
+
+    @app.post("/sonar/chat/completions")
+    async def sonar(request: Request):
+        body = await request.json()
+        endpoint = endpoints["sonar"]
+        if endpoint.falla():
+            return error("sonar")
+        await endpoint.latencia.esperar()
+        respuesta = _completion(
+            body.get("model", "sonar-pro"),
+            f"Información simulada para: {_ultimo_mensaje(body['messages'])[:80]}",
+        )
+        respuesta["search_results"] = [
+            {"title": "Fuente simulada", "url": "https://example.com/simulada"}
+        ]
+        return respuesta
+
+    return app
+
+
+def _ultimo_mensaje(messages: List[Dict]) -> str:
+    content = messages[-1].get("content") if messages else ""
+    return content if isinstance(content, str) else ""
+
+
+def _completion(
+    model: str, content: Optional[str], audio: Optional[Dict] = None
+) -> Dict:
+    message = {"role": "assistant", "content": content}
+    if audio is not None:
+        message["audio"] = audio
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+async def _stream_chat(model: str, texto: str, latencia: Latencia, token_ms: Latencia):
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    await latencia.esperar()  # tiempo hasta el primer token
+
+    def chunk(delta: Dict, finish_reason: Optional[str] = None) -> str:
+        datos = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+    yield chunk({"role": "assistant", "content": ""})
+    for i, palabra in enumerate(texto.split(" ")):
+        if i:
+            await token_ms.esperar()
+        yield chunk({"content": palabra if i == 0 else f" {palabra}"})
+    yield chunk({}, "stop")
+    yield "data: [DONE]\n\n"
+
+
+def _audio(texto: str, formato: str) -> bytes:
+    """Audio en silencio con la duración aproximada del texto hablado"""
+    segundos = max(0.5, len(texto) * _SEGUNDOS_POR_CARACTER)
+    if formato == "mp3":
+        return _FRAME_MP3 * math.ceil(segundos / _DURACION_FRAME_MP3)
+    if formato == "opus":
+        return ogg_opus(round(segundos * 48000))
+
+    # pcm16 y wav: PCM de 16 bits mono a 24 kHz, como la API real
+    pcm = bytes(int(segundos * 24000) * 2)
+    if formato == "pcm16":
+        return pcm
+    return (
+        b"RIFF"
+        + struct.pack("<I", 36 + len(pcm))
+        + b"WAVEfmt "
+        + struct.pack("<IHHIIHH", 16, 1, 1, 24000, 48000, 2, 16)
+        + b"data"
+        + struct.pack("<I", len(pcm))
+        + pcm
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=9000)
+    parser.add_argument(
+        "--latencia-chat", default="lognormal:450:0.4", help="Hasta el primer token"
+    )
+    parser.add_argument(
+        "--token-ms", default="15-35", help="Entre tokens del chat en streaming"
+    )
+    parser.add_argument(
+        "--latencia-tts", default="lognormal:700:0.35", help="Por fragmento de TTS"
+    )
+    parser.add_argument("--latencia-stt", default="lognormal:350:0.3")
+    parser.add_argument("--latencia-sonar", default="lognormal:2500:0.5")
+    parser.add_argument("--error-chat", type=float, default=0.0)
+    parser.add_argument("--error-tts", type=float, default=0.0)
+    parser.add_argument("--error-stt", type=float, default=0.0)
+    parser.add_argument("--error-sonar", type=float, default=0.0)
+    parser.add_argument(
+        "--codigo-error",
+        type=int,
+        default=500,
+        help="Código HTTP de los errores simulados (p. ej. 429 para rate limit)",
+    )
+    parser.add_argument("--semilla", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.semilla is not None:
+        random.seed(args.semilla)
+
+    endpoints = {
+        "chat": Endpoint(args.latencia_chat, args.error_chat),
+        "tts": Endpoint(args.latencia_tts, args.error_tts),
+        "stt": Endpoint(args.latencia_stt, args.error_stt),
+        "sonar": Endpoint(args.latencia_sonar, args.error_sonar),
+    }
+    app = crear_app(endpoints, Latencia(args.token_ms), args.codigo_error)
+    uvicorn.run(app, host=args.host, port=args.puerto, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,66 @@
-from fastapi import FastAPI, WebSocket, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, WebSocket, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from typing import List
 from websocket.handler import WebSocketHandler
 from config import settings
 from services import search_service
+from services.clients import close_clients
+from services.extraction_cache import extraction_cache
+from services.interview_profiles import interview_profiles
+from services.job_queue import ESTADOS_FINALES, job_queue
+from services.logging_config import configure_logging
+from services.metrics import record_session_store, render_metrics
+from services.question_bank import etag_matches, question_bank
+from services.research_cache import research_cache
+from services.session_store import run_session_sweeper, session_store
+from services.tts_cache import tts_cache
+from services.tts_scheduler import tts_scheduler
+import asyncio
 import uvicorn
 import json
-import os
+import logging
+
+configure_logging(settings.log_level)
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pre-renderizar el audio de las líneas fijas del perfil por defecto
+    # (los demás perfiles se pre-renderizan con su primera sesión)
+    prerender = asyncio.create_task(
+        ws_handler.tts_service.prerender(interview_profiles.default)
+    )
+    # Barrido de sesiones inactivas y de sockets cerrados sin disconnect
+    sweeper = asyncio.create_task(
+        run_session_sweeper(
+            session_store,
+            settings.session_sweep_interval_seconds,
+            on_sweep=ws_handler.sweep_stale_connections,
+        )
+    )
+    # Workers de la cola de trabajos (retoman lo que quedó pendiente al reiniciar)
+    await job_queue.start()
+    yield
+    prerender.cancel()
+    sweeper.cancel()
+    await job_queue.stop()
+    job_queue.close()
+    # Cerrar los pools de conexiones compartidos con los proveedores
+    await close_clients()
+    await session_store.close()
+    research_cache.close()
+    extraction_cache.close()
+
 
 app = FastAPI(
     title="Entre-Vistas API",
     description="Simulador de entrevistas laborales con IA",
     version="2.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -47,20 +95,52 @@ async def health_check():
             "groq_api": bool(settings.groq_api_key),
             "openai_api": bool(settings.openai_api_key),
         },
+        "tts_scheduler": tts_scheduler.stats(),
+        "tts_cache": tts_cache.stats(),
+        "research_cache": research_cache.stats(),
+        "extraction_cache": extraction_cache.stats(),
+        "jobs": job_queue.stats(),
+        "sessions": {**session_store.stats(), **ws_handler.stats()},
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Histogramas de latencia por etapa en formato Prometheus"""
+    record_session_store(session_store.stats())
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/api/preguntas")
-async def get_preguntas():
-    """Obtener las preguntas de entrevista desde el archivo JSON"""
+async def get_preguntas(request: Request):
+    """Obtener las preguntas de entrevista (cuerpo pre-serializado con ETag)"""
     try:
-        json_path = os.path.join(os.path.dirname(__file__), "preguntas.json")
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data["preguntas_entrevista"]
+        body, etag = question_bank.response()
     except Exception as e:
         return {"error": f"Error al cargar preguntas: {str(e)}"}
 
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(etag, request.headers.get("if-none-match", "")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/api/perfiles")
+async def get_perfiles():
+    """Perfiles de entrevista disponibles para /ws?perfil="""
+    return {
+        "por_defecto": interview_profiles.default_id,
+        "perfiles": [
+            {
+                "id": profile.id,
+                "empresa": profile.empresa,
+                "puesto": profile.puesto,
+            }
+            for profile in map(interview_profiles.get, interview_profiles.ids())
+        ],
+    }
+
 
 @app.post("/api/generar-entrevista", response_model=search_service.RespuestaEntrevista)
 async def generar_entrevista(propuesta_texto: search_service.PropuestaLaboralTexto):
@@ -68,16 +148,19 @@ async def generar_entrevista(propuesta_texto: search_service.PropuestaLaboralTex
 
     try:
         # Extraer información del texto
-        propuesta = search_service.extraer_informacion_propuesta(propuesta_texto.texto)
+        propuesta = await search_service.extraer_informacion_propuesta(
+            propuesta_texto.texto
+        )
 
-        # Buscar información de la empresa
-        query_empresa = search_service.crear_prompt_empresa(
+        # Buscar información de la empresa (con caché de investigaciones)
+        info_empresa = await search_service.buscar_empresa(
             propuesta.empresa, propuesta.puesto
         )
-        info_empresa = search_service.buscar_con_sonar(query_empresa)
 
         # Generar preguntas
-        resultado = search_service.generar_preguntas(propuesta, info_empresa.contenido)
+        resultado = await search_service.generar_preguntas(
+            propuesta, info_empresa.contenido
+        )
         preguntas = resultado.get("preguntas", [])
 
         # Construir respuesta
@@ -109,6 +192,35 @@ async def generar_entrevista(propuesta_texto: search_service.PropuestaLaboralTex
         )
 
 
+@app.post("/api/generar-entrevista/stream")
+async def generar_entrevista_stream(
+    propuesta_texto: search_service.PropuestaLaboralTexto,
+):
+    """Como /api/generar-entrevista, pero emite eventos SSE a medida que avanza"""
+
+    async def eventos():
+        try:
+            async for evento, datos in search_service.generar_entrevista_eventos(
+                propuesta_texto.texto
+            ):
+                yield _evento_sse(evento, datos)
+        except Exception as e:
+            yield _evento_sse(
+                "error", {"detail": f"Error procesando solicitud: {str(e)}"}
+            )
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        # Sin esto algunos proxies acumulan el stream y los eventos llegan juntos
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _evento_sse(evento: str, datos) -> str:
+    return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+
 @app.post(
     "/api/generar-entrevista-con-opciones",
     response_model=search_service.RespuestaEntrevista,
@@ -119,84 +231,142 @@ async def generar_entrevista_con_opciones(
     """Generar preguntas con opciones de búsqueda específicas"""
 
     try:
-        # Extraer información del texto
-        propuesta = search_service.extraer_informacion_propuesta(
-            propuesta_opciones.texto
+        # Extracción y búsquedas corren como un pipeline concurrente
+        return await search_service.generar_entrevista_con_opciones(propuesta_opciones)
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error procesando solicitud: {str(e)}"
         )
 
-        # Inicializar información
-        info_empresa = ""
-        info_mercado = ""
-        info_entrevistador = ""
 
-        # Buscar según opciones
-        if propuesta_opciones.buscar_empresa:
-            query_empresa = search_service.crear_prompt_empresa(
-                propuesta.empresa, propuesta.puesto
-            )
-            resultado_empresa = search_service.buscar_con_sonar(query_empresa)
-            info_empresa = resultado_empresa.contenido
+@app.post("/api/generar-entrevistas-lote")
+async def generar_entrevistas_lote(
+    propuestas: List[search_service.PropuestaLaboralConOpciones],
+):
+    """Generar entrevistas en lote; cada resultado sale en NDJSON al terminar"""
 
-        if propuesta_opciones.buscar_puesto_mercado:
-            query_mercado = search_service.crear_prompt_mercado(propuesta.puesto)
-            resultado_mercado = search_service.buscar_con_sonar(query_mercado)
-            info_mercado = resultado_mercado.contenido
+    if len(propuestas) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"El lote admite como máximo {settings.batch_max_items} propuestas",
+        )
 
-        if (
-            propuesta_opciones.buscar_entrevistador
-            and propuesta_opciones.nombre_entrevistador
+    async def resultados():
+        async for indice, respuesta, error in search_service.generar_entrevistas_lote(
+            propuestas, settings.batch_concurrency
         ):
-            query_entrevistador = search_service.crear_prompt_entrevistador(
-                propuesta_opciones.nombre_entrevistador
-            )
-            resultado_entrevistador = search_service.buscar_con_sonar(
-                query_entrevistador
+            linea = {"indice": indice, "ok": error is None}
+            if error is None:
+                linea["resultado"] = respuesta.model_dump()
+            else:
+                linea["error"] = f"Error procesando solicitud: {error}"
+            yield json.dumps(linea, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(resultados(), media_type="application/x-ndjson")
+
+
+@app.post("/api/trabajos/generar-entrevista", status_code=202)
+async def crear_trabajo_entrevista(
+    propuesta_texto: search_service.PropuestaLaboralTexto,
+):
+    """Encolar /api/generar-entrevista; el resultado se consulta con el id"""
+    job, duplicado = await job_queue.submit("entrevista", propuesta_texto.model_dump())
+    return {**_vista_trabajo(job), "duplicado": duplicado}
+
+
+@app.post("/api/trabajos/generar-entrevista-con-opciones", status_code=202)
+async def crear_trabajo_entrevista_con_opciones(
+    propuesta_opciones: search_service.PropuestaLaboralConOpciones,
+):
+    """Encolar /api/generar-entrevista-con-opciones; devuelve el id del trabajo"""
+    job, duplicado = await job_queue.submit(
+        "entrevista_con_opciones", propuesta_opciones.model_dump()
+    )
+    return {**_vista_trabajo(job), "duplicado": duplicado}
+
+
+@app.get("/api/trabajos/{trabajo_id}")
+async def obtener_trabajo(trabajo_id: str):
+    """Estado del trabajo y, si terminó, su resultado"""
+    job = await job_queue.get(trabajo_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return _vista_trabajo(job)
+
+
+@app.get("/api/trabajos/{trabajo_id}/eventos")
+async def eventos_trabajo(trabajo_id: str):
+    """SSE con cada cambio de estado del trabajo; se cierra al terminar"""
+    job = await job_queue.get(trabajo_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+
+    async def eventos():
+        estado = None
+        while True:
+            job = await job_queue.get(trabajo_id)
+            if job is None:
+                yield _evento_sse("error", {"detail": "Trabajo no encontrado"})
+                return
+            if job["status"] != estado:
+                estado = job["status"]
+                yield _evento_sse("estado", _vista_trabajo(job))
+            if estado in ESTADOS_FINALES:
+                return
+            # Otro proceso también puede completar el trabajo: se vuelve a leer igual
+            await job_queue.wait_for_change(
+                trabajo_id, settings.job_poll_interval_seconds
             )
-            info_entrevistador = resultado_entrevistador.contenido
 
-        # Generar preguntas contextualizadas
-        resultado = search_service.generar_preguntas_contextualizadas(
-            propuesta, info_empresa, info_mercado, info_entrevistador
-        )
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-        preguntas = resultado.get("preguntas", [])
-        consejos_conexion = resultado.get("consejos_conexion", [])
 
-        # Construir respuesta
-        respuesta = search_service.RespuestaEntrevista(
-            preguntas=preguntas,
-            consejos_conexion=consejos_conexion,
-            informacion_empresa={
-                "nombre": propuesta.empresa,
-                "informacion_encontrada": (
-                    info_empresa[:500] + "..."
-                    if len(info_empresa) > 500
-                    else info_empresa
-                ),
-                "fuentes_consultadas": 1 if info_empresa else 0,
-            },
-            propuesta_extraida={
-                "empresa": propuesta.empresa,
-                "puesto": propuesta.puesto,
-                "descripcion": propuesta.descripcion,
-                "requisitos": propuesta.requisitos,
-            },
-        )
+_ESTADOS_TRABAJO = {
+    "queued": "en_cola",
+    "running": "en_proceso",
+    "done": "completado",
+    "error": "error",
+}
 
-        return respuesta
 
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Error procesando solicitud: {str(e)}"
-        )
+def _vista_trabajo(job) -> dict:
+    return {
+        "id": job["id"],
+        "estado": _ESTADOS_TRABAJO.get(job["status"], job["status"]),
+        "resultado": job["result"],
+        "error": job["error"],
+        "intentos": job["attempts"],
+    }
 
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     session_id_param = websocket.query_params.get("session_id")
     session_id = await ws_handler.connect(websocket, session_id_param)
+    # None: la conexión se rechazó (p. ej. un perfil de entrevista desconocido)
+    if session_id is None:
+        return
     await ws_handler.handle_message(websocket, session_id)
 
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    # Con varios workers el estado de las sesiones debe estar en un almacén compartido
+    if settings.workers > 1 and settings.session_store == "memory":
+        logger.info(
+            "[MAIN] WORKERS > 1 requiere SESSION_STORE=redis; usando un solo worker"
+        )
+        settings.workers = 1
+
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        # uvicorn no admite recarga automática con varios workers
+        reload=settings.workers == 1,
+        workers=settings.workers,
+    )
@@ -0,0 +1,89 @@
+"""Pre-calienta la caché de investigaciones para una lista de empresas objetivo.
+
+Uso:
+    python precalentar_investigacion.py empresas.txt [--mercado] [--forzar]
+
+Cada línea del archivo es "Empresa; Puesto" (el puesto es opcional). Las
+líneas vacías y las que empiezan con # se ignoran.
+"""
+
+from services import search_service
+from services.clients import close_clients
+from services.research_cache import research_cache
+import argparse
+import asyncio
+
+
+def leer_objetivos(ruta: str):
+    objetivos = []
+    with open(ruta, "r", encoding="utf-8") as f:
+        for linea in f:
+            linea = linea.strip()
+            if not linea or linea.startswith("#"):
+                continue
+            empresa, _, puesto = linea.partition(";")
+            objetivos.append((empresa.strip(), puesto.strip()))
+    return objetivos
+
+
+async def precalentar(objetivos, mercado: bool, forzar: bool, concurrencia: int):
+    semaforo = asyncio.Semaphore(concurrencia)
+    consultas = {}
+    for empresa, puesto in objetivos:
+        clave = research_cache.make_key("empresa", empresa, puesto)
+        consultas[clave] = search_service.crear_prompt_empresa(empresa, puesto)
+        if mercado and puesto:
+            clave = research_cache.make_key("mercado", puesto)
+            consultas[clave] = search_service.crear_prompt_mercado(puesto)
+
+    async def cargar(clave: str, query: str):
+        edad = research_cache.age(clave)
+        if not forzar and edad is not None and edad < research_cache.ttl_seconds:
+            print(f"  vigente  {clave}")
+            return True
+        async with semaforo:
+            try:
+                await research_cache.refresh(
+                    clave, lambda: search_service.consultar_sonar(query)
+                )
+                print(f"  cargada  {clave}")
+                return True
+            except Exception as e:
+                print(f"  error    {clave}: {e}")
+                return False
+
+    resultados = await asyncio.gather(
+        *(cargar(clave, query) for clave, query in consultas.items())
+    )
+    print(f"{sum(resultados)}/{len(resultados)} investigaciones en caché")
+    await close_clients()
+    return all(resultados)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("archivo", help="Archivo con una línea 'Empresa; Puesto'")
+    parser.add_argument(
+        "--mercado",
+        action="store_true",
+        help="Incluir el análisis de mercado del puesto",
+    )
+    parser.add_argument(
+        "--forzar", action="store_true", help="Volver a consultar aunque esté vigente"
+    )
+    parser.add_argument("--concurrencia", type=int, default=4)
+    args = parser.parse_args()
+
+    if not search_service.SONAR_API_KEY:
+        raise SystemExit("SONAR_API_KEY no configurada")
+
+    ok = asyncio.run(
+        precalentar(
+            leer_objetivos(args.archivo), args.mercado, args.forzar, args.concurrencia
+        )
+    )
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
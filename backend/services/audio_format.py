@@ -0,0 +1,330 @@
+from array import array
+from typing import List, Optional, Sequence, Tuple
+from services.audio_utils import pcm16_to_wav
+import struct
+import sys
+import zlib
+
+# Formatos que una sesión puede pedir en /ws (?audio_format=...&sample_rate=...)
+FORMATOS = ("mp3", "opus", "pcm16", "wav")
+
+# El proveedor entrega PCM16 mono a 24 kHz; solo se ofrecen divisores enteros
+# para poder bajar la frecuencia sin una dependencia de resampleo
+PCM_SAMPLE_RATE = 24000
+SAMPLE_RATES = (24000, 12000, 8000)
+
+
+class AudioFormat:
+    """Formato del audio TTS de una sesión.
+
+    Cada fragmento que sale de `convert` es un archivo reproducible por sí
+    solo (para tts_chunk); `combine` une varios en uno solo respetando los
+    límites de frame de cada formato (para tts_result).
+    """
+
+    def __init__(self, codec: str = "mp3", sample_rate: Optional[int] = None):
+        self.codec = codec
+        # Solo el PCM (crudo o en WAV) admite elegir frecuencia
+        self.sample_rate = (
+            (sample_rate or PCM_SAMPLE_RATE) if codec in ("pcm16", "wav") else None
+        )
+
+    @classmethod
+    def parse(
+        cls, codec: Optional[str], sample_rate: Optional[str] = None
+    ) -> "AudioFormat":
+        """Valida lo que pidió el cliente; lanza ValueError si no se puede servir"""
+        codec = (codec or "mp3").lower()
+        if codec not in FORMATOS:
+            raise ValueError(
+                f"Formato de audio no soportado: {codec} ({', '.join(FORMATOS)})"
+            )
+        if not sample_rate:
+            return cls(codec)
+        if codec not in ("pcm16", "wav"):
+            raise ValueError("sample_rate solo aplica a pcm16 y wav")
+        if not sample_rate.isdigit() or int(sample_rate) not in SAMPLE_RATES:
+            raise ValueError(
+                f"sample_rate no soportado: {sample_rate} "
+                f"({', '.join(str(rate) for rate in SAMPLE_RATES)})"
+            )
+        return cls(codec, int(sample_rate))
+
+    @property
+    def api_format(self) -> str:
+        """Formato que se le pide al proveedor (el WAV se arma aquí desde PCM16)"""
+        return "pcm16" if self.codec == "wav" else self.codec
+
+    @property
+    def key(self) -> str:
+        """Identificador estable para la clave de caché: 'mp3', 'pcm16@8000'..."""
+        if self.sample_rate is None:
+            return self.codec
+        return f"{self.codec}@{self.sample_rate}"
+
+    def convert(self, audio: bytes) -> bytes:
+        """Adapta el audio del proveedor (en `api_format`) al formato de la sesión"""
+        if self.sample_rate is None:
+            return audio
+        pcm = _downsample(audio, PCM_SAMPLE_RATE // self.sample_rate)
+        if self.codec == "wav":
+            return pcm16_to_wav(pcm, self.sample_rate)
+        return pcm
+
+    def combine(self, chunks: Sequence[bytes]) -> bytes:
+        """Une fragmentos en un solo archivo, copiando una vez a un buffer preasignado.
+
+        Devuelve un bytearray (o el único fragmento tal cual); base64 y
+        encode_frame lo aceptan sin otra copia intermedia.
+        """
+        if len(chunks) == 1:
+            return chunks[0]
+        if self.codec == "opus":
+            return _combine_ogg(chunks)
+
+        if self.codec == "mp3":
+            spans = [_mp3_audio_span(chunk) for chunk in chunks]
+        elif self.codec == "wav":
+            spans = [_wav_data_span(chunk) for chunk in chunks]
+        else:
+            spans = [(0, len(chunk) - len(chunk) % 2) for chunk in chunks]
+
+        header = pcm16_to_wav(b"", self.sample_rate) if self.codec == "wav" else b""
+        data_size = sum(end - start for start, end in spans)
+        buffer = bytearray(len(header) + data_size)
+        view = memoryview(buffer)
+        view[: len(header)] = header
+        offset = len(header)
+        for chunk, (start, end) in zip(chunks, spans):
+            view[offset : offset + end - start] = memoryview(chunk)[start:end]
+            offset += end - start
+
+        if header:
+            # Tamaños RIFF y del chunk "data" con el total unido
+            struct.pack_into("<I", buffer, 4, 36 + data_size)
+            struct.pack_into("<I", buffer, 40, data_size)
+        return buffer
+
+
+DEFAULT_AUDIO_FORMAT = AudioFormat()
+
+
+def _downsample(pcm: bytes, factor: int) -> bytes:
+    """PCM16 mono a 1/factor de la frecuencia, promediando cada grupo de muestras"""
+    usable = len(pcm) - (len(pcm) % 2)
+    if factor <= 1:
+        return pcm[:usable]
+
+    samples = array("h", pcm[:usable])
+    if sys.byteorder == "big":
+        samples.byteswap()
+    # El promedio funciona como filtro paso bajo simple antes de diezmar
+    phases = [samples[i::factor] for i in range(factor)]
+    reduced = array("h", (sum(group) // factor for group in zip(*phases)))
+    if sys.byteorder == "big":
+        reduced.byteswap()
+    return reduced.tobytes()
+
+
+def _wav_data_span(chunk: bytes) -> Tuple[int, int]:
+    """Rango con las muestras del chunk "data" de un WAV (sin copiar el audio)"""
+    offset = 12
+    while offset + 8 <= len(chunk):
+        (size,) = struct.unpack_from("<I", chunk, offset + 4)
+        body = offset + 8
+        if chunk[offset : offset + 4] == b"data":
+            end = len(chunk) if size in (0, 0xFFFFFFFF) else body + size
+            end = min(end, len(chunk))
+            return body, end - (end - body) % 2
+        offset = body + size + (size & 1)
+    return len(chunk), len(chunk)
+
+
+# MP3: cada archivo del proveedor puede traer etiquetas ID3 y un frame Xing/Info
+# con la duración de ese archivo solo. Al unir se descartan para que el resultado
+# sea un único stream de frames de audio.
+
+_MP3_BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),  # MPEG-1
+    2: (22050, 24000, 16000),  # MPEG-2
+    0: (11025, 12000, 8000),  # MPEG-2.5
+}
+
+
+def _mp3_audio_span(chunk: bytes) -> Tuple[int, int]:
+    start, end = 0, len(chunk)
+
+    # ID3v2 al inicio: "ID3", versión, flags y tamaño syncsafe
+    if chunk[:3] == b"ID3" and len(chunk) >= 10:
+        size = 0
+        for byte in chunk[6:10]:
+            size = (size << 7) | (byte & 0x7F)
+        start = 10 + size + (10 if chunk[5] & 0x10 else 0)
+    # ID3v1 al final: 128 bytes que empiezan con "TAG"
+    if end - start >= 128 and chunk[end - 128 : end - 125] == b"TAG":
+        end -= 128
+
+    frame = _mp3_frame(chunk, start)
+    if frame is not None:
+        length, side_info = frame
+        data = start + 4 + side_info
+        if chunk[data : data + 4] in (b"Xing", b"Info") or (
+            chunk[start + 36 : start + 40] == b"VBRI"
+        ):
+            start = min(end, start + length)
+    return start, end
+
+
+def _mp3_frame(chunk: bytes, offset: int) -> Optional[Tuple[int, int]]:
+    """(largo del frame, tamaño de side info) de un frame MPEG Layer III, o None"""
+    if offset + 4 > len(chunk):
+        return None
+    b1, b2, b3 = chunk[offset + 1], chunk[offset + 2], chunk[offset + 3]
+    version = (b1 >> 3) & 0x03
+    layer = (b1 >> 1) & 0x03
+    if chunk[offset] != 0xFF or b1 & 0xE0 != 0xE0 or version == 1 or layer != 1:
+        return None
+
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 0x03
+    if bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    bitrate = _MP3_BITRATES[1 if version == 3 else 2][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 0x01
+    mono = (b3 >> 6) == 0x03
+
+    if version == 3:
+        length = 144 * bitrate // sample_rate + padding
+        side_info = 17 if mono else 32
+    else:
+        length = 72 * bitrate // sample_rate + padding
+        side_info = 9 if mono else 17
+    return length, side_info
+
+
+# Ogg Opus: cada archivo es un stream lógico con sus propias cabeceras
+# (OpusHead y OpusTags). Al unir se conservan las del primero y las páginas de
+# audio de los siguientes se renumeran dentro del mismo stream: mismo serial,
+# secuencia continua, granule acumulado y CRC recalculado. Las pocas muestras
+# de pre-skip de cada archivo siguiente (~6 ms) quedan dentro del audio.
+
+_OGG_HEADER = struct.Struct("<4sBBqIIIB")
+_OGG_CONTINUED, _OGG_BOS, _OGG_EOS = 0x01, 0x02, 0x04
+
+
+# El CRC de Ogg es CRC-32 sin reflejar (polinomio 0x04C11DB7, inicio 0). zlib
+# calcula la variante reflejada en C: invirtiendo los bits de cada byte de
+# entrada y del resultado se obtiene el mismo valor sin recorrer byte a byte
+# en Python (esto corre en el event loop por cada tts_result opus)
+_BITS_INVERTIDOS = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+
+
+def _ogg_crc(data) -> int:
+    crc = zlib.crc32(bytes(data).translate(_BITS_INVERTIDOS), 0xFFFFFFFF) ^ 0xFFFFFFFF
+    return int.from_bytes(crc.to_bytes(4, "little").translate(_BITS_INVERTIDOS), "big")
+
+
+def _ogg_pages(chunk: bytes) -> List[Tuple[int, int, bytes]]:
+    """[(inicio, fin, tabla de segmentos)] de cada página del archivo"""
+    pages = []
+    offset = 0
+    while offset + _OGG_HEADER.size <= len(chunk):
+        if chunk[offset : offset + 4] != b"OggS":
+            break
+        segments = chunk[offset + 26]
+        table_end = offset + _OGG_HEADER.size + segments
+        lacing = chunk[offset + _OGG_HEADER.size : table_end]
+        end = table_end + sum(lacing)
+        if end > len(chunk):
+            break
+        pages.append((offset, end, lacing))
+        offset = end
+    return pages
+
+
+def _opus_samples(packet_start: bytes) -> int:
+    """Muestras (a 48 kHz) de un paquete Opus según su byte TOC"""
+    toc = packet_start[0]
+    config = toc >> 3
+    if config < 12:
+        frame = (480, 960, 1920, 2880)[config % 4]
+    elif config < 16:
+        frame = (480, 960)[config % 2]
+    else:
+        frame = (120, 240, 480, 960)[config % 4]
+    code = toc & 0x03
+    if code == 0:
+        frames = 1
+    elif code in (1, 2):
+        frames = 2
+    else:
+        frames = packet_start[1] & 0x3F if len(packet_start) > 1 else 1
+    return frame * frames
+
+
+def _combine_ogg(chunks: Sequence[bytes]) -> bytes:
+    # Primero se eligen las páginas y su granule final; después se copia
+    plan = []  # (chunk, inicio, fin, granule)
+    offset = 0
+    for index, chunk in enumerate(chunks):
+        last_chunk = index == len(chunks) - 1
+        packets = 0
+        samples = 0  # muestras decodificadas del fragmento hasta la página actual
+        pending = 0  # muestras del paquete abierto (puede cruzar páginas)
+        packet_open = False
+        for start, end, lacing in _ogg_pages(chunk):
+            body = start + _OGG_HEADER.size + len(lacing)
+            header_page = packets < 2
+            completed = False
+            for size in lacing:
+                if not packet_open and packets >= 2:
+                    pending = _opus_samples(chunk[body : body + 2]) if size else 0
+                packet_open = size == 255
+                if not packet_open:
+                    if packets >= 2:
+                        samples += pending
+                        completed = True
+                    packets += 1
+                body += size
+
+            # Las cabeceras (OpusHead, OpusTags) solo se conservan del primer archivo
+            if header_page and index > 0:
+                continue
+            granule = _OGG_HEADER.unpack_from(chunk, start)[3]
+            if not header_page and not last_chunk:
+                # El encoder recorta el final de cada archivo con un granule menor
+                # que lo decodificado; a mitad del stream eso es inválido, así que
+                # se usa la cuenta real de muestras (-1 si no cierra ningún paquete)
+                granule = offset + samples if completed else -1
+            elif not header_page and granule != -1:
+                granule += offset
+            plan.append((chunk, start, end, granule))
+        offset += samples
+
+    if not plan:
+        return b""
+
+    serial = _OGG_HEADER.unpack_from(plan[0][0], plan[0][1])[4]
+    buffer = bytearray(sum(end - start for _, start, end, _ in plan))
+    view = memoryview(buffer)
+    position = 0
+    for sequence, (chunk, start, end, granule) in enumerate(plan):
+        size = end - start
+        page = view[position : position + size]
+        page[:] = memoryview(chunk)[start:end]
+
+        flags = page[5] & _OGG_CONTINUED
+        if sequence == 0:
+            flags |= _OGG_BOS
+        if sequence == len(plan) - 1:
+            flags |= _OGG_EOS
+        struct.pack_into("<BqIII", page, 5, flags, granule, serial, sequence, 0)
+        struct.pack_into("<I", page, 22, _ogg_crc(page))
+        position += size
+    return buffer
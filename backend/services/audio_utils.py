@@ -0,0 +1,147 @@
+from array import array
+from typing import Optional
+from config import settings
+import math
+import struct
+import sys
+
+
+class AudioInvalidoError(ValueError):
+    """Audio rechazado antes de gastar una llamada de transcripción"""
+
+
+def sniff_audio_format(data: bytes) -> Optional[str]:
+    """Detecta el formato del audio por su cabecera; devuelve la extensión o None"""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return "wav"
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if data[:4] == b"OggS":
+        return "ogg"
+    if data[:4] == b"fLaC":
+        return "flac"
+    if data[4:8] == b"ftyp":
+        return "mp4"
+    # MP3 con etiqueta ID3 o que empieza directamente con un frame sync
+    if data[:3] == b"ID3" or (
+        len(data) > 1 and data[0] == 0xFF and data[1] & 0xE0 == 0xE0
+    ):
+        return "mp3"
+    return None
+
+
+def validate_audio(data: bytes) -> str:
+    """Validación barata de una subida de audio; devuelve el formato detectado.
+
+    Rechaza clips vacíos, truncados, demasiado grandes, en formatos desconocidos
+    y, para WAV PCM, clips demasiado cortos o en silencio.
+    """
+    if not data:
+        raise AudioInvalidoError("Audio vacío")
+    if len(data) < settings.stt_min_audio_bytes:
+        raise AudioInvalidoError("Audio demasiado corto")
+    if len(data) > settings.stt_max_audio_bytes:
+        raise AudioInvalidoError("Audio demasiado grande")
+
+    audio_format = sniff_audio_format(data)
+    if audio_format is None:
+        raise AudioInvalidoError("Formato de audio no soportado")
+
+    # Solo en WAV se puede medir duración y energía sin decodificar
+    if audio_format == "wav":
+        _validate_wav(data)
+
+    return audio_format
+
+
+def _validate_wav(data: bytes):
+    info = _parse_wav(data)
+    if info is None:
+        raise AudioInvalidoError("Cabecera WAV inválida")
+
+    audio_format, channels, sample_rate, bits, pcm = info
+    bytes_per_second = sample_rate * channels * bits // 8
+    if not bytes_per_second:
+        raise AudioInvalidoError("Cabecera WAV inválida")
+
+    duration = len(pcm) / bytes_per_second
+    if duration < settings.stt_min_duration_seconds:
+        raise AudioInvalidoError("Audio demasiado corto")
+
+    # PCM de 16 bits: detectar grabaciones en silencio
+    if audio_format == 1 and bits == 16 and pcm_rms(pcm) < settings.stt_silence_rms:
+        raise AudioInvalidoError("No se detectó voz en el audio")
+
+
+def _parse_wav(data: bytes):
+    """Recorre los chunks RIFF y devuelve (formato, canales, frecuencia, bits, datos PCM)"""
+    fmt = None
+    pcm = None
+    offset = 12
+    while offset + 8 <= len(data) and (fmt is None or pcm is None):
+        chunk_id = data[offset : offset + 4]
+        (chunk_size,) = struct.unpack_from("<I", data, offset + 4)
+        body = offset + 8
+
+        if chunk_id == b"fmt " and chunk_size >= 16:
+            if body + 16 > len(data):
+                return None
+            fmt = struct.unpack_from("<HHIIHH", data, body)
+            # WAVE_FORMAT_EXTENSIBLE: el formato real va al inicio del subformato
+            if fmt[0] == 0xFFFE and chunk_size >= 40 and body + 26 <= len(data):
+                (subformat,) = struct.unpack_from("<H", data, body + 24)
+                fmt = (subformat,) + fmt[1:]
+        elif chunk_id == b"data" and pcm is None:
+            # Algunos grabadores en streaming dejan el tamaño en 0 o 0xFFFFFFFF
+            if chunk_size in (0, 0xFFFFFFFF):
+                pcm = data[body:]
+                break
+            pcm = data[body : body + chunk_size]
+
+        # Los chunks RIFF se alinean a 2 bytes
+        offset = body + chunk_size + (chunk_size & 1)
+
+    if fmt is None or pcm is None:
+        return None
+    audio_format, channels, sample_rate, _, _, bits = fmt
+    return audio_format, channels, sample_rate, bits, pcm
+
+
+def pcm_rms(pcm: bytes, max_samples: int = 48000) -> float:
+    """RMS aproximado de PCM16 little-endian, muestreando como máximo max_samples"""
+    usable = len(pcm) - (len(pcm) % 2)
+    if usable <= 0:
+        return 0.0
+
+    samples = array("h", pcm[:usable])
+    if sys.byteorder == "big":
+        samples.byteswap()
+
+    step = max(1, len(samples) // max_samples)
+    total = 0
+    count = 0
+    for sample in samples[::step]:
+        total += sample * sample
+        count += 1
+    return math.sqrt(total / count)
+
+
+def pcm16_to_wav(pcm: bytes, sample_rate: int, channels: int = 1) -> bytes:
+    """Envuelve PCM16 crudo en un contenedor WAV mínimo"""
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        36 + len(pcm),
+        b"WAVE",
+        b"fmt ",
+        16,
+        1,  # PCM
+        channels,
+        sample_rate,
+        sample_rate * channels * 2,
+        channels * 2,
+        16,
+        b"data",
+        len(pcm),
+    )
+    return header + pcm
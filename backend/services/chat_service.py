@@ -1,138 +1,180 @@
-from openai import OpenAI
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Optional
 from config import settings
-import json
-import os
+from services.clients import get_openai_client
+from services.context_window import ContextWindow
+from services.metrics import observe, span
+from services.interview_profiles import (
+    InterviewProfile,
+    ProfileRegistry,
+    interview_profiles,
+)
+from services.session_store import (
+    SesionExpiradaError,
+    SessionState,
+    SessionStore,
+    session_store,
+)
+import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 
 class ChatService:
-    def __init__(self):
+    def __init__(
+        self,
+        store: Optional[SessionStore] = None,
+        profiles: Optional[ProfileRegistry] = None,
+    ):
         if not settings.openai_api_key:
             raise ValueError("OPENAI_API_KEY no configurada")
-        self.client = OpenAI(api_key=settings.openai_api_key)
+        self.client = get_openai_client()
         self.model = settings.chat_model
+        self.context = ContextWindow(self.model)
 
-        # Cargar preguntas desde JSON
-        json_path = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)), "preguntas.json"
-        )
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            self.preguntas = data["preguntas_entrevista"]
-        # Formatear las preguntas para incluir en el prompt
-        preguntas_formato = "\n".join(
-            [f"{i+1}. {p['pregunta']}" for i, p in enumerate(self.preguntas)]
-        )
-
-        self.system_prompt = f"""Eres María, entrevistadora virtual oficial del Banco de Crédito del Perú (BCP), el banco líder del Perú con más de 130 años de historia. Conduces entrevistas para el puesto de ANALISTA DE DATOS en la División de Analytics & Digital Transformation del BCP.
-
-CONTEXTO DEL PUESTO:
-El Analista de Datos en BCP trabajará con:
-- Big Data: Más de 6 millones de clientes y millones de transacciones diarias
-- Tecnologías: SQL Server, Oracle, Python, R, Power BI, Tableau, SAS
-- Áreas clave: Riesgo crediticio, prevención de fraude, comportamiento del cliente, optimización de canales digitales
-- Impacto directo en decisiones estratégicas del banco
-
-COMPORTAMIENTO ESTRICTO:
-- SOLO hablas sobre la entrevista y temas relacionados al puesto de Analista de Datos
-- Si preguntan algo no relacionado, redirige amablemente: "Enfoquémonos en conocer tu perfil para el puesto de Analista de Datos en BCP"
-- Mantén siempre el profesionalismo y la imagen corporativa del BCP
-
-PRESENTACIÓN INICIAL (YA ENVIADA):
-"¡Hola! Soy María del BCP. Vamos a iniciar la entrevista para Analista de Datos. ¿Cuál es tu nombre completo?"
-
-ESTILO DE COMUNICACIÓN:
-- Tono profesional, cálido y representativo de los valores BCP: cercanía, eficiencia e innovación
-- Evita listas numeradas o bullets en tus respuestas - usa lenguaje conversacional
-- Haz una pregunta a la vez y espera la respuesta completa
-- Muestra interés genuino en las respuestas del candidato
-- Haz preguntas de seguimiento cuando sea apropiado
-
-FLUJO DE ENTREVISTA (SOLO 4 PREGUNTAS PRINCIPALES + CIERRE):
-1. Después de obtener el nombre, agradece y menciona brevemente el proceso
-2. Realiza estas 4 preguntas clave en orden:
-
-{preguntas_formato}
-
-3. Cierre: Agradece la participación, menciona próximos pasos
-
-TÉCNICAS DE ENTREVISTA:
-- Escucha activa: Haz referencias a respuestas anteriores
-- Profundiza cuando el candidato dé respuestas muy breves
-- Si el candidato no tiene experiencia en algo, pregunta cómo lo abordaría
-- Valora tanto conocimientos técnicos como capacidad de aprendizaje
-
-EVALUACIÓN MENTAL (no compartir con candidato):
-- Habilidades técnicas: SQL, Python/R, visualización de datos
-- Comprensión del negocio bancario
-- Capacidad analítica y resolución de problemas
-- Habilidades de comunicación
-
-CIERRE DE ENTREVISTA:
-"Excelente [Nombre], ha sido muy interesante conocer tu perfil. El equipo de Talento del BCP revisará tu candidatura y nos pondremos en contacto contigo en los próximos días. ¿Tienes alguna pregunta sobre el proceso o el puesto?"
-
-Recuerda: Representas al banco más importante del Perú. Mantén siempre un balance entre profesionalismo y calidez humana."""
-        self.conversations: Dict[str, List[Dict[str, str]]] = {}
-        self.initial_message_sent: Dict[str, bool] = {}
+        # Cada sesión usa el prompt ya compilado de su perfil de entrevista
+        self.profiles = profiles or interview_profiles
+
+        # Historial e indicador del mensaje inicial viven en el almacén de sesiones
+        self.store = store or session_store
+
+    def profile_for(self, state: SessionState) -> InterviewProfile:
+        try:
+            return self.profiles.get(state.profile)
+        except KeyError:
+            # El perfil se quitó del directorio después de iniciar la sesión
+            return self.profiles.default
+
+    async def get_profile(self, session_id: str) -> InterviewProfile:
+        state = await self.store.get_session(session_id) or SessionState()
+        return self.profile_for(state)
+
+    async def start_conversation(self, session_id: str, profile_id: str):
+        """Crea la conversación con el perfil elegido (antes de la presentación)"""
+        await self.store.save_session(session_id, SessionState(profile=profile_id))
 
     async def get_response(self, message: str, session_id: str) -> Optional[str]:
         try:
-            # Primera interacción: crear conversación
-            if session_id not in self.conversations:
-                self.conversations[session_id] = [
-                    {"role": "system", "content": self.system_prompt}
-                ]
-                self.initial_message_sent[session_id] = False
+            # La conversación se crea al conectar (start_conversation)
+            state = await self.store.get_session(session_id)
+            if state is None:
+                # El almacén la eliminó (TTL o LRU) en plena entrevista: empezar de
+                # nuevo reenviaría la presentación y perdería el mensaje del candidato
+                raise SesionExpiradaError(session_id)
 
             # SIEMPRE devolver el mensaje hardcodeado en la primera interacción
-            if not self.initial_message_sent.get(session_id, False):
-                intro_message = "¡Hola! Soy María del BCP. Vamos a iniciar la entrevista para Analista de Datos. ¿Cuál es tu nombre completo?"
-                self.conversations[session_id].append(
-                    {"role": "assistant", "content": intro_message}
-                )
-                self.initial_message_sent[session_id] = True
-                print(
+            if not state.initial_message_sent:
+                intro_message = self.profile_for(state).presentacion
+                state.messages.append({"role": "assistant", "content": intro_message})
+                state.initial_message_sent = True
+                await self.store.save_session(session_id, state)
+                logger.info(
                     f"[CHAT SERVICE] Enviando mensaje inicial hardcodeado para sesión {session_id}"
                 )
-                print(f"[CHAT SERVICE] Mensaje: {intro_message}")
+                logger.info(f"[CHAT SERVICE] Mensaje: {intro_message}")
                 # IMPORTANTE: Retornar inmediatamente sin llamar a OpenAI
                 return intro_message
 
             # Solo procesar con OpenAI si hay un mensaje real del usuario Y ya se envió el inicial
-            if message.strip() and self.initial_message_sent.get(session_id, False):
-                self.conversations[session_id].append(
-                    {"role": "user", "content": message}
-                )
-
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=self.conversations[session_id],
-                    temperature=0.7,  # Controlado para mantener profesionalismo
-                    max_tokens=150,  # Respuestas concisas
-                )
+            if message.strip():
+                state.messages.append({"role": "user", "content": message})
+                system_prompt = self.profile_for(state).chat_prompt
+                self.context.fit(system_prompt, state)
+                await self.store.save_session(session_id, state)
+
+                # Sin streaming la primera palabra llega junto con la respuesta completa
+                with span("chat_total", "openai", self.model):
+                    response = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=self.context.build(system_prompt, state),
+                        temperature=0.7,  # Controlado para mantener profesionalismo
+                        max_tokens=150,  # Respuestas concisas
+                    )
 
                 assistant_message = response.choices[0].message.content
-                self.conversations[session_id].append(
-                    {"role": "assistant", "content": assistant_message}
-                )
-
-                if len(self.conversations[session_id]) > 20:
-                    # Mantener el prompt del sistema y los últimos 9 mensajes
-                    self.conversations[session_id] = [
-                        self.conversations[session_id][0]  # System prompt
-                    ] + self.conversations[session_id][-9:]
+                await self._append_assistant_message(session_id, assistant_message)
 
                 return assistant_message
 
             # Si no hay mensaje o es el primer mensaje vacío, no hacer nada
             return None
 
+        except SesionExpiradaError:
+            raise
         except Exception as e:
-            print(f"Error en chat: {e}")
+            logger.error(f"Error en chat: {e}")
             return None
 
-    def clear_conversation(self, session_id: str):
-        if session_id in self.conversations:
-            del self.conversations[session_id]
-        if session_id in self.initial_message_sent:
-            del self.initial_message_sent[session_id]
+    async def stream_response(
+        self, message: str, session_id: str
+    ) -> AsyncIterator[str]:
+        """Igual que get_response, pero produce los fragmentos de texto a medida que llegan"""
+        state = await self.store.get_session(session_id)
+        if state is None:
+            raise SesionExpiradaError(session_id)
+
+        # El mensaje inicial hardcodeado no pasa por OpenAI: se entrega completo
+        if not state.initial_message_sent or not message.strip():
+            response = await self.get_response(message, session_id)
+            if response:
+                yield response
+            return
+
+        state.messages.append({"role": "user", "content": message})
+        system_prompt = self.profile_for(state).chat_prompt
+        self.context.fit(system_prompt, state)
+        await self.store.save_session(session_id, state)
+
+        parts: List[str] = []
+        start = time.perf_counter()
+        try:
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=self.context.build(system_prompt, state),
+                temperature=0.7,  # Controlado para mantener profesionalismo
+                max_tokens=150,  # Respuestas concisas
+                stream=True,
+            )
+
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if not parts:
+                        observe(
+                            "chat_ttft",
+                            time.perf_counter() - start,
+                            "openai",
+                            self.model,
+                        )
+                    parts.append(delta)
+                    yield delta
+
+            observe("chat_total", time.perf_counter() - start, "openai", self.model)
+
+        except Exception as e:
+            logger.error(f"Error en chat (streaming): {e}")
+
+        finally:
+            # También se guarda una respuesta interrumpida (barge-in): el candidato la oyó
+            if parts:
+                await self._append_assistant_message(session_id, "".join(parts))
+
+    async def _append_assistant_message(self, session_id: str, assistant_message: str):
+        # La sesión pudo cerrarse mientras se generaba la respuesta
+        state = await self.store.get_session(session_id)
+        if state is None:
+            return
+
+        state.messages.append({"role": "assistant", "content": assistant_message})
+        # Mantener el prompt dentro del presupuesto de tokens
+        self.context.fit(self.profile_for(state).chat_prompt, state)
+
+        await self.store.save_session(session_id, state)
+
+    async def has_conversation(self, session_id: str) -> bool:
+        return await self.store.get_session(session_id) is not None
+
+    async def clear_conversation(self, session_id: str):
+        await self.store.delete_session(session_id)
@@ -0,0 +1,73 @@
+from groq import AsyncGroq
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from typing import Optional
+from config import settings
+import httpx
+
+# Clientes asíncronos compartidos por todo el proceso.
+# Cada uno mantiene su propio pool de conexiones keep-alive, así las llamadas
+# a los proveedores no bloquean el event loop ni reabren TLS en cada turno.
+
+_openai_client: Optional[AsyncOpenAI] = None
+_groq_client: Optional[AsyncGroq] = None
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry,
+    )
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """Cliente de OpenAI para chat, TTS y generación de preguntas"""
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url or None,
+            http_client=DefaultAsyncHttpxClient(limits=_limits()),
+        )
+    return _openai_client
+
+
+def get_groq_client() -> AsyncGroq:
+    """Cliente de Groq para transcripción"""
+    global _groq_client
+    if _groq_client is None:
+        _groq_client = AsyncGroq(
+            api_key=settings.groq_api_key,
+            base_url=settings.groq_base_url or None,
+            http_client=httpx.AsyncClient(
+                limits=_limits(),
+                timeout=httpx.Timeout(settings.groq_timeout, connect=5.0),
+            ),
+        )
+    return _groq_client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Cliente HTTP genérico (Perplexity Sonar)"""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            limits=_limits(),
+            timeout=httpx.Timeout(settings.sonar_timeout, connect=5.0),
+        )
+    return _http_client
+
+
+async def close_clients():
+    """Cierra los pools de conexiones al apagar la aplicación"""
+    global _openai_client, _groq_client, _http_client
+    if _openai_client is not None:
+        await _openai_client.close()
+        _openai_client = None
+    if _groq_client is not None:
+        await _groq_client.close()
+        _groq_client = None
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
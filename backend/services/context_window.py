@@ -0,0 +1,117 @@
+from typing import Dict, List
+from config import settings
+from services.session_store import SessionState
+import tiktoken
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Mensajes del inicio del historial que nunca se pliegan (la presentación de María).
+# Junto con el prompt de sistema forman un prefijo idéntico en todos los turnos,
+# que el proveedor puede reutilizar de su caché de prompts.
+PINNED_MESSAGES = 1
+
+# Costo fijo aproximado por mensaje en el formato de chat de OpenAI
+_TOKENS_PER_MESSAGE = 4
+
+
+class ContextWindow:
+    """Arma el prompt de cada turno dentro de un presupuesto de tokens.
+
+    Cuando el historial no entra, los turnos más antiguos se pliegan en un
+    resumen compacto que va después del prefijo estable, en lugar de
+    descartarse de golpe.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        max_prompt_tokens: int = settings.chat_max_prompt_tokens,
+        summary_max_tokens: int = settings.chat_summary_max_tokens,
+        chars_per_turn: int = settings.chat_summary_chars_per_turn,
+    ):
+        self.max_prompt_tokens = max_prompt_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.chars_per_turn = chars_per_turn
+        self._encoding = _load_encoding(model)
+
+    def count(self, text: str) -> int:
+        if self._encoding is None:
+            # Aproximación si no hay vocabulario de tiktoken disponible
+            return len(text) // 4 + 1
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def count_messages(self, messages: List[Dict[str, str]]) -> int:
+        return 2 + sum(
+            _TOKENS_PER_MESSAGE + self.count(m.get("content") or "") for m in messages
+        )
+
+    def build(self, system_prompt: str, state: SessionState) -> List[Dict[str, str]]:
+        """Mensajes a enviar: prefijo estable, resumen (si hay) y turnos recientes"""
+        messages = [{"role": "system", "content": system_prompt}]
+        messages += state.messages[:PINNED_MESSAGES]
+        if state.summary:
+            messages.append(
+                {
+                    "role": "system",
+                    "content": f"Resumen de la entrevista hasta ahora:\n{state.summary}",
+                }
+            )
+        messages += state.messages[PINNED_MESSAGES:]
+        return messages
+
+    def fit(self, system_prompt: str, state: SessionState) -> bool:
+        """Pliega turnos antiguos en el resumen hasta respetar el presupuesto.
+
+        Devuelve True si el estado cambió. Se pliega hasta el 75% del
+        presupuesto para que el resumen no cambie en cada turno.
+        """
+        total = self.count_messages(self.build(system_prompt, state))
+        if total <= self.max_prompt_tokens:
+            return False
+
+        pinned = state.messages[:PINNED_MESSAGES]
+        recent = list(state.messages[PINNED_MESSAGES:])
+        target = int(self.max_prompt_tokens * 0.75)
+
+        changed = False
+        # Siempre se conserva al menos el último mensaje (la pregunta en curso)
+        while len(recent) > 1 and total > target:
+            state.summary = self._fold(state.summary, recent.pop(0))
+            state.messages = pinned + recent
+            total = self.count_messages(self.build(system_prompt, state))
+            changed = True
+
+        return changed
+
+    def _fold(self, summary: str, message: Dict[str, str]) -> str:
+        lines = summary.splitlines() if summary else []
+        speaker = "Candidato" if message["role"] == "user" else "María"
+        lines.append(f"- {speaker}: {self._compact(message.get('content') or '')}")
+
+        # El resumen también tiene tope: se conserva la primera línea (suele traer
+        # el nombre del candidato) y se descartan las más antiguas después de ella
+        while len(lines) > 2 and self.count("\n".join(lines)) > self.summary_max_tokens:
+            del lines[1]
+        return "\n".join(lines)
+
+    def _compact(self, text: str) -> str:
+        text = " ".join(text.split())
+        if len(text) <= self.chars_per_turn:
+            return text
+        cut = text[: self.chars_per_turn].rsplit(" ", 1)[0]
+        return f"{cut}…"
+
+
+def _load_encoding(model: str):
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # tiktoken descarga el vocabulario la primera vez; sin red se aproxima
+        logger.warning(
+            f"[CONTEXT] No se pudo cargar el tokenizador ({e}); usando aproximación"
+        )
+        return None
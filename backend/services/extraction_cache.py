@@ -0,0 +1,76 @@
+from typing import Any, Dict, Optional
+from config import settings
+from services.sqlite_kv import SQLiteKV
+import asyncio
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Cambiar si cambia el prompt de extracción: invalida lo guardado antes
+EXTRACTION_VERSION = "1"
+
+
+class ExtractionCache:
+    """Memo persistente de la extracción de propuestas laborales.
+
+    Los reclutadores vuelven a enviar exactamente el mismo texto (un candidato
+    nuevo, un reintento), así que el resultado del modelo se guarda por hash
+    del contenido. El archivo está acotado a `max_entries`; al superarlo se
+    descartan las entradas usadas hace más tiempo.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        self.max_entries = max_entries
+        self._store = SQLiteKV(path, "extraction")
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, texto: str) -> str:
+        payload = json.dumps(
+            [EXTRACTION_VERSION, model, texto.strip()], ensure_ascii=False
+        ).encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = await asyncio.to_thread(self._store.get, key)
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        await asyncio.to_thread(self._store.touch, key)
+        return json.loads(row[0])
+
+    async def set(self, key: str, datos: Dict[str, Any]):
+        try:
+            value = json.dumps(datos, ensure_ascii=False)
+            await asyncio.to_thread(self._write, key, value)
+        except Exception as e:
+            logger.warning(f"[EXTRACTION CACHE] No se pudo guardar: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._store.count(),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def close(self):
+        self._store.close()
+
+    def _write(self, key: str, value: str):
+        self._store.set(key, value)
+        if self.max_entries:
+            self._store.trim(self.max_entries)
+
+
+extraction_cache = ExtractionCache(
+    path=settings.extraction_cache_path,
+    max_entries=settings.extraction_cache_max_entries,
+)
@@ -0,0 +1,148 @@
+from typing import Dict, List, Optional
+from config import settings
+from services.question_bank import DEFAULT_PATH, QuestionBank, question_bank
+import json
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(__file__))
+
+
+class InterviewProfile:
+    """Una entrevista: empresa, puesto, preguntas, guion y estilo de voz.
+
+    Cada perfil es un directorio con:
+
+    - perfil.json: empresa, puesto, presentacion, redireccion y preguntas_archivo
+    - chat.md: prompt del chat con {presentacion}, {redireccion} y {preguntas}
+    - voz.md: instrucciones de voz para el TTS
+
+    Los prompts se compilan una sola vez y se reutiliza el mismo string en
+    todas las sesiones del perfil: el prefijo que recibe el proveedor es
+    idéntico byte a byte y su caché de prompts se mantiene caliente. El de
+    chat solo se recompila si cambia el archivo de preguntas.
+    """
+
+    def __init__(
+        self,
+        profile_id: str,
+        empresa: str,
+        puesto: str,
+        presentacion: str,
+        redireccion: str,
+        chat_template: str,
+        tts_prompt: str,
+        bank: QuestionBank,
+    ):
+        self.id = profile_id
+        self.empresa = empresa
+        self.puesto = puesto
+        self.presentacion = presentacion
+        self.redireccion = redireccion
+        self.chat_template = chat_template
+        self.tts_prompt = tts_prompt
+        self.question_bank = bank
+        self._chat_prompt = ""
+        self._chat_prompt_version = None
+
+    @property
+    def scripted_lines(self) -> List[str]:
+        """Líneas fijas del guion: su audio conviene tenerlo listo de antemano"""
+        return [self.presentacion, self.redireccion]
+
+    @property
+    def chat_prompt(self) -> str:
+        """Prompt de sistema del chat; solo se recompila si cambian las preguntas"""
+        preguntas, version = self.question_bank.get()
+        if version != self._chat_prompt_version:
+            self._chat_prompt = self._compile_chat_prompt(preguntas)
+            self._chat_prompt_version = version
+        return self._chat_prompt
+
+    def _compile_chat_prompt(self, preguntas: List[Dict]) -> str:
+        # Formatear las preguntas para incluir en el prompt
+        preguntas_formato = "\n".join(
+            [f"{i+1}. {p['pregunta']}" for i, p in enumerate(preguntas)]
+        )
+        # replace y no format: el prompt puede traer llaves literales
+        return (
+            self.chat_template.replace("{presentacion}", self.presentacion)
+            .replace("{redireccion}", self.redireccion)
+            .replace("{preguntas}", preguntas_formato)
+        )
+
+    @classmethod
+    def load(cls, directory: str, banks: Dict[str, QuestionBank]) -> "InterviewProfile":
+        with open(os.path.join(directory, "perfil.json"), "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        preguntas_path = os.path.normpath(
+            os.path.join(directory, data.get("preguntas_archivo", "preguntas.json"))
+        )
+        # Perfiles que usan el mismo archivo comparten un solo banco de preguntas
+        bank = banks.get(preguntas_path)
+        if bank is None:
+            bank = banks[preguntas_path] = QuestionBank(preguntas_path)
+        bank.refresh()
+
+        return cls(
+            profile_id=os.path.basename(os.path.normpath(directory)),
+            empresa=data["empresa"],
+            puesto=data["puesto"],
+            presentacion=data["presentacion"],
+            redireccion=data["redireccion"],
+            chat_template=_read_prompt(os.path.join(directory, "chat.md")),
+            tts_prompt=_read_prompt(os.path.join(directory, "voz.md")),
+            bank=bank,
+        )
+
+
+class ProfileRegistry:
+    """Perfiles de entrevista disponibles, cargados una vez desde un directorio"""
+
+    def __init__(self, directory: str, default_id: str):
+        self.directory = os.path.join(BACKEND_DIR, directory)
+        self.default_id = default_id
+        self._profiles: Dict[str, InterviewProfile] = {}
+        # preguntas.json ya lo carga el banco compartido que usa /api/preguntas
+        self._banks: Dict[str, QuestionBank] = {
+            os.path.normpath(DEFAULT_PATH): question_bank
+        }
+        self.load()
+
+    @property
+    def default(self) -> InterviewProfile:
+        return self._profiles[self.default_id]
+
+    def ids(self) -> List[str]:
+        return sorted(self._profiles)
+
+    def get(self, profile_id: Optional[str] = None) -> InterviewProfile:
+        """Perfil pedido (o el por defecto); KeyError si no existe"""
+        return self._profiles[profile_id or self.default_id]
+
+    def load(self):
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if not os.path.isfile(os.path.join(path, "perfil.json")):
+                continue
+            try:
+                self._profiles[name] = InterviewProfile.load(path, self._banks)
+            except Exception as e:
+                # Un perfil roto no impide levantar los demás
+                logger.warning(f"[PERFILES] No se pudo cargar {name}: {e}")
+
+        if self.default_id not in self._profiles:
+            raise ValueError(f"No se encontró el perfil por defecto: {self.default_id}")
+        logger.info(f"[PERFILES] Perfiles cargados: {', '.join(self.ids())}")
+
+
+def _read_prompt(path: str) -> str:
+    # Sin el salto de línea final que agregan los editores
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().rstrip("\n")
+
+
+interview_profiles = ProfileRegistry(settings.profiles_dir, settings.default_profile)
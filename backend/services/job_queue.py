@@ -0,0 +1,351 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from config import settings
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_FINALES = ("done", "error")
+
+
+class JobQueue:
+    """Cola de trabajos persistente (SQLite) con un pool de workers locales.
+
+    Pensada para generaciones largas que no deben depender de que la conexión
+    HTTP siga abierta:
+
+    - Un trabajo idéntico (mismo tipo y mismos datos) que ya está en cola, en
+      curso o terminado se reutiliza en lugar de encolarse otra vez.
+    - Cada worker toma un trabajo con un lease que renueva mientras lo procesa.
+      Si el proceso muere o se reinicia, el lease vence y el trabajo vuelve a
+      tomarse, hasta `max_attempts` veces.
+    - Varios procesos pueden compartir el mismo archivo.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        workers: int,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 30.0,
+        max_attempts: int = 3,
+        retention_seconds: float = 7 * 24 * 3600,
+    ):
+        self.path = path
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retention_seconds = retention_seconds
+
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[Dict]]] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._jobs: Set[asyncio.Task] = set()
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._watchers: Dict[str, Set[asyncio.Event]] = {}
+        self._running = 0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        # isolation_level=None: las transacciones se abren explícitamente
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, timeout=5, isolation_level=None
+        )
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, input_hash TEXT NOT NULL, "
+                "payload TEXT NOT NULL, status TEXT NOT NULL, result TEXT, error TEXT, "
+                "attempts INTEGER NOT NULL DEFAULT 0, lease_until REAL, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_input_hash ON jobs (input_hash)"
+            )
+
+    def register(self, kind: str, handler: Callable[[Dict[str, Any]], Awaitable[Dict]]):
+        """Asocia un tipo de trabajo con la corrutina que lo procesa"""
+        self._handlers[kind] = handler
+
+    async def submit(self, kind: str, payload: Dict[str, Any]) -> Tuple[Dict, bool]:
+        """Encola un trabajo; devuelve (trabajo, True si ya existía uno idéntico)"""
+        if kind not in self._handlers:
+            raise ValueError(f"Tipo de trabajo desconocido: {kind}")
+
+        input_hash = hashlib.sha256(
+            json.dumps([kind, payload], sort_keys=True, ensure_ascii=False).encode(
+                "utf-8"
+            )
+        ).hexdigest()
+        job, duplicated = await asyncio.to_thread(
+            self._insert, kind, input_hash, payload
+        )
+        if not duplicated:
+            self._wakeup.set()
+        return job, duplicated
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        return await asyncio.to_thread(self._read, job_id)
+
+    async def wait_for_change(self, job_id: str, timeout: float):
+        """Espera a que un worker de este proceso actualice el trabajo (o el timeout)"""
+        event = asyncio.Event()
+        self._watchers.setdefault(job_id, set()).add(event)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            watchers = self._watchers.get(job_id)
+            if watchers is not None:
+                watchers.discard(event)
+                if not watchers:
+                    del self._watchers[job_id]
+
+    async def start(self):
+        self._stopping = False
+        purged = await asyncio.to_thread(self._purge)
+        if purged:
+            logger.info(f"[JOBS] {purged} trabajos antiguos eliminados")
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self):
+        # Los workers no se cancelan: en 3.11 wait_for puede perder una cancelación
+        # que llega justo cuando termina la espera y el worker seguiría en el loop.
+        # Se les avisa con la bandera y solo se cancelan los trabajos en curso, que
+        # quedan "running" y se retoman al vencer el lease
+        self._stopping = True
+        self._wakeup.set()
+        for task in self._jobs:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(
+                self._conn.execute(
+                    "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+                ).fetchall()
+            )
+        return {
+            "workers": len(self._tasks),
+            "running_here": self._running,
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "error": counts.get("error", 0),
+        }
+
+    async def _worker(self):
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                job = await asyncio.to_thread(self._claim)
+            except sqlite3.Error as e:
+                logger.error(f"[JOBS] Error tomando un trabajo: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            if self._stopping:
+                # Se tomó mientras se detenía la cola: se retoma al vencer el lease
+                break
+
+            task = asyncio.create_task(self._run(job))
+            self._jobs.add(task)
+            task.add_done_callback(self._jobs.discard)
+            # wait() no propaga la cancelación del trabajo que hace stop()
+            await asyncio.wait({task})
+
+    async def _run(self, job: Dict):
+        self._running += 1
+        self._notify(job["id"])
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+        try:
+            result = await self._handlers[job["kind"]](job["payload"])
+            await self._save(job["id"], "done", result, None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[JOBS] Trabajo {job['id']} falló: {e}")
+            await self._save(job["id"], "error", None, str(e))
+        finally:
+            heartbeat.cancel()
+            self._running -= 1
+            self._notify(job["id"])
+
+    async def _save(
+        self, job_id: str, status: str, result: Optional[Dict], error: Optional[str]
+    ):
+        # Un error de SQLite acá no debe matar al worker; el trabajo queda
+        # "running" y se retoma al vencer el lease
+        try:
+            await asyncio.to_thread(self._finish, job_id, status, result, error)
+        except sqlite3.Error as e:
+            logger.error(f"[JOBS] No se pudo guardar el estado de {job_id}: {e}")
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await asyncio.to_thread(self._renew, job_id)
+            except sqlite3.Error as e:
+                logger.warning(f"[JOBS] No se pudo renovar el lease de {job_id}: {e}")
+
+    def _notify(self, job_id: str):
+        for event in self._watchers.get(job_id, ()):
+            event.set()
+
+    # Operaciones bloqueantes sobre SQLite (se llaman con asyncio.to_thread)
+
+    def _insert(self, kind: str, input_hash: str, payload: Dict) -> Tuple[Dict, bool]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Un trabajo fallido no bloquea un reintento con los mismos datos
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE input_hash = ? AND status != 'error' "
+                    "ORDER BY created_at DESC LIMIT 1",
+                    (input_hash,),
+                ).fetchone()
+                if row is None:
+                    job_id = uuid.uuid4().hex
+                    self._conn.execute(
+                        "INSERT INTO jobs (id, kind, input_hash, payload, status, "
+                        "created_at, updated_at) VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                        (
+                            job_id,
+                            kind,
+                            input_hash,
+                            json.dumps(payload, ensure_ascii=False),
+                            now,
+                            now,
+                        ),
+                    )
+                    row = self._conn.execute(
+                        "SELECT * FROM jobs WHERE id = ?", (job_id,)
+                    ).fetchone()
+                    duplicated = False
+                else:
+                    duplicated = True
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return _row_to_job(row), duplicated
+
+    def _claim(self) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = self._conn.execute(
+                        "SELECT * FROM jobs WHERE status = 'queued' "
+                        "OR (status = 'running' AND lease_until < ?) "
+                        "ORDER BY created_at LIMIT 1",
+                        (now,),
+                    ).fetchone()
+                    if row is None:
+                        break
+                    if row["attempts"] >= self.max_attempts:
+                        self._conn.execute(
+                            "UPDATE jobs SET status = 'error', error = ?, "
+                            "updated_at = ? WHERE id = ?",
+                            ("Se agotaron los intentos", now, row["id"]),
+                        )
+                        continue
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+                        "lease_until = ?, updated_at = ? WHERE id = ?",
+                        (now + self.lease_seconds, now, row["id"]),
+                    )
+                    break
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return _row_to_job(row) if row is not None else None
+
+    def _renew(self, job_id: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = 'running'",
+                (time.time() + self.lease_seconds, job_id),
+            )
+
+    def _finish(
+        self, job_id: str, status: str, result: Optional[Dict], error: Optional[str]
+    ):
+        value = json.dumps(result, ensure_ascii=False) if result is not None else None
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, "
+                "lease_until = NULL, updated_at = ? WHERE id = ?",
+                (status, value, error, time.time(), job_id),
+            )
+
+    def _read(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return _row_to_job(row) if row is not None else None
+
+    def _purge(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'error') AND updated_at < ?",
+                (time.time() - self.retention_seconds,),
+            ).rowcount
+
+
+def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "kind": row["kind"],
+        "status": row["status"],
+        "payload": json.loads(row["payload"]),
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "error": row["error"],
+        "attempts": row["attempts"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+
+
+job_queue = JobQueue(
+    path=settings.jobs_db_path,
+    workers=settings.job_workers,
+    poll_interval=settings.job_poll_interval_seconds,
+    lease_seconds=settings.job_lease_seconds,
+    max_attempts=settings.job_max_attempts,
+    retention_seconds=settings.job_retention_seconds,
+)
@@ -0,0 +1,32 @@
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import logging
+import queue
+import sys
+
+_listener = None
+
+
+def configure_logging(level: str = "INFO"):
+    """Logging sin bloqueo: los handlers encolan y un hilo aparte escribe a stdout.
+
+    Así un stdout lento (un pipe lleno, un recolector de logs) no frena el
+    event loop en medio de un turno.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    records: queue.Queue = queue.Queue(-1)
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+    _listener = QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    # Vaciar la cola antes de salir para no perder los últimos mensajes
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(records)]
+    root.setLevel(level.upper())
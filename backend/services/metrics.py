@@ -0,0 +1,93 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Tuple
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+import asyncio
+import os
+import time
+
+# Desde 1 ms (decodificar, ensamblar) hasta decenas de segundos (proveedores lentos)
+_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 8.0, 13.0, 21.0, 34.0,
+)  # fmt: skip
+
+STAGE_SECONDS = Histogram(
+    "entrevistas_stage_seconds",
+    "Duración de cada etapa del turno de entrevista",
+    ["stage", "provider", "model"],
+    buckets=_BUCKETS,
+)
+STAGE_ERRORS = Counter(
+    "entrevistas_stage_errors_total",
+    "Etapas que terminaron con error",
+    ["stage", "provider", "model"],
+)
+
+# Estado del almacén de sesiones; con varios workers se suman los procesos vivos
+SESSIONS = Gauge(
+    "entrevistas_sessions",
+    "Sesiones guardadas en el almacén de este proceso",
+    multiprocess_mode="livesum",
+)
+SESSION_BYTES = Gauge(
+    "entrevistas_session_bytes",
+    "Bytes aproximados del historial de las sesiones en memoria",
+    multiprocess_mode="livesum",
+)
+SESSIONS_EVICTED = Gauge(
+    "entrevistas_sessions_evicted",
+    "Sesiones eliminadas por el almacén desde que arrancó el proceso",
+    ["reason"],
+    multiprocess_mode="livesum",
+)
+
+
+def observe(stage: str, seconds: float, provider: str = "local", model: str = ""):
+    STAGE_SECONDS.labels(stage, provider, model).observe(seconds)
+
+
+@contextmanager
+def span(stage: str, provider: str = "local", model: str = ""):
+    """Mide una etapa; los errores se cuentan aparte y no entran al histograma.
+
+    Una etapa cancelada (barge-in, desconexión) no se registra: su duración
+    no dice nada de la latencia real.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        STAGE_ERRORS.labels(stage, provider, model).inc()
+        raise
+    observe(stage, time.perf_counter() - start, provider, model)
+
+
+def record_session_store(stats: Dict[str, Any]):
+    """Copia a los gauges lo que informa SessionStore.stats() (solo lo que exista)"""
+    if "sessions" in stats:
+        SESSIONS.set(stats["sessions"])
+    if "approx_bytes" in stats:
+        SESSION_BYTES.set(stats["approx_bytes"])
+    for reason in ("ttl", "lru"):
+        if f"evicted_{reason}" in stats:
+            SESSIONS_EVICTED.labels(reason).set(stats[f"evicted_{reason}"])
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Exposición para /metrics; con varios workers se suman los de todos los procesos"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
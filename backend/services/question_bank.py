@@ -0,0 +1,92 @@
+from typing import Any, Dict, List, Tuple
+import hashlib
+import json
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "preguntas.json"
+)
+
+
+class QuestionBank:
+    """preguntas.json cargado una sola vez y compartido por la API y el chat.
+
+    Cada acceso solo hace un stat del archivo: si su mtime o tamaño cambian se
+    vuelve a leer y `version` aumenta, así quien arma prompts a partir de las
+    preguntas sabe que debe rehacerlos sin reiniciar el proceso. El cuerpo de
+    GET /api/preguntas y su ETag quedan serializados de antemano.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self.version = 0
+        self._signature = None
+        self._preguntas: List[Dict[str, Any]] = []
+        self._body = b""
+        self._etag = ""
+
+    def get(self) -> Tuple[List[Dict[str, Any]], int]:
+        """Preguntas vigentes y su versión"""
+        self.refresh()
+        return self._preguntas, self.version
+
+    def response(self) -> Tuple[bytes, str]:
+        """Cuerpo JSON pre-serializado y su ETag"""
+        self.refresh()
+        return self._body, self._etag
+
+    def refresh(self) -> bool:
+        """Recarga si el archivo cambió; devuelve True si hubo recarga"""
+        try:
+            stat = os.stat(self.path)
+        except OSError as e:
+            if not self.version:
+                raise
+            # Un guardado atómico deja el archivo ausente por un instante: se
+            # sigue sirviendo la versión cargada y se reintenta en el próximo acceso
+            logger.warning(f"[PREGUNTAS] No se pudo leer {self.path}: {e}")
+            return False
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return False
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                preguntas = json.load(f)["preguntas_entrevista"]
+        except (OSError, ValueError, KeyError) as e:
+            # Sin una versión anterior no hay nada que servir
+            if not self.version:
+                raise
+            # Un archivo a medio guardar no debe tumbar lo que ya funcionaba;
+            # se vuelve a intentar cuando el archivo cambie otra vez
+            logger.warning(f"[PREGUNTAS] No se pudo recargar {self.path}: {e}")
+            self._signature = signature
+            return False
+
+        body = json.dumps(preguntas, ensure_ascii=False).encode("utf-8")
+        self._preguntas = preguntas
+        self._body = body
+        self._etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        self._signature = signature
+        self.version += 1
+        if self.version > 1:
+            logger.info(f"[PREGUNTAS] Banco recargado ({len(preguntas)} preguntas)")
+        return True
+
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    """Compara un ETag con un If-None-Match (lista separada por comas o "*")"""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        # If-None-Match usa comparación débil: W/"x" equivale a "x"
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+question_bank = QuestionBank()
@@ -0,0 +1,147 @@
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+from config import settings
+from services.sqlite_kv import SQLiteKV
+import asyncio
+import json
+import time
+import unicodedata
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ResearchCache:
+    """Caché persistente de investigaciones (búsquedas en Sonar).
+
+    Muchos candidatos postulan a las mismas empresas y puestos, así que el
+    resultado de una búsqueda se reutiliza:
+
+    - Más nuevo que `ttl_seconds`: se devuelve tal cual.
+    - Vencido pero dentro de `stale_seconds` extra: se devuelve de inmediato y
+      se refresca en segundo plano (stale-while-revalidate).
+    - Más viejo o inexistente: se consulta y se espera.
+
+    Las consultas idénticas en vuelo se comparten (single-flight). Una consulta
+    que falla no se guarda.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, stale_seconds: float = 0):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._store = SQLiteKV(path, "research")
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._refreshes: Set[asyncio.Future] = set()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refresh_errors = 0
+
+    @staticmethod
+    def make_key(kind: str, *parts: str) -> str:
+        """Clave normalizada: 'BCP ', 'bcp' y 'Bcp' comparten entrada"""
+        return ":".join([kind, *(_normalize(part) for part in parts)])
+
+    async def get_or_fetch(
+        self, key: str, fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        row = await asyncio.to_thread(self._store.get, key)
+        if row is not None:
+            value, created_at = row
+            age = time.time() - created_at
+            if age < self.ttl_seconds:
+                self.hits += 1
+                return json.loads(value)
+            if age < self.ttl_seconds + self.stale_seconds:
+                self.stale_hits += 1
+                self._refresh(key, fetch)
+                return json.loads(value)
+
+        self.misses += 1
+        return await self._fetch(key, fetch)
+
+    async def refresh(self, key: str, fetch: Callable[[], Awaitable[Dict[str, Any]]]):
+        """Consulta y guarda aunque la entrada siga vigente (pre-calentado)"""
+        return await self._fetch(key, fetch)
+
+    def age(self, key: str) -> Optional[float]:
+        row = self._store.get(key)
+        return time.time() - row[1] if row else None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": self._store.count(),
+            "ttl_seconds": self.ttl_seconds,
+            "stale_seconds": self.stale_seconds,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+            "refresh_errors": self.refresh_errors,
+            "hit_ratio": (
+                round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0
+            ),
+        }
+
+    def close(self):
+        for future in self._refreshes:
+            future.cancel()
+        self._store.close()
+
+    def _fetch(self, key: str, fetch) -> Awaitable[Dict[str, Any]]:
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._start(key, fetch)
+        else:
+            self.coalesced += 1
+        # shield: si un solicitante se cancela, la consulta sigue para los demás
+        return asyncio.shield(future)
+
+    def _refresh(self, key: str, fetch):
+        if key in self._inflight:
+            return
+        future = self._start(key, fetch)
+        self._refreshes.add(future)
+        future.add_done_callback(self._on_refresh_done)
+
+    def _start(self, key: str, fetch) -> asyncio.Future:
+        future = asyncio.ensure_future(self._fetch_and_store(key, fetch))
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return future
+
+    def _on_refresh_done(self, future: asyncio.Future):
+        self._refreshes.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            # Se sigue sirviendo la entrada vencida hasta que un refresco funcione
+            self.refresh_errors += 1
+            logger.error(f"[RESEARCH CACHE] Error al refrescar: {future.exception()}")
+
+    async def _fetch_and_store(self, key: str, fetch) -> Dict[str, Any]:
+        value = await fetch()
+        now = time.time()
+        await asyncio.to_thread(
+            self._store.set, key, json.dumps(value, ensure_ascii=False), now
+        )
+        # Purgar lo que ya ni siquiera sirve como respaldo vencido
+        await asyncio.to_thread(
+            self._store.delete_older_than,
+            now - self.ttl_seconds - self.stale_seconds,
+        )
+        return value
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.lower().split())
+
+
+research_cache = ResearchCache(
+    path=settings.research_cache_path,
+    ttl_seconds=settings.research_cache_ttl_seconds,
+    stale_seconds=settings.research_cache_stale_seconds,
+)
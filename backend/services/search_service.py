@@ -1,15 +1,23 @@
 from pydantic import BaseModel
-from typing import List, Dict, Optional
-from openai import OpenAI
-import requests
+from config import settings
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Optional, Tuple
+from services.clients import get_http_client, get_openai_client
+from services.extraction_cache import extraction_cache
+from services.job_queue import job_queue
+from services.research_cache import research_cache
+import asyncio
+import httpx
+import json
 import os
+import re
 from dotenv import load_dotenv
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Cargar variables de entorno
 load_dotenv()
 
-# Configurar cliente OpenAI
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 SONAR_API_KEY = os.getenv("SONAR_API_KEY")
 
 
@@ -45,9 +53,15 @@ class RespuestaEntrevista(BaseModel):
     propuesta_extraida: Dict
 
 
-def extraer_informacion_propuesta(texto: str) -> PropuestaLaboral:
+async def extraer_informacion_propuesta(texto: str) -> PropuestaLaboral:
     """Extrae información básica de un texto de propuesta laboral"""
 
+    # El mismo texto ya extraído antes no vuelve a pasar por el modelo
+    clave = extraction_cache.make_key("gpt-4o-mini", texto)
+    datos = await extraction_cache.get(clave)
+    if datos is not None:
+        return PropuestaLaboral(**datos)
+
     prompt = f"""
     Analiza el siguiente texto y extrae en formato JSON:
     
@@ -65,7 +79,7 @@ def extraer_informacion_propuesta(texto: str) -> PropuestaLaboral:
     """
 
     try:
-        response = client.chat.completions.create(
+        response = await get_openai_client().chat.completions.create(
             model="gpt-4o-mini",
             messages=[
                 {
@@ -78,22 +92,13 @@ def extraer_informacion_propuesta(texto: str) -> PropuestaLaboral:
             response_format={"type": "json_object"},
         )
 
-        import json
-
-        datos = json.loads(response.choices[0].message.content)
-
-        # Manejar el caso donde requisitos es un diccionario
-        if isinstance(datos.get("requisitos"), dict):
-            requisitos_dict = datos["requisitos"]
-            requisitos_text = []
-            for categoria, contenido in requisitos_dict.items():
-                requisitos_text.append(f"{categoria.capitalize()}: {contenido}")
-            datos["requisitos"] = "; ".join(requisitos_text)
-
-        return PropuestaLaboral(**datos)
+        propuesta = parsear_propuesta(response.choices[0].message.content)
+        # Solo se memoriza una extracción válida, nunca el resultado de respaldo
+        await extraction_cache.set(clave, propuesta.model_dump())
+        return propuesta
 
     except Exception as e:
-        print(f"Error: {e}")
+        logger.error(f"Error: {e}")
         return PropuestaLaboral(
             empresa="Empresa no identificada",
             puesto="Puesto no identificado",
@@ -102,13 +107,46 @@ def extraer_informacion_propuesta(texto: str) -> PropuestaLaboral:
         )
 
 
-def buscar_con_sonar(query: str) -> SonarResponse:
+def parsear_propuesta(contenido: str) -> PropuestaLaboral:
+    """Convierte el JSON devuelto por el modelo en una PropuestaLaboral.
+
+    No hace E/S: es el post-procesamiento puro de la extracción (se mide en
+    benchmarks/).
+    """
+    datos = json.loads(contenido)
+
+    # Manejar el caso donde requisitos es un diccionario
+    if isinstance(datos.get("requisitos"), dict):
+        requisitos_dict = datos["requisitos"]
+        requisitos_text = []
+        for categoria, valor in requisitos_dict.items():
+            requisitos_text.append(f"{categoria.capitalize()}: {valor}")
+        datos["requisitos"] = "; ".join(requisitos_text)
+
+    return PropuestaLaboral(**datos)
+
+
+async def buscar_con_sonar(query: str) -> SonarResponse:
     """Busca información usando Sonar de Perplexity de forma básica"""
 
     if not SONAR_API_KEY:
         return SonarResponse(contenido="API key no configurada", fuentes=[])
 
-    url = "https://api.perplexity.ai/chat/completions"
+    try:
+        return SonarResponse(**await consultar_sonar(query))
+
+    except httpx.HTTPStatusError:
+        return SonarResponse(contenido="Error en la búsqueda", fuentes=[])
+
+    except Exception as e:
+        logger.error(f"Error en Sonar: {e}")
+        return SonarResponse(contenido="Información no disponible", fuentes=[])
+
+
+async def consultar_sonar(query: str) -> Dict:
+    """Consulta a Sonar; a diferencia de buscar_con_sonar, los errores se propagan"""
+
+    url = f"{settings.sonar_base_url.rstrip('/')}/chat/completions"
     headers = {
         "Authorization": f"Bearer {SONAR_API_KEY}",
         "Content-Type": "application/json",
@@ -121,33 +159,62 @@ def buscar_con_sonar(query: str) -> SonarResponse:
         "temperature": 0.3,
     }
 
+    response = await get_http_client().post(url, json=payload, headers=headers)
+    response.raise_for_status()
+
+    data = response.json()
+    content = data["choices"][0]["message"]["content"]
+
+    # Extraer fuentes básicas si existen
+    fuentes = []
+    if "search_results" in data:
+        for i, result in enumerate(data["search_results"][:2]):
+            fuentes.append(
+                {
+                    "titulo": result.get("title", "Sin título"),
+                    "url": result.get("url", "Sin URL"),
+                }
+            )
+
+    return {"contenido": content, "fuentes": fuentes}
+
+
+async def _buscar_con_cache(query: str, tipo: str, *claves: str) -> SonarResponse:
+    """Como buscar_con_sonar, pero pasando por la caché de investigaciones"""
+
+    if not SONAR_API_KEY:
+        return SonarResponse(contenido="API key no configurada", fuentes=[])
+
     try:
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
-
-        if response.status_code == 200:
-            data = response.json()
-            content = data["choices"][0]["message"]["content"]
-
-            # Extraer fuentes básicas si existen
-            fuentes = []
-            if "search_results" in data:
-                for i, result in enumerate(data["search_results"][:2]):
-                    fuentes.append(
-                        {
-                            "titulo": result.get("title", "Sin título"),
-                            "url": result.get("url", "Sin URL"),
-                        }
-                    )
-
-            return SonarResponse(contenido=content, fuentes=fuentes)
-        else:
-            return SonarResponse(contenido="Error en la búsqueda", fuentes=[])
+        datos = await research_cache.get_or_fetch(
+            research_cache.make_key(tipo, *claves), lambda: consultar_sonar(query)
+        )
+        return SonarResponse(**datos)
+
+    except httpx.HTTPStatusError:
+        return SonarResponse(contenido="Error en la búsqueda", fuentes=[])
 
     except Exception as e:
-        print(f"Error en Sonar: {e}")
+        logger.error(f"Error en Sonar: {e}")
         return SonarResponse(contenido="Información no disponible", fuentes=[])
 
 
+async def buscar_empresa(empresa: str, puesto: str) -> SonarResponse:
+    return await _buscar_con_cache(
+        crear_prompt_empresa(empresa, puesto), "empresa", empresa, puesto
+    )
+
+
+async def buscar_mercado(puesto: str) -> SonarResponse:
+    return await _buscar_con_cache(crear_prompt_mercado(puesto), "mercado", puesto)
+
+
+async def buscar_entrevistador(nombre: str) -> SonarResponse:
+    return await _buscar_con_cache(
+        crear_prompt_entrevistador(nombre), "entrevistador", nombre
+    )
+
+
 # Prompts optimizados para búsquedas específicas
 def crear_prompt_empresa(empresa: str, puesto: str) -> str:
     """Prompt optimizado para buscar información de la empresa"""
@@ -203,10 +270,10 @@ def crear_prompt_entrevistador(nombre: str) -> str:
 Enfócate en información que ayude a establecer conexión profesional."""
 
 
-def generar_preguntas(
+def _mensajes_preguntas(
     propuesta: PropuestaLaboral, informacion_empresa: str = ""
-) -> dict:
-    """Genera preguntas básicas de entrevista"""
+) -> List[Dict[str, str]]:
+    """Prompt de las preguntas básicas (compartido por la versión en streaming)"""
 
     contexto = (
         f"Información de la empresa: {informacion_empresa}"
@@ -234,16 +301,24 @@ def generar_preguntas(
     }}
     """
 
+    return [
+        {
+            "role": "system",
+            "content": "Genera preguntas de entrevista en formato JSON.",
+        },
+        {"role": "user", "content": prompt},
+    ]
+
+
+async def generar_preguntas(
+    propuesta: PropuestaLaboral, informacion_empresa: str = ""
+) -> dict:
+    """Genera preguntas básicas de entrevista"""
+
     try:
-        response = client.chat.completions.create(
+        response = await get_openai_client().chat.completions.create(
             model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Genera preguntas de entrevista en formato JSON.",
-                },
-                {"role": "user", "content": prompt},
-            ],
+            messages=_mensajes_preguntas(propuesta, informacion_empresa),
             temperature=0.7,
             response_format={"type": "json_object"},
         )
@@ -254,11 +329,95 @@ def generar_preguntas(
         return {"preguntas": resultado.get("preguntas", [])}
 
     except Exception as e:
-        print(f"Error generando preguntas: {e}")
+        logger.error(f"Error generando preguntas: {e}")
         return {"preguntas": []}
 
 
-def generar_preguntas_contextualizadas(
+async def generar_preguntas_stream(
+    propuesta: PropuestaLaboral, informacion_empresa: str = ""
+) -> AsyncIterator[str]:
+    """Como generar_preguntas, pero entrega cada pregunta apenas se completa"""
+
+    response = await get_openai_client().chat.completions.create(
+        model="gpt-4o-mini",
+        messages=_mensajes_preguntas(propuesta, informacion_empresa),
+        temperature=0.7,
+        response_format={"type": "json_object"},
+        stream=True,
+    )
+
+    extractor = ExtractorArregloJSON("preguntas")
+    async for chunk in response:
+        if not chunk.choices:
+            continue
+        for pregunta in extractor.feed(chunk.choices[0].delta.content or ""):
+            yield pregunta
+
+
+class ExtractorArregloJSON:
+    """Extrae los strings de un arreglo de un JSON que llega en fragmentos.
+
+    Cada elemento se devuelve en cuanto se cierra su comilla, sin esperar el
+    resto del documento. Solo entiende arreglos de strings, que es lo que
+    piden los prompts de preguntas.
+    """
+
+    def __init__(self, campo: str):
+        self._inicio = re.compile(rf'"{re.escape(campo)}"\s*:\s*\[')
+        self._buffer = ""
+        self._pos = 0
+        self._en_arreglo = False
+        self._terminado = False
+
+    def feed(self, texto: str) -> List[str]:
+        self._buffer += texto
+        elementos = []
+
+        while not self._terminado:
+            if not self._en_arreglo:
+                match = self._inicio.search(self._buffer, self._pos)
+                if not match:
+                    break
+                self._pos = match.end()
+                self._en_arreglo = True
+                continue
+
+            while (
+                self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\r\n,"
+            ):
+                self._pos += 1
+            if self._pos >= len(self._buffer):
+                break
+
+            if self._buffer[self._pos] != '"':
+                # Fin del arreglo (o algo que no es un string): no hay más elementos
+                self._terminado = True
+                break
+
+            fin = self._fin_de_string(self._pos + 1)
+            if fin is None:
+                break
+            # strict=False: tolera saltos de línea literales dentro de la pregunta
+            elementos.append(
+                json.loads(self._buffer[self._pos : fin + 1], strict=False)
+            )
+            self._pos = fin + 1
+
+        return elementos
+
+    def _fin_de_string(self, pos: int) -> Optional[int]:
+        while pos < len(self._buffer):
+            caracter = self._buffer[pos]
+            if caracter == "\\":
+                pos += 2
+                continue
+            if caracter == '"':
+                return pos
+            pos += 1
+        return None
+
+
+async def generar_preguntas_contextualizadas(
     propuesta: PropuestaLaboral,
     info_empresa: str = "",
     info_mercado: str = "",
@@ -312,7 +471,7 @@ def generar_preguntas_contextualizadas(
     """
 
     try:
-        response = client.chat.completions.create(
+        response = await get_openai_client().chat.completions.create(
             model="gpt-4o-mini",
             messages=[
                 {
@@ -335,5 +494,217 @@ def generar_preguntas_contextualizadas(
         }
 
     except Exception as e:
-        print(f"Error generando preguntas contextualizadas: {e}")
+        logger.error(f"Error generando preguntas contextualizadas: {e}")
         return {"preguntas": [], "consejos_conexion": []}
+
+
+async def _contenido(busqueda: Awaitable[SonarResponse]) -> str:
+    return (await busqueda).contenido
+
+
+async def investigar_propuesta(
+    propuesta_opciones: PropuestaLaboralConOpciones,
+) -> Tuple[PropuestaLaboral, str, str, str]:
+    """Extrae la propuesta y hace las búsquedas pedidas de forma concurrente.
+
+    - La búsqueda del entrevistador no depende de la extracción: arranca de inmediato
+    - Empresa y mercado necesitan empresa/puesto: corren en paralelo tras la extracción
+
+    Devuelve (propuesta, info_empresa, info_mercado, info_entrevistador).
+    """
+    tarea_entrevistador = None
+    if (
+        propuesta_opciones.buscar_entrevistador
+        and propuesta_opciones.nombre_entrevistador
+    ):
+        tarea_entrevistador = asyncio.create_task(
+            _contenido(buscar_entrevistador(propuesta_opciones.nombre_entrevistador))
+        )
+
+    try:
+        propuesta = await extraer_informacion_propuesta(propuesta_opciones.texto)
+
+        busquedas = []
+        if propuesta_opciones.buscar_empresa:
+            busquedas.append(
+                _contenido(buscar_empresa(propuesta.empresa, propuesta.puesto))
+            )
+        if propuesta_opciones.buscar_puesto_mercado:
+            busquedas.append(_contenido(buscar_mercado(propuesta.puesto)))
+        if tarea_entrevistador is not None:
+            busquedas.append(tarea_entrevistador)
+
+        resultados = iter(await asyncio.gather(*busquedas))
+        info_empresa = next(resultados) if propuesta_opciones.buscar_empresa else ""
+        info_mercado = (
+            next(resultados) if propuesta_opciones.buscar_puesto_mercado else ""
+        )
+        info_entrevistador = next(resultados) if tarea_entrevistador else ""
+
+        return propuesta, info_empresa, info_mercado, info_entrevistador
+
+    finally:
+        # Si la extracción falla, no dejar la búsqueda del entrevistador huérfana
+        if tarea_entrevistador is not None and not tarea_entrevistador.done():
+            tarea_entrevistador.cancel()
+
+
+async def generar_entrevista_con_opciones(
+    propuesta_opciones: PropuestaLaboralConOpciones,
+) -> RespuestaEntrevista:
+    """Pipeline completo: investigación concurrente y preguntas contextualizadas"""
+    (
+        propuesta,
+        info_empresa,
+        info_mercado,
+        info_entrevistador,
+    ) = await investigar_propuesta(propuesta_opciones)
+
+    # Generar preguntas contextualizadas
+    resultado = await generar_preguntas_contextualizadas(
+        propuesta, info_empresa, info_mercado, info_entrevistador
+    )
+
+    preguntas = resultado.get("preguntas", [])
+    consejos_conexion = resultado.get("consejos_conexion", [])
+
+    # Construir respuesta
+    return RespuestaEntrevista(
+        preguntas=preguntas,
+        consejos_conexion=consejos_conexion,
+        informacion_empresa={
+            "nombre": propuesta.empresa,
+            "informacion_encontrada": (
+                info_empresa[:500] + "..." if len(info_empresa) > 500 else info_empresa
+            ),
+            "fuentes_consultadas": 1 if info_empresa else 0,
+        },
+        propuesta_extraida={
+            "empresa": propuesta.empresa,
+            "puesto": propuesta.puesto,
+            "descripcion": propuesta.descripcion,
+            "requisitos": propuesta.requisitos,
+        },
+    )
+
+
+async def generar_entrevistas_lote(
+    propuestas: List[PropuestaLaboralConOpciones], concurrencia: int
+) -> AsyncIterator[Tuple[int, Optional[RespuestaEntrevista], Optional[str]]]:
+    """Procesa varias propuestas con concurrencia acotada.
+
+    Entrega (índice, respuesta, error) a medida que cada una termina, no en
+    el orden de entrada. Un fallo queda en su ítem y no corta el lote. Las
+    propuestas de la misma empresa comparten búsquedas gracias al
+    single-flight y a la caché de investigaciones.
+    """
+    semaforo = asyncio.Semaphore(max(1, concurrencia))
+
+    async def procesar(indice: int, propuesta: PropuestaLaboralConOpciones):
+        async with semaforo:
+            try:
+                return indice, await generar_entrevista_con_opciones(propuesta), None
+            except Exception as e:
+                logger.error(f"Error en el lote (ítem {indice}): {e}")
+                return indice, None, str(e)
+
+    tareas = [
+        asyncio.create_task(procesar(indice, propuesta))
+        for indice, propuesta in enumerate(propuestas)
+    ]
+    try:
+        for siguiente in asyncio.as_completed(tareas):
+            yield await siguiente
+    finally:
+        # Si el cliente corta la conexión, no seguir gastando en el resto del lote
+        for tarea in tareas:
+            tarea.cancel()
+
+
+async def generar_entrevista(
+    texto: str, al_avanzar: Optional[Callable[[str, Dict], None]] = None
+) -> Dict:
+    """Pipeline de /api/generar-entrevista desde texto libre; devuelve la respuesta completa.
+
+    `al_avanzar` recibe ("propuesta", ...), ("investigacion", ...) y un
+    ("pregunta", ...) por cada pregunta a medida que el modelo la escribe.
+    """
+    avisar = al_avanzar or (lambda evento, datos: None)
+
+    propuesta = await extraer_informacion_propuesta(texto)
+    propuesta_extraida = {
+        "empresa": propuesta.empresa,
+        "puesto": propuesta.puesto,
+        "descripcion": propuesta.descripcion,
+        "requisitos": propuesta.requisitos,
+    }
+    avisar("propuesta", propuesta_extraida)
+
+    info_empresa = await buscar_empresa(propuesta.empresa, propuesta.puesto)
+    informacion_empresa = {
+        "nombre": propuesta.empresa,
+        "informacion_encontrada": (
+            info_empresa.contenido[:500] + "..."
+            if len(info_empresa.contenido) > 500
+            else info_empresa.contenido
+        ),
+        "fuentes_consultadas": len(info_empresa.fuentes),
+    }
+    avisar("investigacion", informacion_empresa)
+
+    preguntas = []
+    async for pregunta in generar_preguntas_stream(propuesta, info_empresa.contenido):
+        preguntas.append(pregunta)
+        avisar("pregunta", {"indice": len(preguntas) - 1, "pregunta": pregunta})
+    if not preguntas:
+        raise ValueError("El modelo no generó preguntas")
+
+    return RespuestaEntrevista(
+        preguntas=preguntas,
+        consejos_conexion=[],
+        informacion_empresa=informacion_empresa,
+        propuesta_extraida=propuesta_extraida,
+    ).model_dump()
+
+
+async def generar_entrevista_eventos(
+    texto: str,
+) -> AsyncIterator[Tuple[str, Dict]]:
+    """generar_entrevista como una secuencia de eventos (para SSE).
+
+    Emite los avances a medida que ocurren y al final ("fin", ...) con la
+    respuesta completa; un error del pipeline se propaga al consumidor.
+    """
+    eventos: asyncio.Queue = asyncio.Queue()
+    tarea = asyncio.create_task(
+        generar_entrevista(
+            texto, lambda evento, datos: eventos.put_nowait((evento, datos))
+        )
+    )
+    tarea.add_done_callback(lambda _: eventos.put_nowait(None))
+    try:
+        while True:
+            evento = await eventos.get()
+            if evento is None:
+                break
+            yield evento
+        yield "fin", tarea.result()
+    finally:
+        # Si el cliente se desconecta, no seguir gastando en el pipeline
+        tarea.cancel()
+
+
+# Modo trabajo: el mismo pipeline procesado por la cola persistente
+async def _trabajo_entrevista(datos: Dict) -> Dict:
+    return await generar_entrevista(datos["texto"])
+
+
+async def _trabajo_entrevista_con_opciones(datos: Dict) -> Dict:
+    respuesta = await generar_entrevista_con_opciones(
+        PropuestaLaboralConOpciones(**datos)
+    )
+    return respuesta.model_dump()
+
+
+job_queue.register("entrevista", _trabajo_entrevista)
+job_queue.register("entrevista_con_opciones", _trabajo_entrevista_con_opciones)
@@ -0,0 +1,213 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+from config import settings
+from services.metrics import record_session_store
+import asyncio
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SesionExpiradaError(LookupError):
+    """La sesión ya no está en el almacén (expiró por inactividad o fue desalojada)"""
+
+
+class SessionState(BaseModel):
+    """Estado de una entrevista que debe sobrevivir a un cambio de worker"""
+
+    # Historial sin el prompt de sistema: este se antepone en cada llamada
+    messages: List[Dict[str, str]] = []
+    initial_message_sent: bool = False
+    # Perfil de entrevista elegido al conectar (vacío: el perfil por defecto)
+    profile: str = ""
+    # Resumen compacto de los turnos que ya no entran en la ventana de contexto
+    summary: str = ""
+    updated_at: float = Field(default_factory=time.time)
+
+
+class SessionStore(ABC):
+    """Almacén de sesiones compartible entre workers"""
+
+    @abstractmethod
+    async def get_session(self, session_id: str) -> Optional[SessionState]: ...
+
+    @abstractmethod
+    async def save_session(self, session_id: str, state: SessionState): ...
+
+    @abstractmethod
+    async def delete_session(self, session_id: str): ...
+
+    async def sweep(self) -> int:
+        """Elimina las sesiones inactivas; devuelve cuántas se eliminaron"""
+        return 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__}
+
+    async def close(self):
+        pass
+
+
+class InMemorySessionStore(SessionStore):
+    """Sesiones en memoria del proceso (un solo worker).
+
+    Registro acotado: una sesión inactiva más de `ttl_seconds` la elimina el
+    barrido periódico, y al superar `max_sessions` se descarta la usada hace
+    más tiempo. Así un cliente que se cae sin cerrar el socket no deja su
+    historial en memoria para siempre.
+    """
+
+    def __init__(self, ttl_seconds: int = 0, max_sessions: int = 0):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        # Orden LRU: la sesión usada más recientemente queda al final
+        self._sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+        self._last_access: Dict[str, float] = {}
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+
+        self.evicted_ttl = 0
+        self.evicted_lru = 0
+
+    async def get_session(self, session_id: str) -> Optional[SessionState]:
+        state = self._sessions.get(session_id)
+        if state is not None:
+            self._touch(session_id)
+        return state
+
+    async def save_session(self, session_id: str, state: SessionState):
+        state.updated_at = time.time()
+        self._sessions[session_id] = state
+        self._touch(session_id)
+
+        size = _approximate_size(state)
+        self._bytes += size - self._sizes.get(session_id, 0)
+        self._sizes[session_id] = size
+
+        while self.max_sessions and len(self._sessions) > self.max_sessions:
+            oldest = next(iter(self._sessions))
+            self._remove(oldest)
+            self.evicted_lru += 1
+
+    async def delete_session(self, session_id: str):
+        self._remove(session_id)
+
+    async def sweep(self) -> int:
+        if not self.ttl_seconds:
+            return 0
+
+        cutoff = time.monotonic() - self.ttl_seconds
+        # El orden LRU permite cortar en la primera sesión todavía activa
+        expired = []
+        for session_id in self._sessions:
+            if self._last_access.get(session_id, 0) > cutoff:
+                break
+            expired.append(session_id)
+
+        for session_id in expired:
+            self._remove(session_id)
+        self.evicted_ttl += len(expired)
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self).__name__,
+            "sessions": len(self._sessions),
+            "approx_bytes": self._bytes,
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "evicted_ttl": self.evicted_ttl,
+            "evicted_lru": self.evicted_lru,
+        }
+
+    def _touch(self, session_id: str):
+        self._sessions.move_to_end(session_id)
+        self._last_access[session_id] = time.monotonic()
+
+    def _remove(self, session_id: str):
+        self._sessions.pop(session_id, None)
+        self._last_access.pop(session_id, None)
+        self._bytes -= self._sizes.pop(session_id, 0)
+
+
+def _approximate_size(state: SessionState) -> int:
+    """Bytes aproximados que ocupa el historial (texto más un costo fijo por mensaje)"""
+    return (
+        200
+        + len(state.summary) * 2
+        + sum(len(message.get("content") or "") * 2 + 100 for message in state.messages)
+    )
+
+
+class RedisSessionStore(SessionStore):
+    """Sesiones en cualquier servidor que hable el protocolo de Redis (Redis, Valkey, KeyDB)"""
+
+    def __init__(self, url: str, prefix: str = "entrevistas", ttl_seconds: int = 0):
+        # En Redis la expiración por inactividad la hace el servidor (EXPIRE en cada escritura)
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url, decode_responses=True)
+        self._prefix = prefix
+        self._ttl = ttl_seconds or None
+
+    def _key(self, kind: str, session_id: str) -> str:
+        return f"{self._prefix}:{kind}:{session_id}"
+
+    async def get_session(self, session_id: str) -> Optional[SessionState]:
+        raw = await self._redis.get(self._key("session", session_id))
+        return SessionState.model_validate_json(raw) if raw else None
+
+    async def save_session(self, session_id: str, state: SessionState):
+        state.updated_at = time.time()
+        await self._redis.set(
+            self._key("session", session_id), state.model_dump_json(), ex=self._ttl
+        )
+
+    async def delete_session(self, session_id: str):
+        await self._redis.delete(self._key("session", session_id))
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+def create_session_store() -> SessionStore:
+    """Crea el almacén configurado en SESSION_STORE (memory | redis)"""
+    if settings.session_store == "redis":
+        return RedisSessionStore(
+            settings.redis_url,
+            prefix=settings.redis_prefix,
+            ttl_seconds=settings.session_ttl_seconds,
+        )
+    if settings.session_store != "memory":
+        raise ValueError(f"SESSION_STORE desconocido: {settings.session_store}")
+    return InMemorySessionStore(
+        ttl_seconds=settings.session_ttl_seconds,
+        max_sessions=settings.session_max_sessions,
+    )
+
+
+async def run_session_sweeper(
+    store: SessionStore, interval_seconds: float, on_sweep=None
+):
+    """Barrido periódico de sesiones inactivas (tarea de fondo de la aplicación)"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            removed = await store.sweep()
+            if on_sweep is not None:
+                removed += await on_sweep()
+            # Con varios workers /metrics lo atiende uno solo: cada proceso
+            # actualiza sus gauges en su propio barrido
+            record_session_store(store.stats())
+            if removed:
+                logger.info(
+                    f"[SESSIONS] Barrido: {removed} sesiones inactivas eliminadas"
+                )
+        except Exception as e:
+            logger.error(f"[SESSIONS] Error en el barrido: {e}")
+
+
+session_store = create_session_store()
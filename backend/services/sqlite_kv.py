@@ -0,0 +1,81 @@
+from typing import Optional, Tuple
+import os
+import sqlite3
+import threading
+import time
+
+
+class SQLiteKV:
+    """Almacén clave-valor en un archivo SQLite local (texto JSON por valor).
+
+    Las operaciones son bloqueantes: los servicios las llaman con
+    asyncio.to_thread. Una sola conexión protegida con un lock basta para el
+    volumen de un worker; el modo WAL permite que varios workers lean el mismo
+    archivo mientras otro escribe.
+    """
+
+    def __init__(self, path: str, table: str):
+        self.path = path
+        self.table = table
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_created_at ON {table} (created_at)"
+            )
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """Devuelve (valor, momento de escritura) o None"""
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+
+    def set(self, key: str, value: str, created_at: Optional[float] = None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at) "
+                "VALUES (?, ?, ?)",
+                (key, value, time.time() if created_at is None else created_at),
+            )
+
+    def delete_older_than(self, cutoff: float) -> int:
+        with self._lock, self._conn:
+            return self._conn.execute(
+                f"DELETE FROM {self.table} WHERE created_at < ?", (cutoff,)
+            ).rowcount
+
+    def touch(self, key: str):
+        """Marca la entrada como recién usada (para desalojo LRU con trim)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE {self.table} SET created_at = ? WHERE key = ?",
+                (time.time(), key),
+            )
+
+    def trim(self, max_entries: int) -> int:
+        """Deja solo las `max_entries` entradas más recientes"""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY created_at DESC "
+                "LIMIT -1 OFFSET ?)",
+                (max_entries,),
+            ).rowcount
+
+    def count(self) -> int:
+        with self._lock:
+            row = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        return row[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,36 +1,39 @@
-from groq import Groq
 from typing import Optional
 from config import settings
-import tempfile
-import os
+from services.audio_utils import validate_audio
+from services.clients import get_groq_client
+from services.metrics import span
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class STTService:
     def __init__(self):
         if not settings.groq_api_key:
             raise ValueError("GROQ_API_KEY no configurada")
-        self.client = Groq(api_key=settings.groq_api_key)
+        self.client = get_groq_client()
         self.model = settings.whisper_model
 
     async def transcribe_audio(
         self, audio_data: bytes, language: str = "es"
     ) -> Optional[str]:
-        try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-                temp_file.write(audio_data)
-                temp_file_path = temp_file.name
+        """Transcribe el audio directamente desde memoria.
 
-            try:
-                with open(temp_file_path, "rb") as file:
-                    transcription = self.client.audio.transcriptions.create(
-                        file=(temp_file_path, file.read()),
-                        model=self.model,
-                        language=language,
-                    )
-                return transcription.text
-            finally:
-                os.unlink(temp_file_path)
+        Lanza AudioInvalidoError si el audio no pasa la validación previa,
+        así no se gasta una llamada a Groq en subidas vacías o en silencio.
+        """
+        audio_format = validate_audio(audio_data)
+
+        try:
+            with span("stt", "groq", self.model):
+                transcription = await self.client.audio.transcriptions.create(
+                    file=(f"audio.{audio_format}", audio_data),
+                    model=self.model,
+                    language=language,
+                )
+            return transcription.text
 
         except Exception as e:
-            print(f"Error en transcripción: {e}")
+            logger.error(f"Error en transcripción: {e}")
             return None
@@ -0,0 +1,207 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from config import settings
+import asyncio
+import hashlib
+import json
+import os
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TTSCache:
+    """Caché de audio TTS direccionada por contenido.
+
+    Dos niveles: un LRU en memoria limitado en bytes y un directorio en disco
+    que sobrevive a reinicios. La clave es un hash de todo lo que determina el
+    audio (modelo, voz, prompt de sistema, texto del fragmento y formato).
+
+    El disco también tiene tope: cada lectura renueva la fecha del archivo y,
+    al pasar `max_disk_bytes`, se borran los de fecha más antigua. Varios
+    procesos pueden compartir el directorio; el tamaño se recalcula leyendo el
+    directorio en cada poda.
+    """
+
+    def __init__(
+        self,
+        max_memory_bytes: int,
+        directory: Optional[str] = None,
+        max_disk_bytes: int = 0,
+    ):
+        self.max_memory_bytes = max_memory_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        # Estimado de este proceso; None hasta la primera poda (que lo mide)
+        self._disk_bytes: Optional[int] = None
+        self._pruning = False
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_evictions = 0
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(
+        model: str, voice: str, system_prompt: str, text: str, audio_format: str = "mp3"
+    ) -> str:
+        parts = [model, voice, system_prompt, text]
+        # El MP3 original no lleva formato en la clave: sus entradas siguen valiendo
+        if audio_format != "mp3":
+            parts.append(audio_format)
+        payload = json.dumps(parts, ensure_ascii=False).encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return audio
+
+        if self.directory:
+            audio = await asyncio.to_thread(self._read_disk, key)
+            if audio is not None:
+                self._remember(key, audio)
+                self.disk_hits += 1
+                return audio
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, audio: bytes):
+        self._remember(key, audio)
+        if self.directory:
+            try:
+                await asyncio.to_thread(self._write_disk, key, audio)
+            except OSError as e:
+                logger.warning(f"[TTS CACHE] No se pudo escribir en disco: {e}")
+                return
+            if self._disk_bytes is not None:
+                self._disk_bytes += len(audio)
+            await self._maybe_prune()
+
+    async def _maybe_prune(self):
+        if not self.max_disk_bytes or self._pruning:
+            return
+        if self._disk_bytes is not None and self._disk_bytes <= self.max_disk_bytes:
+            return
+        self._pruning = True
+        try:
+            removed, self._disk_bytes = await asyncio.to_thread(self._prune_disk)
+            self.disk_evictions += removed
+        except OSError as e:
+            logger.warning(f"[TTS CACHE] No se pudo podar el disco: {e}")
+        finally:
+            self._pruning = False
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "max_memory_bytes": self.max_memory_bytes,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "disk_bytes": self._disk_bytes,
+            "max_disk_bytes": self.max_disk_bytes,
+            "disk_evictions": self.disk_evictions,
+            "misses": self.misses,
+            "hit_ratio": (
+                round((self.memory_hits + self.disk_hits) / lookups, 3)
+                if lookups
+                else 0.0
+            ),
+        }
+
+    def _remember(self, key: str, audio: bytes):
+        # Un audio más grande que todo el presupuesto solo se guarda en disco
+        if len(audio) > self.max_memory_bytes:
+            return
+
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+
+        self._memory[key] = audio
+        self._memory_bytes += len(audio)
+
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            # La fecha del archivo hace de "último uso" para la poda
+            os.utime(path)
+            return audio
+        except FileNotFoundError:
+            # Otro proceso pudo podarlo entre open y utime
+            return None
+
+    def _write_disk(self, key: str, audio: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Escritura atómica: otro proceso nunca ve un archivo a medias. El nombre
+        # temporal es único: dos set() de la misma clave pueden correr a la vez
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(audio)
+        try:
+            os.replace(temp_path, path)
+        except OSError:
+            os.remove(temp_path)
+            raise
+
+    def _prune_disk(self) -> Tuple[int, int]:
+        """Borra los audios usados hace más tiempo hasta quedar en el 90% del tope.
+
+        Devuelve (archivos borrados, bytes que quedan).
+        """
+        files = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.is_dir():
+                continue
+            for item in os.scandir(entry.path):
+                # Los temporales son escrituras en curso (de este u otro proceso)
+                if item.name.endswith(".tmp") or not item.is_file():
+                    continue
+                stat = item.stat()
+                files.append((stat.st_mtime, stat.st_size, item.path))
+                total += stat.st_size
+
+        removed = 0
+        if total > self.max_disk_bytes:
+            # Margen para no podar en cada escritura
+            target = int(self.max_disk_bytes * 0.9)
+            files.sort()
+            for _, size, path in files:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+        return removed, total
+
+
+tts_cache = TTSCache(
+    max_memory_bytes=settings.tts_cache_memory_bytes,
+    directory=settings.tts_cache_dir or None,
+    max_disk_bytes=settings.tts_cache_disk_bytes,
+)
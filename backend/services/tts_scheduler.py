@@ -0,0 +1,180 @@
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set
+from config import settings
+from services.metrics import observe
+import asyncio
+import time
+
+
+class _TTSJob:
+    __slots__ = ("session_id", "factory", "future", "enqueued_at", "task")
+
+    def __init__(
+        self,
+        session_id: str,
+        factory: Callable[[], Awaitable[Any]],
+        future: asyncio.Future,
+    ):
+        self.session_id = session_id
+        self.factory = factory
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.task: Optional[asyncio.Task] = None
+
+    def stop_if_cancelled(self, future: asyncio.Future):
+        # Barge-in: nadie espera el resultado, así que la síntesis en curso se
+        # corta para no ocupar el cupo global hasta que responda el proveedor
+        if future.cancelled() and self.task is not None:
+            self.task.cancel()
+
+
+class TTSScheduler:
+    """Planificador de TTS compartido por todas las sesiones del proceso.
+
+    - Límite global de síntesis simultáneas (no por solicitud)
+    - Round-robin entre sesiones para que una respuesta larga no acapare el cupo
+    - El primer fragmento de cada respuesta pasa delante de todo lo demás
+    """
+
+    def __init__(self, max_concurrent: int, wait_samples: int = 1000):
+        self.max_concurrent = max(1, max_concurrent)
+        self._priority: Deque[_TTSJob] = deque()
+        self._queues: "OrderedDict[str, Deque[_TTSJob]]" = OrderedDict()
+        self._running = 0
+        # Referencias fuertes: el loop solo guarda referencias débiles a las tareas
+        self._tasks: Set[asyncio.Task] = set()
+
+        # Estadísticas
+        self._waits: Deque[float] = deque(maxlen=wait_samples)
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+
+    async def submit(
+        self,
+        session_id: str,
+        factory: Callable[[], Awaitable[Any]],
+        priority: bool = False,
+    ) -> Any:
+        """Encola una síntesis y espera su resultado.
+
+        `factory` se invoca recién cuando hay cupo y debe devolver un awaitable.
+        """
+        loop = asyncio.get_running_loop()
+        job = _TTSJob(session_id, factory, loop.create_future())
+        self._submitted += 1
+
+        if priority:
+            self._priority.append(job)
+        else:
+            self._queues.setdefault(session_id, deque()).append(job)
+
+        self._dispatch()
+
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            # Si seguía en cola, _next_job la descartará al verla cancelada;
+            # si ya estaba corriendo, cancelar el futuro corta también la
+            # llamada al proveedor (ver _dispatch) y libera el cupo
+            if not job.future.done():
+                job.future.cancel()
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Profundidad de cola y tiempos de espera recientes"""
+        waits = sorted(self._waits)
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": self._running,
+            "queue_depth": self.queue_depth(),
+            "priority_queue_depth": sum(
+                1 for job in self._priority if not job.future.done()
+            ),
+            "sessions_waiting": len(self._queues),
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "cancelled": self._cancelled,
+            "wait_ms": {
+                "avg": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                "p50": _percentile_ms(waits, 0.50),
+                "p95": _percentile_ms(waits, 0.95),
+                "max": round(waits[-1] * 1000, 1) if waits else 0.0,
+            },
+        }
+
+    def queue_depth(self) -> int:
+        pending = sum(1 for job in self._priority if not job.future.done())
+        for queue in self._queues.values():
+            pending += sum(1 for job in queue if not job.future.done())
+        return pending
+
+    def _dispatch(self):
+        while self._running < self.max_concurrent:
+            job = self._next_job()
+            if job is None:
+                return
+
+            self._running += 1
+            wait = time.monotonic() - job.enqueued_at
+            self._waits.append(wait)
+            observe("tts_queue_wait", wait)
+            task = asyncio.ensure_future(self._run(job))
+            job.task = task
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            job.future.add_done_callback(job.stop_if_cancelled)
+
+    def _next_job(self) -> Optional[_TTSJob]:
+        # Primero los fragmentos iniciales de cada respuesta
+        while self._priority:
+            job = self._priority.popleft()
+            if not job.future.done():
+                return job
+            self._cancelled += 1
+
+        # Luego round-robin: una síntesis por sesión y la sesión pasa al final
+        while self._queues:
+            session_id, queue = next(iter(self._queues.items()))
+            job = queue.popleft()
+            if queue:
+                self._queues.move_to_end(session_id)
+            else:
+                del self._queues[session_id]
+
+            if not job.future.done():
+                return job
+            self._cancelled += 1
+
+        return None
+
+    async def _run(self, job: _TTSJob):
+        try:
+            result = await job.factory()
+            if not job.future.done():
+                job.future.set_result(result)
+            self._completed += 1
+        except asyncio.CancelledError:
+            job.future.cancel()
+            self._cancelled += 1
+            raise
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+            self._failed += 1
+        finally:
+            self._running -= 1
+            self._dispatch()
+
+
+def _percentile_ms(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return round(sorted_values[index] * 1000, 1)
+
+
+# Instancia única por proceso, compartida por todas las sesiones
+tts_scheduler = TTSScheduler(settings.max_concurrent_tts)
@@ -1,112 +1,168 @@
-from openai import OpenAI
-from typing import Optional, List
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Optional,
+    List,
+    Union,
+)
 from config import settings
-import io
+from services.audio_format import DEFAULT_AUDIO_FORMAT, AudioFormat
+from services.clients import get_openai_client
+from services.interview_profiles import InterviewProfile, interview_profiles
+from services.metrics import span
+from services.tts_cache import TTSCache, tts_cache
+from services.tts_scheduler import tts_scheduler
 import re
 import asyncio
-import concurrent.futures
 import base64
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class TTSService:
     def __init__(self):
         if not settings.openai_api_key:
             raise ValueError("OPENAI_API_KEY no configurada")
-        self.client = OpenAI(api_key=settings.openai_api_key)
+        self.client = get_openai_client()
         self.model = settings.tts_model
         self.voice = settings.tts_voice
         self.min_words = settings.min_words_per_chunk
         self.max_concurrent = settings.max_concurrent_tts
 
-        # Instrucciones emocionales para entrevistadora de BCP
-        self.system_prompt = """Eres María, entrevistadora virtual oficial del Banco de Crédito del Perú (BCP). 
-
-Instrucciones de voz:
-- Tono profesional institucional representando a BCP
-- Confiable, competente y seria pero amigable
-- Energía positiva pero corporativa
-- Pronunciación clara y profesional
-- Ritmo pausado y seguro, como una ejecutiva de banco
-- Transmite la solidez y prestigio de BCP
-- Sonríe sutilmente para generar confianza
-- Pausa estratégicamente para dar peso a las preguntas importantes
+        # Las instrucciones de voz vienen de cada perfil de entrevista (voz.md)
+        self.profiles = interview_profiles
+
+        # Audio residente de las líneas fijas del guion (clave de caché -> síntesis)
+        self._prerendered: Dict[str, asyncio.Task] = {}
+
+    async def prerender(self, profile: Optional[InterviewProfile] = None):
+        """Sintetiza de antemano las líneas fijas del guion y las deja en memoria"""
+        profile = profile or self.profiles.default
+        results = await asyncio.gather(
+            *(self.get_prerendered(text, profile) for text in profile.scripted_lines),
+            return_exceptions=True,
+        )
+        ready = sum(1 for result in results if isinstance(result, bytes))
+        logger.info(
+            f"[TTS] Líneas pre-renderizadas ({profile.id}): {ready}/{len(results)}"
+        )
+
+    def warm_up(
+        self,
+        profile: InterviewProfile,
+        audio_format: AudioFormat = DEFAULT_AUDIO_FORMAT,
+    ):
+        """Lanza (una sola vez) la síntesis de las líneas fijas de un perfil, sin esperar"""
+        for text in profile.scripted_lines:
+            self._prerender_task(text, profile, audio_format)
+
+    async def get_prerendered(
+        self,
+        text: str,
+        profile: Optional[InterviewProfile] = None,
+        audio_format: AudioFormat = DEFAULT_AUDIO_FORMAT,
+    ) -> Optional[bytes]:
+        """Audio completo de una línea fija; se sintetiza una sola vez aunque lo pidan muchas sesiones"""
+        profile = profile or self.profiles.default
+        key = self._cache_key(text, profile, audio_format)
+        task = self._prerender_task(text, profile, audio_format)
 
-Eres la imagen vocal de BCP en el proceso de selección para Analista de Datos."""
+        try:
+            audio_data = await asyncio.shield(task)
+        except Exception as e:
+            logger.error(f"Error pre-renderizando audio: {e}")
+            audio_data = None
+
+        if audio_data is None and self._prerendered.get(key) is task:
+            # Falló la síntesis: permitir reintentar en el próximo uso
+            del self._prerendered[key]
+        return audio_data
+
+    def prerendered_ready(
+        self,
+        text: str,
+        profile: Optional[InterviewProfile] = None,
+        audio_format: AudioFormat = DEFAULT_AUDIO_FORMAT,
+    ) -> Optional[bytes]:
+        """Devuelve el audio pre-renderizado si ya está listo, sin esperar"""
+        task = self._prerendered.get(
+            self._cache_key(text, profile or self.profiles.default, audio_format)
+        )
+        if task is not None and task.done() and not task.cancelled():
+            if task.exception() is None:
+                return task.result()
+        return None
+
+    def _prerender_task(
+        self, text: str, profile: InterviewProfile, audio_format: AudioFormat
+    ) -> asyncio.Task:
+        key = self._cache_key(text, profile, audio_format)
+        task = self._prerendered.get(key)
+        if task is None:
+            # La línea se sintetiza como una sola pieza, sin dividir en oraciones
+            task = asyncio.ensure_future(
+                self._generate_single_chunk(text, profile, audio_format, priority=True)
+            )
+            self._prerendered[key] = task
+        return task
 
     def _split_text_into_chunks(self, text: str) -> List[str]:
         """Divide el texto en oraciones y agrupa las muy cortas"""
-        # Limpiar prefijo "Asistente:" si existe
-        text = re.sub(r"^Asistente:\s*", "", text.strip())
-
-        # Dividir por puntos, signos de interrogación y exclamación
-        sentences = re.split(r"[.!?]+", text)
-
-        chunks = []
-        current_chunk = ""
-
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
-                continue
-
-            word_count = len(sentence.split())
-
-            # Si la oración actual es muy corta, acumularla
-            if word_count < self.min_words:
-                if current_chunk:
-                    current_chunk += ". " + sentence
-                else:
-                    current_chunk = sentence
-            else:
-                # Si tenemos algo acumulado, agregarlo primero
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                    current_chunk = ""
-
-                # Agregar la oración actual
-                chunks.append(sentence.strip())
-
-        # Agregar cualquier resto acumulado
-        if current_chunk:
-            chunks.append(current_chunk.strip())
-
-        return [chunk for chunk in chunks if chunk.strip()]
-
-    def _generate_speech_sync(self, text: str) -> Optional[bytes]:
+        return SentenceChunker(self.min_words).flush(text)
+
+    def _build_messages(self, text: str, profile: InterviewProfile) -> List[dict]:
+        # Para el mensaje inicial, usar un prompt más simple
+        if text == profile.presentacion:
+            return [
+                {
+                    "role": "user",
+                    "content": text,  # Solo el texto, sin instrucciones adicionales
+                }
+            ]
+
+        return [
+            {"role": "system", "content": profile.tts_prompt},
+            {
+                "role": "user",
+                "content": f"Lee esto en voz alta con el estilo indicado: {text}",
+            },
+        ]
+
+    def _cache_key(
+        self, text: str, profile: InterviewProfile, audio_format: AudioFormat
+    ) -> str:
+        system_messages = [
+            m["content"]
+            for m in self._build_messages(text, profile)
+            if m["role"] == "system"
+        ]
+        system_prompt = system_messages[0] if system_messages else ""
+        return TTSCache.make_key(
+            self.model, self.voice, system_prompt, text, audio_format.key
+        )
+
+    async def _generate_speech(
+        self, text: str, profile: InterviewProfile, audio_format: AudioFormat
+    ) -> Optional[bytes]:
         """Genera audio usando gpt-4o-mini-audio-preview con instrucciones emocionales"""
         try:
-            # Para el mensaje inicial, usar un prompt más simple
-            if (
-                text
-                == "¡Hola! Soy María del BCP. Vamos a iniciar la entrevista para Analista de Datos. ¿Cuál es tu nombre completo?"
-            ):
-                messages = [
-                    {
-                        "role": "user",
-                        "content": text,  # Solo el texto, sin instrucciones adicionales
-                    }
-                ]
-            else:
-                messages = [
-                    {"role": "system", "content": self.system_prompt},
-                    {
-                        "role": "user",
-                        "content": f"Lee esto en voz alta con el estilo indicado: {text}",
-                    },
-                ]
+            messages = self._build_messages(text, profile)
 
             # Usar chat completions API con modelo audio preview según documentación
-            response = self.client.chat.completions.create(
-                model=self.model,
-                modalities=["text", "audio"],
-                audio={"voice": self.voice, "format": "mp3"},
-                messages=messages,
-                max_tokens=1000,
-            )
+            with span("tts_chunk", "openai", self.model):
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    modalities=["text", "audio"],
+                    audio={"voice": self.voice, "format": audio_format.api_format},
+                    messages=messages,
+                    max_tokens=1000,
+                )
 
             # Verificar si hay texto en la respuesta (NO debería haberlo)
             if response.choices[0].message.content:
-                print(
+                logger.warning(
                     f"[TTS WARNING] Se generó texto adicional: {response.choices[0].message.content}"
                 )
 
@@ -117,66 +173,255 @@ Eres la imagen vocal de BCP en el proceso de selección para Analista de Datos."
                 and response.choices[0].message.audio.data
             ):
                 audio_data = base64.b64decode(response.choices[0].message.audio.data)
-                return audio_data
+                return audio_format.convert(audio_data)
             else:
-                print("No se generó audio en la respuesta")
+                logger.warning("No se generó audio en la respuesta")
                 return None
 
         except Exception as e:
-            print(f"Error generando audio para fragmento: {e}")
+            logger.error(f"Error generando audio para fragmento: {e}")
             return None
 
-    async def generate_speech(self, text: str) -> Optional[bytes]:
+    async def generate_speech(
+        self,
+        text: str,
+        session_id: Optional[str] = None,
+        profile: Optional[InterviewProfile] = None,
+        audio_format: AudioFormat = DEFAULT_AUDIO_FORMAT,
+    ) -> Optional[bytes]:
         """Genera audio dividiendo el texto en fragmentos procesados en paralelo"""
         try:
-            chunks = self._split_text_into_chunks(text)
+            audio_chunks = [
+                chunk
+                async for chunk in self.stream_speech(
+                    text, session_id, profile, audio_format
+                )
+            ]
 
-            if not chunks:
+            if not audio_chunks:
                 return None
 
-            # Si solo hay un fragmento, procesarlo directamente
-            if len(chunks) == 1:
-                return await self._generate_single_chunk(chunks[0])
+            return self._combine_audio_chunks(audio_chunks, audio_format)
 
-            print(f"Procesando {len(chunks)} fragmentos en paralelo...")
-
-            # Procesar múltiples fragmentos en paralelo
-            with concurrent.futures.ThreadPoolExecutor(
-                max_workers=self.max_concurrent
-            ) as executor:
-                loop = asyncio.get_event_loop()
-                tasks = [
-                    loop.run_in_executor(executor, self._generate_speech_sync, chunk)
-                    for chunk in chunks
-                ]
+        except Exception as e:
+            logger.error(f"Error en generación paralela de audio: {e}")
+            return None
 
-                audio_chunks = await asyncio.gather(*tasks)
+    async def stream_speech(
+        self,
+        source: Union[str, AsyncIterable[str]],
+        session_id: Optional[str] = None,
+        profile: Optional[InterviewProfile] = None,
+        audio_format: AudioFormat = DEFAULT_AUDIO_FORMAT,
+    ) -> AsyncIterator[bytes]:
+        """Produce el audio de cada fragmento en orden, apenas ese fragmento y todos los anteriores están listos.
+
+        `source` puede ser el texto completo o un iterable asíncrono de oraciones
+        (por ejemplo, las que va cortando un SentenceChunker durante el streaming del chat).
+        Todos los fragmentos se sintetizan en paralelo (dentro del cupo global de
+        tts_scheduler); solo la entrega es ordenada. El primer fragmento tiene prioridad.
+        Cada fragmento es un archivo completo en el formato de la sesión.
+        """
+        profile = profile or self.profiles.default
+        if isinstance(source, str):
+            # Las líneas fijas del guion ya tienen su audio completo en memoria
+            prerendered = self.prerendered_ready(source, profile, audio_format)
+            if prerendered is not None:
+                yield prerendered
+                return
+
+            chunks = self._split_text_into_chunks(source)
+            if len(chunks) > 1:
+                logger.info(f"Procesando {len(chunks)} fragmentos en paralelo...")
+            source = _iterate_chunks(chunks)
+
+        tasks: asyncio.Queue = asyncio.Queue()
+
+        async def schedule():
+            try:
+                first = True
+                async for chunk in source:
+                    tasks.put_nowait(
+                        asyncio.create_task(
+                            self._generate_single_chunk(
+                                chunk,
+                                profile,
+                                audio_format,
+                                session_id=session_id,
+                                priority=first,
+                            )
+                        )
+                    )
+                    first = False
+            finally:
+                tasks.put_nowait(None)
+
+        scheduler = asyncio.create_task(schedule())
+        try:
+            while True:
+                task = await tasks.get()
+                if task is None:
+                    break
+
+                audio_data = await task
+                if audio_data is not None:
+                    yield audio_data
+
+            # Propagar errores del iterable de origen
+            await scheduler
+
+        finally:
+            # Si el consumidor abandona la entrega, no dejar síntesis huérfanas
+            scheduler.cancel()
+            while not tasks.empty():
+                task = tasks.get_nowait()
+                if task is not None:
+                    task.cancel()
+
+    async def _generate_single_chunk(
+        self,
+        text: str,
+        profile: InterviewProfile,
+        audio_format: AudioFormat,
+        session_id: Optional[str] = None,
+        priority: bool = False,
+    ) -> Optional[bytes]:
+        """Genera audio para un solo fragmento a través del planificador global"""
+        # Un acierto en caché no consume cupo del planificador ni llama al proveedor
+        cache_key = self._cache_key(text, profile, audio_format)
+        cached = await tts_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        audio_data = await tts_scheduler.submit(
+            session_id or "",
+            lambda: self._generate_speech(text, profile, audio_format),
+            priority=priority,
+        )
+        if audio_data is not None:
+            await tts_cache.set(cache_key, audio_data)
+        return audio_data
+
+    def _combine_audio_chunks(
+        self,
+        audio_chunks: List[bytes],
+        audio_format: AudioFormat = DEFAULT_AUDIO_FORMAT,
+    ) -> bytes:
+        """Combina múltiples chunks de audio en uno solo, respetando los frames del formato"""
+        return audio_format.combine(audio_chunks)
+
+
+async def _iterate_chunks(chunks: List[str]) -> AsyncIterator[str]:
+    for chunk in chunks:
+        yield chunk
+
+
+class SentenceChunker:
+    """Versión incremental de la división en oraciones para texto que llega en streaming"""
+
+    # Una oración se considera completa cuando su puntuación final va seguida de un
+    # espacio (o, al cerrar, del fin del texto): así "3.5" no se corta
+    _FIN_ORACION = re.compile(r"[.!?]+(?=\s)")
+    _FIN_ORACION_FINAL = re.compile(r"[.!?]+(?=\s|$)")
+    _PALABRA_FINAL = re.compile(r"(\w+)$")
+    # Abreviaturas cuyo punto no cierra la oración ("Dr. Pérez", "EE. UU.")
+    _ABREVIATURAS = frozenset(
+        {"sr", "sra", "srta", "dr", "dra", "lic", "ing", "prof", "mg", "ee", "ej"}
+    )
+
+    def __init__(self, min_words: int):
+        self.min_words = min_words
+        self._buffer = ""
+        self._current_chunk = ""
+        self._prefix_checked = False
+
+    def feed(self, text: str) -> List[str]:
+        """Agrega texto y devuelve los fragmentos que ya quedaron completos"""
+        self._buffer += text
+        self._strip_prefix()
 
-            # Filtrar chunks nulos y combinar
-            valid_chunks = [chunk for chunk in audio_chunks if chunk is not None]
+        chunks = []
+        for sentence in self._take_sentences(self._FIN_ORACION):
+            chunks.extend(self._push_sentence(sentence))
+        return chunks
 
-            if not valid_chunks:
-                return None
+    def flush(self, text: str = "") -> List[str]:
+        """Procesa el texto pendiente y devuelve todos los fragmentos restantes"""
+        self._buffer += text
+        self._strip_prefix()
 
-            return self._combine_audio_chunks(valid_chunks)
+        chunks = []
+        # Lo que quede sin puntuación final también es una oración
+        for sentence in self._take_sentences(self._FIN_ORACION_FINAL) + [self._buffer]:
+            chunks.extend(self._push_sentence(sentence))
+        self._buffer = ""
 
-        except Exception as e:
-            print(f"Error en generación paralela de audio: {e}")
-            return None
+        # Agregar cualquier resto acumulado
+        if self._current_chunk:
+            chunks.append(self._current_chunk.strip())
+            self._current_chunk = ""
 
-    async def _generate_single_chunk(self, text: str) -> Optional[bytes]:
-        """Genera audio para un solo fragmento de forma asíncrona"""
-        loop = asyncio.get_event_loop()
-        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-            return await loop.run_in_executor(
-                executor, self._generate_speech_sync, text
-            )
+        return [chunk for chunk in chunks if chunk.strip()]
 
-    def _combine_audio_chunks(self, audio_chunks: List[bytes]) -> bytes:
-        """Combina múltiples chunks de audio en uno solo"""
-        combined = io.BytesIO()
-        for chunk in audio_chunks:
-            combined.write(chunk)
+    def _take_sentences(self, fin: re.Pattern) -> List[str]:
+        """Saca del buffer las oraciones completas (sin su puntuación final)"""
+        sentences = []
+        start = 0
+        while True:
+            match = fin.search(self._buffer, start)
+            if not match:
+                return sentences
+            if self._is_abbreviation(match):
+                start = match.end()
+                continue
+            sentences.append(self._buffer[: match.start()])
+            self._buffer = self._buffer[match.end() :]
+            start = 0
+
+    def _is_abbreviation(self, match: re.Match) -> bool:
+        if match.group() != ".":
+            return False
+        word = self._PALABRA_FINAL.search(self._buffer, 0, match.start())
+        if not word:
+            return False
+        # Una inicial suelta ("J. Pérez") tampoco cierra la oración
+        token = word.group(1)
+        return token.lower() in self._ABREVIATURAS or (
+            len(token) == 1 and token.isupper()
+        )
+
+    def _strip_prefix(self):
+        # Limpiar prefijo "Asistente:" si existe (solo al inicio del texto)
+        if self._prefix_checked:
+            return
+        stripped = self._buffer.lstrip()
+        if len(stripped) < len("Asistente:") and "Asistente:".startswith(stripped):
+            return
+        self._buffer = re.sub(r"^Asistente:\s*", "", stripped)
+        self._prefix_checked = True
+
+    def _push_sentence(self, sentence: str) -> List[str]:
+        """Agrupa las oraciones muy cortas con las siguientes"""
+        sentence = sentence.strip()
+        if not sentence:
+            return []
+
+        word_count = len(sentence.split())
+
+        # Si la oración actual es muy corta, acumularla
+        if word_count < self.min_words:
+            if self._current_chunk:
+                self._current_chunk += ". " + sentence
+            else:
+                self._current_chunk = sentence
+            return []
 
-        combined.seek(0)
-        return combined.read()
+        chunks = []
+        # Si tenemos algo acumulado, agregarlo primero
+        if self._current_chunk:
+            chunks.append(self._current_chunk.strip())
+            self._current_chunk = ""
+
+        # Agregar la oración actual
+        chunks.append(sentence)
+        return chunks
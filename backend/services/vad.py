@@ -0,0 +1,121 @@
+from collections import deque
+from typing import Deque, List, Optional
+from config import settings
+from services.audio_utils import pcm_rms
+
+
+class EnergyVAD:
+    """Detector de actividad de voz por energía, solo CPU.
+
+    Recibe PCM16 mono en bloques de cualquier tamaño, lo analiza en frames de
+    `frame_ms` y compara la energía de cada frame con un piso de ruido que se
+    adapta mientras no hay voz. Devuelve los segmentos de voz apenas termina
+    cada uno (una pausa más larga que `hangover_ms`).
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        frame_ms: int = 30,
+        threshold_ratio: float = settings.vad_threshold_ratio,
+        min_rms: float = settings.vad_min_rms,
+        speech_start_ms: int = 90,
+        hangover_ms: int = settings.vad_hangover_ms,
+        end_of_turn_ms: int = settings.vad_end_of_turn_ms,
+        pre_roll_ms: int = 240,
+        max_segment_ms: int = 15000,
+    ):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_bytes = sample_rate * frame_ms // 1000 * 2
+        self.threshold_ratio = threshold_ratio
+        self.min_rms = min_rms
+        self.speech_start_frames = max(1, speech_start_ms // frame_ms)
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.end_of_turn_frames = end_of_turn_ms // frame_ms if end_of_turn_ms else 0
+        self.max_segment_frames = max_segment_ms // frame_ms
+
+        self._pending = b""
+        self._noise_floor: Optional[float] = None
+        self._pre_roll: Deque[bytes] = deque(maxlen=max(1, pre_roll_ms // frame_ms))
+        self._segment: List[bytes] = []
+        self._in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+        self._had_speech = False
+
+    @property
+    def end_of_turn(self) -> bool:
+        """Hubo voz y desde el último segmento el silencio ya supera end_of_turn_ms"""
+        return (
+            bool(self.end_of_turn_frames)
+            and self._had_speech
+            and not self._in_speech
+            and self._silence_run >= self.end_of_turn_frames
+        )
+
+    def process(self, pcm: bytes) -> List[bytes]:
+        """Analiza un bloque de audio y devuelve los segmentos de voz completados"""
+        data = self._pending + pcm
+        usable = len(data) - len(data) % self.frame_bytes
+        self._pending = data[usable:]
+
+        segments = []
+        for offset in range(0, usable, self.frame_bytes):
+            segment = self._process_frame(data[offset : offset + self.frame_bytes])
+            if segment:
+                segments.append(segment)
+        return segments
+
+    def flush(self) -> Optional[bytes]:
+        """Cierra el segmento en curso (fin de la respuesta)"""
+        if self._in_speech:
+            if self._pending:
+                self._segment.append(self._pending)
+            return self._close_segment()
+        return None
+
+    def _process_frame(self, frame: bytes) -> Optional[bytes]:
+        rms = pcm_rms(frame)
+        if self._noise_floor is None:
+            self._noise_floor = rms
+
+        is_speech = rms > max(self.min_rms, self._noise_floor * self.threshold_ratio)
+
+        if not self._in_speech:
+            self._pre_roll.append(frame)
+            if is_speech:
+                self._speech_run += 1
+                if self._speech_run >= self.speech_start_frames:
+                    # Empieza la voz: incluir el pre-roll para no cortar la primera sílaba
+                    self._in_speech = True
+                    self._had_speech = True
+                    self._segment = list(self._pre_roll)
+                    self._pre_roll.clear()
+                    self._silence_run = 0
+            else:
+                self._speech_run = 0
+                self._silence_run += 1
+                # El piso de ruido solo se adapta con frames sin voz
+                self._noise_floor = 0.95 * self._noise_floor + 0.05 * rms
+            return None
+
+        self._segment.append(frame)
+        if is_speech:
+            self._silence_run = 0
+        else:
+            self._silence_run += 1
+
+        if (
+            self._silence_run >= self.hangover_frames
+            or len(self._segment) >= self.max_segment_frames
+        ):
+            return self._close_segment()
+        return None
+
+    def _close_segment(self) -> bytes:
+        segment = b"".join(self._segment)
+        self._segment = []
+        self._in_speech = False
+        self._speech_run = 0
+        return segment
@@ -0,0 +1,124 @@
+from loadtest.ogg_sintetico import PRE_SKIP, ogg_opus
+from services.audio_format import AudioFormat, _OGG_HEADER, _ogg_crc, _opus_samples
+import io
+import math
+import random
+import struct
+
+import pytest
+
+
+def decode_ogg_opus(data: bytes) -> int:
+    """Recorre el stream como un decodificador y devuelve las muestras de salida.
+
+    Falla con las mismas condiciones que rechazan libopusfile/libsndfile: CRC,
+    secuencia, BOS/EOS y granules que no coinciden con lo decodificado (solo la
+    última página puede recortar).
+    """
+    pos = 0
+    sequence = 0
+    packets = []
+    partial = b""
+    decoded = 0
+    pre_skip = None
+    final_granule = None
+    while pos < len(data):
+        capture, _, flags, granule, _, seq, crc, segments = _OGG_HEADER.unpack_from(
+            data, pos
+        )
+        assert capture == b"OggS"
+        assert final_granule is None, "hay páginas después de EOS"
+        lacing = data[pos + _OGG_HEADER.size : pos + _OGG_HEADER.size + segments]
+        end = pos + _OGG_HEADER.size + segments + sum(lacing)
+        page = bytearray(data[pos:end])
+        struct.pack_into("<I", page, 22, 0)
+        assert _ogg_crc(page) == crc, f"CRC inválido en la página {seq}"
+        assert seq == sequence, "secuencia de páginas salteada"
+        assert bool(flags & 0x02) == (sequence == 0), "BOS fuera de la primera página"
+
+        body = pos + _OGG_HEADER.size + segments
+        completed = False
+        for size in lacing:
+            partial += data[body : body + size]
+            body += size
+            if size == 255:
+                continue
+            packets.append(partial)
+            if len(packets) == 1:
+                pre_skip = struct.unpack_from("<H", partial, 10)[0]
+            elif len(packets) > 2:
+                decoded += _opus_samples(partial) if partial else 0
+                completed = True
+            partial = b""
+
+        if flags & 0x04:
+            assert completed and granule <= decoded, "recorte final inválido"
+            assert decoded - granule < 960 * 3, "recorte final mayor a un paquete"
+            final_granule = granule
+        elif len(packets) > 2:
+            expected = decoded if completed else -1
+            assert (
+                granule == expected
+            ), f"granule {granule} en la página {seq}, decodificado {expected}"
+        sequence += 1
+        pos = end
+
+    assert final_granule is not None, "falta la página EOS"
+    return final_granule - pre_skip
+
+
+@pytest.mark.parametrize("per_page", [50, 7])
+def test_opus_combine_decodes_all_chunks(per_page):
+    durations = [48312, 24000, 30000]
+    chunks = [
+        ogg_opus(n, serial=i, por_pagina=per_page) for i, n in enumerate(durations)
+    ]
+    for chunk in chunks:
+        assert decode_ogg_opus(chunk) == durations[chunks.index(chunk)]
+
+    combined = AudioFormat.parse("opus").combine(chunks)
+
+    # Cada fragmento intermedio aporta todo lo decodificado (su pre-skip y su
+    # relleno final quedan como silencio); el último conserva su recorte
+    padded = sum(math.ceil((n + PRE_SKIP) / 960) * 960 for n in durations[:-1])
+    assert decode_ogg_opus(bytes(combined)) == padded + durations[-1]
+
+
+def test_opus_combine_decodes_with_libsndfile():
+    soundfile = pytest.importorskip("soundfile")
+    chunks = [ogg_opus(48312), ogg_opus(48312)]
+    combined = bytes(AudioFormat.parse("opus").combine(chunks))
+
+    audio, rate = soundfile.read(io.BytesIO(combined), dtype="int16")
+    # libsndfile entrega el audio a la frecuencia de entrada de OpusHead (24 kHz)
+    assert rate == 24000
+    assert len(audio) == decode_ogg_opus(combined) * rate // 48000
+
+
+def _ogg_crc_reference(data: bytes) -> int:
+    """CRC de Ogg bit a bit, tal como lo define la especificación"""
+    crc = 0
+    for byte in data:
+        crc ^= byte << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else crc << 1
+        crc &= 0xFFFFFFFF
+    return crc
+
+
+@pytest.mark.parametrize("size", [0, 1, 27, 255, 4096])
+def test_ogg_crc_matches_reference(size):
+    data = bytes(random.Random(size).getrandbits(8) for _ in range(size))
+    assert _ogg_crc(data) == _ogg_crc_reference(data)
+    assert _ogg_crc(bytearray(data)) == _ogg_crc(memoryview(data))
+
+
+def test_wav_combine_patches_sizes():
+    fmt = AudioFormat.parse("wav", "8000")
+    chunks = [fmt.convert(bytes(4800)), fmt.convert(bytes(2400))]
+    combined = bytes(fmt.combine(chunks))
+
+    data_size = struct.unpack_from("<I", combined, 40)[0]
+    assert data_size == 1600 + 800
+    assert struct.unpack_from("<I", combined, 4)[0] == 36 + data_size
+    assert len(combined) == 44 + data_size
@@ -0,0 +1,94 @@
+from services.audio_utils import AudioInvalidoError, pcm16_to_wav, validate_audio
+import struct
+
+import pytest
+
+VOZ = struct.pack("<h", 10000) * 16000  # 1 s de PCM16 mono a 16 kHz
+SILENCIO = bytes(len(VOZ))
+
+
+def _chunk(chunk_id: bytes, body: bytes, size: int = None) -> bytes:
+    size = len(body) if size is None else size
+    return chunk_id + struct.pack("<I", size) + body + b"\x00" * (len(body) & 1)
+
+
+def _fmt(audio_format=1, sample_rate=16000, extensible_subformat=None) -> bytes:
+    body = struct.pack("<HHIIHH", audio_format, 1, sample_rate, sample_rate * 2, 2, 16)
+    if extensible_subformat is not None:
+        body += struct.pack("<HHI", 22, 16, 0) + struct.pack("<H", extensible_subformat)
+        body += b"\x00" * 14
+    return _chunk(b"fmt ", body)
+
+
+def _riff(*chunks: bytes) -> bytes:
+    body = b"WAVE" + b"".join(chunks)
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def _id(value) -> str:
+    # Los bytes crudos como nombre de test son ilegibles: basta con la cabecera
+    return value if isinstance(value, str) else value[:4].hex()
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        (pcm16_to_wav(VOZ, 16000), "wav"),
+        # Chunk de tamaño impar antes de fmt: hay que respetar el relleno
+        (_riff(_chunk(b"LIST", b"abc"), _fmt(), _chunk(b"data", VOZ)), "wav"),
+        # fmt después de data
+        (_riff(_chunk(b"data", VOZ), _fmt()), "wav"),
+        # Grabadores en streaming que no reescriben el tamaño
+        (_riff(_fmt(), b"data" + struct.pack("<I", 0) + VOZ), "wav"),
+        (_riff(_fmt(), b"data" + struct.pack("<I", 0xFFFFFFFF) + VOZ), "wav"),
+        # El chunk data declara más bytes de los que llegaron
+        (_riff(_fmt(), b"data" + struct.pack("<I", 10 * len(VOZ)) + VOZ), "wav"),
+        (b"\x1a\x45\xdf\xa3" + bytes(2000), "webm"),
+        (b"OggS" + bytes(2000), "ogg"),
+        (b"fLaC" + bytes(2000), "flac"),
+        (bytes(4) + b"ftypM4A " + bytes(2000), "mp4"),
+        (b"ID3" + bytes(2000), "mp3"),
+        (b"\xff\xfb" + bytes(2000), "mp3"),
+    ],
+    ids=_id,
+)
+def test_accepts(data, expected):
+    assert validate_audio(data) == expected
+
+
+@pytest.mark.parametrize(
+    "data, message",
+    [
+        (b"", "vacío"),
+        (b"RIFF", "demasiado corto"),
+        (bytes(2000), "no soportado"),
+        (b"RIFX" + bytes(2000), "no soportado"),
+        # Truncado a mitad del PCM: la duración real no llega al mínimo
+        (pcm16_to_wav(VOZ, 16000)[:2000], "demasiado corto"),
+        (pcm16_to_wav(SILENCIO, 16000), "No se detectó voz"),
+        (
+            _riff(_fmt(0xFFFE, extensible_subformat=1), _chunk(b"data", SILENCIO)),
+            "No se detectó voz",
+        ),
+        (_riff(_chunk(b"data", VOZ)), "Cabecera WAV inválida"),
+        (_riff(_fmt(), _chunk(b"LIST", bytes(2000))), "Cabecera WAV inválida"),
+        (_riff(_fmt(sample_rate=0), _chunk(b"data", VOZ)), "Cabecera WAV inválida"),
+        # fmt cortado a la mitad detrás de un chunk grande
+        (
+            _riff(_chunk(b"LIST", bytes(2000)))
+            + b"fmt "
+            + struct.pack("<I", 16)
+            + bytes(4),
+            "Cabecera WAV inválida",
+        ),
+        # Tamaño de chunk que apunta más allá del final
+        (
+            _riff(_chunk(b"junk", bytes(2000), size=0xFFFFFF00), _fmt()),
+            "Cabecera WAV inválida",
+        ),
+    ],
+    ids=_id,
+)
+def test_rejects(data, message):
+    with pytest.raises(AudioInvalidoError, match=message):
+        validate_audio(data)
@@ -0,0 +1,67 @@
+from services.context_window import ContextWindow
+from services.session_store import SessionState
+
+SYSTEM_PROMPT = "Eres María, entrevistadora de RR. HH. " * 5
+INTRO = "Hola, soy María. ¿Me cuentas tu nombre?"
+
+
+def _interview(turns: int) -> SessionState:
+    state = SessionState(initial_message_sent=True)
+    state.messages.append({"role": "assistant", "content": INTRO})
+    state.messages.append({"role": "user", "content": "Me llamo Ana Torres."})
+    for n in range(turns):
+        state.messages.append(
+            {
+                "role": "assistant",
+                "content": f"Pregunta {n}: cuéntame de un proyecto " + "difícil " * 20,
+            }
+        )
+        state.messages.append(
+            {"role": "user", "content": f"Respuesta {n}: " + "trabajé con datos " * 20}
+        )
+    return state
+
+
+def test_overflow_folds_old_turns_into_a_summary():
+    window = ContextWindow(
+        "gpt-4.1-mini", max_prompt_tokens=600, summary_max_tokens=120, chars_per_turn=60
+    )
+    state = _interview(turns=12)
+    recent = state.messages[-2:]
+    assert window.count_messages(window.build(SYSTEM_PROMPT, state)) > 600
+
+    assert window.fit(SYSTEM_PROMPT, state) is True
+    messages = window.build(SYSTEM_PROMPT, state)
+
+    # Prefijo estable: prompt de sistema y presentación
+    assert messages[0] == {"role": "system", "content": SYSTEM_PROMPT}
+    assert messages[1] == {"role": "assistant", "content": INTRO}
+    # Resumen plegado justo después del prefijo
+    assert messages[2]["role"] == "system"
+    assert messages[2]["content"].startswith("Resumen de la entrevista")
+    # El resumen conserva su primera línea (el nombre del candidato) y tiene tope
+    assert state.summary.splitlines()[0] == "- Candidato: Me llamo Ana Torres."
+    assert window.count(state.summary) <= 120
+    # Los turnos más recientes siguen completos y todo entra en el presupuesto
+    assert messages[-2:] == recent
+    assert window.count_messages(messages) <= 600
+
+
+def test_fit_is_a_noop_within_budget():
+    window = ContextWindow("gpt-4.1-mini", max_prompt_tokens=10_000)
+    state = _interview(turns=2)
+    before = list(state.messages)
+    assert window.fit(SYSTEM_PROMPT, state) is False
+    assert state.messages == before and state.summary == ""
+
+
+def test_summary_entries_are_compacted():
+    window = ContextWindow(
+        "gpt-4.1-mini", max_prompt_tokens=200, summary_max_tokens=500, chars_per_turn=30
+    )
+    state = _interview(turns=3)
+    window.fit(SYSTEM_PROMPT, state)
+    for line in state.summary.splitlines():
+        speaker, text = line.split(": ", 1)
+        assert speaker in ("- Candidato", "- María")
+        assert len(text) <= 31  # 30 caracteres más "…"
@@ -0,0 +1,92 @@
+from services import search_service
+from services.extraction_cache import ExtractionCache
+from types import SimpleNamespace
+import asyncio
+import json
+
+import pytest
+
+PROPUESTA = {
+    "empresa": "ACME",
+    "puesto": "Analista de Datos",
+    "descripcion": "Análisis de ventas",
+    "requisitos": "SQL; Python",
+}
+
+
+@pytest.fixture
+def llm(tmp_path, monkeypatch):
+    """Modelo simulado y memo en un archivo temporal; devuelve las llamadas"""
+    cache = ExtractionCache(str(tmp_path / "extraction.sqlite3"), max_entries=2)
+    monkeypatch.setattr(search_service, "extraction_cache", cache)
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        message = SimpleNamespace(content=json.dumps(PROPUESTA))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+    monkeypatch.setattr(search_service, "get_openai_client", lambda: client)
+    yield calls
+    cache.close()
+
+
+def test_same_text_skips_the_llm(llm):
+    async def scenario():
+        first = await search_service.extraer_informacion_propuesta("Busco analista")
+        # El hash ignora espacios al borde del texto
+        again = await search_service.extraer_informacion_propuesta("  Busco analista\n")
+        return first, again
+
+    first, again = asyncio.run(scenario())
+    assert first.model_dump() == again.model_dump() == PROPUESTA
+    assert len(llm) == 1
+    assert search_service.extraction_cache.stats()["hits"] == 1
+
+
+def test_fallback_result_is_not_memoized(llm, monkeypatch):
+    async def failing(**kwargs):
+        llm.append(kwargs)
+        raise RuntimeError("proveedor caído")
+
+    client = search_service.get_openai_client()
+    monkeypatch.setattr(client.chat.completions, "create", failing)
+
+    async def scenario():
+        fallback = await search_service.extraer_informacion_propuesta("Busco analista")
+        await search_service.extraer_informacion_propuesta("Busco analista")
+        return fallback
+
+    assert asyncio.run(scenario()).empresa == "Empresa no identificada"
+    assert len(llm) == 2
+
+
+def test_memo_is_bounded_by_entries(tmp_path):
+    async def scenario():
+        cache = ExtractionCache(str(tmp_path / "extraction.sqlite3"), max_entries=2)
+        keys = [cache.make_key("gpt-4o-mini", f"texto {n}") for n in range(3)]
+        # Pausas para que las marcas de uso no coincidan
+        await cache.set(keys[0], {"n": 0})
+        await asyncio.sleep(0.01)
+        await cache.set(keys[1], {"n": 1})
+        await asyncio.sleep(0.01)
+        assert await cache.get(keys[0]) == {"n": 0}  # el más reciente ahora es 0
+        await asyncio.sleep(0.01)
+        await cache.set(keys[2], {"n": 2})
+
+        assert await cache.get(keys[1]) is None
+        assert await cache.get(keys[0]) == {"n": 0}
+        assert cache.stats()["entries"] == 2
+        cache.close()
+
+    asyncio.run(scenario())
+
+
+def test_key_depends_on_model_and_text():
+    key = ExtractionCache.make_key("gpt-4o-mini", "texto")
+    assert key == ExtractionCache.make_key("gpt-4o-mini", " texto ")
+    assert key != ExtractionCache.make_key("gpt-4.1-mini", "texto")
+    assert key != ExtractionCache.make_key("gpt-4o-mini", "otro texto")
@@ -0,0 +1,168 @@
+from services.job_queue import JobQueue
+import asyncio
+import time
+
+import pytest
+
+
+@pytest.fixture
+def make_queue(tmp_path):
+    queues = []
+
+    def make(**kwargs):
+        options = {"workers": 1, "poll_interval": 0.05, "lease_seconds": 0.3}
+        options.update(kwargs)
+        queue = JobQueue(str(tmp_path / "jobs.sqlite3"), **options)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.close()
+
+
+async def wait_status(queue: JobQueue, job_id: str, status: str, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = await queue.get(job_id)
+        if job["status"] == status:
+            return job
+        await queue.wait_for_change(job_id, 0.05)
+    raise AssertionError(f"{job_id} no llegó a {status}: {job}")
+
+
+def test_identical_jobs_are_deduplicated(make_queue):
+    async def scenario():
+        queue = make_queue()
+        calls = []
+
+        async def handler(payload):
+            calls.append(payload)
+            return {"eco": payload["texto"]}
+
+        queue.register("eco", handler)
+        first, duplicated = await queue.submit("eco", {"texto": "hola"})
+        assert not duplicated
+        second, duplicated = await queue.submit("eco", {"texto": "hola"})
+        assert duplicated and second["id"] == first["id"]
+
+        await queue.start()
+        try:
+            job = await wait_status(queue, first["id"], "done")
+            # Terminado también se reutiliza
+            third, duplicated = await queue.submit("eco", {"texto": "hola"})
+        finally:
+            await queue.stop()
+
+        assert job["result"] == {"eco": "hola"}
+        assert duplicated and third["id"] == first["id"]
+        assert len(calls) == 1
+
+    asyncio.run(scenario())
+
+
+def test_failed_job_can_be_submitted_again(make_queue):
+    async def scenario():
+        queue = make_queue()
+        attempts = []
+
+        async def handler(payload):
+            attempts.append(payload)
+            if len(attempts) == 1:
+                raise RuntimeError("proveedor caído")
+            return {"ok": True}
+
+        queue.register("falla", handler)
+        await queue.start()
+        try:
+            failed, _ = await queue.submit("falla", {"n": 1})
+            job = await wait_status(queue, failed["id"], "error")
+            assert job["error"] == "proveedor caído"
+
+            retry, duplicated = await queue.submit("falla", {"n": 1})
+            assert not duplicated and retry["id"] != failed["id"]
+            job = await wait_status(queue, retry["id"], "done")
+        finally:
+            await queue.stop()
+        assert job["result"] == {"ok": True}
+
+    asyncio.run(scenario())
+
+
+def test_expired_lease_is_recovered(make_queue):
+    async def scenario():
+        queue = make_queue(lease_seconds=0.1)
+        queue.register("eco", _echo)
+        submitted, _ = await queue.submit("eco", {"texto": "hola"})
+
+        # Un proceso que murió después de tomar el trabajo
+        assert (await asyncio.to_thread(queue._claim))["id"] == submitted["id"]
+        await asyncio.sleep(0.15)
+
+        await queue.start()
+        try:
+            job = await wait_status(queue, submitted["id"], "done")
+        finally:
+            await queue.stop()
+        assert job["attempts"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_attempts_are_limited(make_queue):
+    async def scenario():
+        queue = make_queue(lease_seconds=0.1, max_attempts=2)
+        queue.register("eco", _echo)
+        submitted, _ = await queue.submit("eco", {"texto": "hola"})
+
+        for _ in range(2):
+            assert await asyncio.to_thread(queue._claim) is not None
+            await asyncio.sleep(0.15)
+
+        await queue.start()
+        try:
+            job = await wait_status(queue, submitted["id"], "error")
+        finally:
+            await queue.stop()
+        assert job["error"] == "Se agotaron los intentos"
+        assert job["attempts"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_stop_right_after_submit_does_not_hang(make_queue):
+    async def scenario(n):
+        queue = make_queue(workers=2, poll_interval=1.0)
+        queue.register("eco", _echo)
+        await queue.start()
+        # Workers esperando el aviso; submit los despierta justo antes de stop
+        await asyncio.sleep(0.02)
+        await queue.submit("eco", {"n": n})
+        await asyncio.wait_for(queue.stop(), 2.0)
+        assert queue.stats()["workers"] == 0
+
+    for n in range(5):
+        asyncio.run(scenario(n))
+
+
+def test_stop_interrupts_running_job(make_queue):
+    async def scenario():
+        queue = make_queue()
+
+        async def slow(payload):
+            await asyncio.sleep(10)
+
+        queue.register("lento", slow)
+        await queue.start()
+        submitted, _ = await queue.submit("lento", {})
+        await wait_status(queue, submitted["id"], "running")
+        await asyncio.wait_for(queue.stop(), 1.0)
+
+        # Queda "running" para que otro proceso lo retome al vencer el lease
+        assert (await queue.get(submitted["id"]))["status"] == "running"
+
+    asyncio.run(scenario())
+
+
+async def _echo(payload):
+    return payload
@@ -0,0 +1,66 @@
+from services.question_bank import QuestionBank, etag_matches
+import json
+import os
+
+import pytest
+
+
+def _write(path, preguntas):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"preguntas_entrevista": preguntas}, f)
+
+
+def test_reloads_when_the_file_changes(tmp_path):
+    path = tmp_path / "preguntas.json"
+    _write(path, [{"id": 1}])
+    bank = QuestionBank(str(path))
+    assert bank.get() == ([{"id": 1}], 1)
+    _, etag = bank.response()
+
+    _write(path, [{"id": 1}, {"id": 2}])
+    os.utime(path, ns=(0, 10**18))
+    assert bank.get() == ([{"id": 1}, {"id": 2}], 2)
+    assert bank.response()[1] != etag
+
+
+@pytest.mark.parametrize("breakage", ["missing", "truncated"])
+def test_keeps_serving_the_loaded_version(tmp_path, breakage):
+    path = tmp_path / "preguntas.json"
+    _write(path, [{"id": 1}])
+    bank = QuestionBank(str(path))
+    body, etag = bank.response()
+
+    # Guardado atómico de un editor: el archivo falta o queda a medias un instante
+    if breakage == "missing":
+        os.remove(path)
+    else:
+        path.write_text('{"preguntas_entrevista": [', encoding="utf-8")
+    assert bank.response() == (body, etag)
+    assert bank.version == 1
+
+    _write(path, [{"id": 2}])
+    os.utime(path, ns=(0, 10**18))
+    assert bank.get() == ([{"id": 2}], 2)
+
+
+def test_without_a_loaded_version_errors_propagate(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        QuestionBank(str(tmp_path / "no-existe.json")).get()
+
+
+@pytest.mark.parametrize(
+    "if_none_match, expected",
+    [
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"x", "abc" ,"y"', True),
+        ("*", True),
+        ("", False),
+        ('"abcd"', False),
+        ('"xabc"', False),
+        ('"abc", W/"ab"', True),
+        ("abc", False),
+    ],
+)
+def test_etag_matches(if_none_match, expected):
+    assert etag_matches('"abc"', if_none_match) is expected
@@ -0,0 +1,114 @@
+from services.research_cache import ResearchCache
+import asyncio
+import time
+
+import pytest
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    caches = []
+
+    def make(ttl_seconds=60.0, stale_seconds=0.0):
+        cache = ResearchCache(
+            str(tmp_path / "research.sqlite3"), ttl_seconds, stale_seconds
+        )
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+class Fetcher:
+    """Búsqueda simulada que cuenta sus llamadas"""
+
+    def __init__(self, value, delay=0.05, error=None):
+        self.value = value
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.value
+
+
+def test_concurrent_misses_share_one_fetch(make_cache):
+    async def scenario():
+        cache = make_cache()
+        fetch = Fetcher({"contenido": "ACME"})
+        key = cache.make_key("empresa", "ACME", "Analista")
+        results = await asyncio.gather(
+            *(cache.get_or_fetch(key, fetch) for _ in range(5))
+        )
+        assert results == [{"contenido": "ACME"}] * 5
+        assert fetch.calls == 1
+        assert cache.stats()["coalesced"] == 4
+
+        # Ya guardado: un acierto no vuelve a consultar
+        assert await cache.get_or_fetch(key, fetch) == {"contenido": "ACME"}
+        assert fetch.calls == 1 and cache.stats()["hits"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_stale_entry_is_served_and_refreshed_in_background(make_cache):
+    async def scenario():
+        cache = make_cache(ttl_seconds=0.05, stale_seconds=60)
+        key = cache.make_key("empresa", "ACME")
+        await cache.get_or_fetch(key, Fetcher({"version": 1}, delay=0))
+        await asyncio.sleep(0.1)
+
+        slow = Fetcher({"version": 2}, delay=0.3)
+        start = time.monotonic()
+        assert await cache.get_or_fetch(key, slow) == {"version": 1}
+        assert time.monotonic() - start < 0.2
+        assert cache.stats()["stale_hits"] == 1
+
+        # Mientras el refresco está en vuelo no se lanza otro
+        await cache.get_or_fetch(key, slow)
+        await asyncio.gather(*cache._refreshes)
+        assert slow.calls == 1
+        assert await cache.get_or_fetch(key, slow) == {"version": 2}
+
+    asyncio.run(scenario())
+
+
+def test_failed_refresh_keeps_serving_the_stale_entry(make_cache):
+    async def scenario():
+        cache = make_cache(ttl_seconds=0.05, stale_seconds=60)
+        key = cache.make_key("empresa", "ACME")
+        await cache.get_or_fetch(key, Fetcher({"version": 1}, delay=0))
+        await asyncio.sleep(0.1)
+
+        failing = Fetcher(None, delay=0, error=RuntimeError("Sonar caído"))
+        assert await cache.get_or_fetch(key, failing) == {"version": 1}
+        await asyncio.gather(*cache._refreshes, return_exceptions=True)
+        assert cache.stats()["refresh_errors"] == 1
+        assert await cache.get_or_fetch(key, failing) == {"version": 1}
+
+    asyncio.run(scenario())
+
+
+def test_failed_fetch_is_not_stored(make_cache):
+    async def scenario():
+        cache = make_cache()
+        key = cache.make_key("empresa", "ACME")
+        with pytest.raises(RuntimeError):
+            await cache.get_or_fetch(key, Fetcher(None, error=RuntimeError("caído")))
+        fetch = Fetcher({"contenido": "ACME"})
+        assert await cache.get_or_fetch(key, fetch) == {"contenido": "ACME"}
+        assert fetch.calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_keys_are_normalized():
+    assert ResearchCache.make_key("empresa", " Banco  de Crédito ", "Analista") == (
+        ResearchCache.make_key("empresa", "banco de credito", "ANALISTA")
+    )
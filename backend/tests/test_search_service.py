@@ -0,0 +1,101 @@
+from services import search_service
+from services.search_service import PropuestaLaboral, SonarResponse
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Reemplaza los pasos que llaman a proveedores; devuelve las preguntas a emitir"""
+    preguntas = ["¿Por qué este puesto?", "¿Qué sabes de SQL?"]
+
+    async def extraer(texto):
+        return PropuestaLaboral(
+            empresa="ACME", puesto="Analista", descripcion=texto, requisitos="SQL"
+        )
+
+    async def buscar(empresa, puesto):
+        return SonarResponse(contenido="ACME vende de todo", fuentes=[{}])
+
+    async def preguntas_stream(propuesta, contexto):
+        for pregunta in preguntas:
+            await asyncio.sleep(0)
+            yield pregunta
+
+    monkeypatch.setattr(search_service, "extraer_informacion_propuesta", extraer)
+    monkeypatch.setattr(search_service, "buscar_empresa", buscar)
+    monkeypatch.setattr(search_service, "generar_preguntas_stream", preguntas_stream)
+    return preguntas
+
+
+def test_job_and_sse_share_the_pipeline(pipeline):
+    async def scenario():
+        resultado = await search_service._trabajo_entrevista({"texto": "Analista"})
+        eventos = [
+            evento
+            async for evento in search_service.generar_entrevista_eventos("Analista")
+        ]
+        return resultado, eventos
+
+    resultado, eventos = asyncio.run(scenario())
+    assert resultado["preguntas"] == pipeline
+    assert resultado["propuesta_extraida"]["empresa"] == "ACME"
+    assert [nombre for nombre, _ in eventos] == [
+        "propuesta",
+        "investigacion",
+        "pregunta",
+        "pregunta",
+        "fin",
+    ]
+    assert eventos[-1][1] == resultado
+
+
+def test_pipeline_without_questions_fails(pipeline):
+    pipeline.clear()
+
+    async def scenario():
+        with pytest.raises(ValueError, match="no generó preguntas"):
+            await search_service._trabajo_entrevista({"texto": "Analista"})
+        with pytest.raises(ValueError, match="no generó preguntas"):
+            async for _ in search_service.generar_entrevista_eventos("Analista"):
+                pass
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize(
+    "fragmentos, esperado",
+    [
+        (['{"preguntas": ["a", "b"]}'], ["a", "b"]),
+        # Clave, corchete y comillas partidos entre fragmentos
+        (['{"pregun', 'tas"', " :", ' [ "uno', '", "do', 's"]}'], ["uno", "dos"]),
+        # Escape partido justo después de la barra
+        (['{"preguntas": ["di \\', '"hola\\"', ' y sigue"]}'], ['di "hola" y sigue']),
+        (['{"preguntas": ["caf\\u00', 'e9"]}'], ["café"]),
+        (['{"preguntas": ["línea\nsiguiente"]}'], ["línea\nsiguiente"]),
+        # Otra clave antes y arreglo vacío
+        (['{"intro": "x", "preguntas": []}'], []),
+        # Un elemento que no es string termina el arreglo
+        (['{"preguntas": ["a", 3, "b"]}'], ["a"]),
+        # Arreglo a medias: solo salen los elementos cerrados
+        (['{"preguntas": ["a", "b'], ["a"]),
+        (['{"otra": ["a"]}'], []),
+    ],
+)
+def test_extractor_arreglo_json(fragmentos, esperado):
+    extractor = search_service.ExtractorArregloJSON("preguntas")
+    elementos = []
+    for fragmento in fragmentos:
+        elementos.extend(extractor.feed(fragmento))
+    assert elementos == esperado
+
+
+@pytest.mark.parametrize("tamano", [1, 3, 7])
+def test_extractor_emits_each_element_once_in_any_split(tamano):
+    texto = '{"preguntas": ["¿Por qué \\"aquí\\"?", "¿Y SQL?", "¿Algo más?"]}'
+    extractor = search_service.ExtractorArregloJSON("preguntas")
+    elementos = []
+    for i in range(0, len(texto), tamano):
+        elementos.extend(extractor.feed(texto[i : i + tamano]))
+    assert elementos == ['¿Por qué "aquí"?', "¿Y SQL?", "¿Algo más?"]
@@ -0,0 +1,47 @@
+from services.tts_service import SentenceChunker
+import pytest
+
+CASOS = [
+    ("Hola mundo feliz. Adiós mundo cruel.", ["Hola mundo feliz", "Adiós mundo cruel"]),
+    ("El Dr. Pérez llegó tarde hoy.", ["El Dr. Pérez llegó tarde hoy"]),
+    (
+        "La Sra. Gómez y el Ing. Ruiz trabajan. Ahora hablamos nosotros tres.",
+        ["La Sra. Gómez y el Ing. Ruiz trabajan", "Ahora hablamos nosotros tres"],
+    ),
+    (
+        "Viví en EE. UU. durante años. Volví hace poco tiempo.",
+        ["Viví en EE. UU", "durante años", "Volví hace poco tiempo"],
+    ),
+    ("Me lo dijo J. Pérez ayer mismo.", ["Me lo dijo J. Pérez ayer mismo"]),
+    ("El sueldo subió 3.5 por ciento", ["El sueldo subió 3.5 por ciento"]),
+    (
+        "Pagan 1.200 dólares al mes. Es poco dinero.",
+        ["Pagan 1.200 dólares al mes", "Es poco dinero"],
+    ),
+    ("¿Qué tal te fue? ¡Muy bien, gracias!", ["¿Qué tal te fue", "¡Muy bien, gracias"]),
+    ("Bueno... sigamos con la entrevista.", ["Bueno", "sigamos con la entrevista"]),
+    ("Asistente: Cuéntame de tu experiencia.", ["Cuéntame de tu experiencia"]),
+]
+
+
+@pytest.mark.parametrize("texto, esperado", CASOS)
+def test_flush_splits_sentences(texto, esperado):
+    assert SentenceChunker(min_words=3).flush(texto) == esperado
+
+
+@pytest.mark.parametrize("texto, esperado", CASOS)
+@pytest.mark.parametrize("tamano", [1, 2, 5])
+def test_streamed_feed_matches_flush(texto, esperado, tamano):
+    # El LLM entrega el texto en trozos arbitrarios, incluso a mitad de palabra
+    chunker = SentenceChunker(min_words=3)
+    chunks = []
+    for i in range(0, len(texto), tamano):
+        chunks.extend(chunker.feed(texto[i : i + tamano]))
+    assert chunks + chunker.flush() == esperado
+
+
+def test_feed_waits_for_the_space_after_the_period():
+    chunker = SentenceChunker(min_words=1)
+    assert chunker.feed("Ganó 3.") == []
+    assert chunker.feed("5 puntos. Luego") == ["Ganó 3.5 puntos"]
+    assert chunker.flush() == ["Luego"]
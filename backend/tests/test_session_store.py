@@ -0,0 +1,148 @@
+from config import settings
+from services.chat_service import ChatService
+from services.session_store import (
+    InMemorySessionStore,
+    RedisSessionStore,
+    SesionExpiradaError,
+    SessionState,
+)
+import asyncio
+import os
+import uuid
+
+import pytest
+
+# Base de datos aparte para no pisar sesiones reales de un Redis local
+REDIS_TEST_URL = os.environ.get("REDIS_TEST_URL", "redis://localhost:6379/15")
+TTL_SECONDS = 1
+
+
+def _redis_available() -> bool:
+    try:
+        import redis
+    except ImportError:
+        return False
+    try:
+        client = redis.Redis.from_url(REDIS_TEST_URL, socket_connect_timeout=0.5)
+        client.ping()
+        client.close()
+        return True
+    except redis.RedisError:
+        return False
+
+
+class Stores:
+    """Crea almacenes de un tipo y los limpia en el mismo event loop del test"""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.prefix = f"test-{uuid.uuid4().hex}"
+        self._stores = []
+
+    def make(self, ttl_seconds: int = 0):
+        if self.kind == "memory":
+            store = InMemorySessionStore(ttl_seconds=ttl_seconds)
+        else:
+            # Los almacenes de Redis comparten prefijo: son workers distintos
+            store = RedisSessionStore(
+                REDIS_TEST_URL, prefix=self.prefix, ttl_seconds=ttl_seconds
+            )
+        self._stores.append(store)
+        return store
+
+    def run(self, scenario):
+        async def run_and_close():
+            try:
+                await scenario()
+            finally:
+                for store in self._stores:
+                    if isinstance(store, RedisSessionStore):
+                        async for key in store._redis.scan_iter(f"{self.prefix}:*"):
+                            await store._redis.delete(key)
+                    await store.close()
+
+        asyncio.run(run_and_close())
+
+
+@pytest.fixture(params=["memory", "redis"])
+def stores(request):
+    if request.param == "redis" and not _redis_available():
+        pytest.skip(f"Sin servidor Redis en {REDIS_TEST_URL}")
+    return Stores(request.param)
+
+
+async def _expire(store):
+    await asyncio.sleep(TTL_SECONDS + 0.2)
+    # En memoria la expiración la hace el barrido; Redis expira por su cuenta
+    await store.sweep()
+
+
+def test_get_save_delete(stores):
+    async def scenario():
+        store = stores.make()
+        assert await store.get_session("s1") is None
+
+        state = SessionState(profile="perfil")
+        state.messages.append({"role": "assistant", "content": "Hola"})
+        await store.save_session("s1", state)
+
+        loaded = await store.get_session("s1")
+        assert loaded.profile == "perfil"
+        assert loaded.messages == [{"role": "assistant", "content": "Hola"}]
+
+        loaded.messages.append({"role": "user", "content": "Buenas"})
+        loaded.initial_message_sent = True
+        await store.save_session("s1", loaded)
+        reloaded = await store.get_session("s1")
+        assert len(reloaded.messages) == 2 and reloaded.initial_message_sent
+
+        await store.delete_session("s1")
+        assert await store.get_session("s1") is None
+        # Borrar una sesión inexistente no falla
+        await store.delete_session("s1")
+
+    stores.run(scenario)
+
+
+def test_inactive_session_expires(stores):
+    async def scenario():
+        store = stores.make(ttl_seconds=TTL_SECONDS)
+        await store.save_session("inactiva", SessionState())
+        await _expire(store)
+        assert await store.get_session("inactiva") is None
+
+    stores.run(scenario)
+
+
+def test_sessions_are_shared_between_workers(stores):
+    if stores.kind == "memory":
+        pytest.skip("El almacén en memoria es de un solo proceso")
+
+    async def scenario():
+        worker_a, worker_b = stores.make(), stores.make()
+        await worker_a.save_session("s1", SessionState(profile="perfil"))
+        # Tras reconectar en otro worker la conversación sigue ahí
+        assert (await worker_b.get_session("s1")).profile == "perfil"
+        await worker_b.delete_session("s1")
+        assert await worker_a.get_session("s1") is None
+
+    stores.run(scenario)
+
+
+def test_expired_session_is_reported_to_chat(stores, monkeypatch):
+    monkeypatch.setattr(settings, "openai_api_key", "sk-test")
+
+    async def scenario():
+        store = stores.make(ttl_seconds=TTL_SECONDS)
+        chat = ChatService(store=store)
+        await chat.start_conversation("s1", "")
+        assert await chat.get_response("", "s1")  # presentación
+
+        await _expire(store)
+        with pytest.raises(SesionExpiradaError):
+            await chat.get_response("Hola, soy Ana", "s1")
+        with pytest.raises(SesionExpiradaError):
+            async for _ in chat.stream_response("Hola, soy Ana", "s1"):
+                pass
+
+    stores.run(scenario)
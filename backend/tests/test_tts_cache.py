@@ -0,0 +1,95 @@
+from config import settings
+from services.audio_format import DEFAULT_AUDIO_FORMAT
+from services.tts_cache import TTSCache
+import asyncio
+import os
+import time
+
+import services.tts_service as tts_module
+
+
+def test_memory_lru_evicts_at_byte_cap():
+    async def scenario():
+        cache = TTSCache(max_memory_bytes=100)
+        await cache.set("a", b"a" * 40)
+        await cache.set("b", b"b" * 40)
+        assert await cache.get("a") is not None  # "a" pasa a ser la más reciente
+        await cache.set("c", b"c" * 40)
+
+        assert await cache.get("b") is None
+        assert await cache.get("a") == b"a" * 40
+        assert await cache.get("c") == b"c" * 40
+        assert cache.stats()["memory_bytes"] == 80
+
+        # Más grande que todo el presupuesto: no desplaza a nadie
+        await cache.set("d", b"d" * 101)
+        assert cache.stats()["memory_entries"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_disk_evicts_least_recently_used_at_byte_cap(tmp_path):
+    async def scenario():
+        cache = TTSCache(
+            max_memory_bytes=0, directory=str(tmp_path), max_disk_bytes=350
+        )
+        for n, key in enumerate(("aa1", "bb2", "cc3")):
+            await cache.set(key, bytes(100))
+            # Fechas distintas aunque el sistema de archivos tenga poca resolución
+            os.utime(cache._path(key), (time.time() - 100 + n, time.time() - 100 + n))
+        # Leer "aa1" lo renueva; la más antigua pasa a ser "bb2"
+        assert await cache.get("aa1") is not None
+
+        await cache.set("dd4", bytes(100))
+        assert await cache.get("bb2") is None
+        for key in ("aa1", "cc3", "dd4"):
+            assert await cache.get(key) is not None
+        assert cache.stats()["disk_bytes"] == 300
+        assert cache.stats()["disk_evictions"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_writes_of_the_same_key(tmp_path):
+    async def scenario():
+        cache = TTSCache(max_memory_bytes=1024, directory=str(tmp_path))
+        await asyncio.gather(*(cache.set("clave", bytes([n]) * 64) for n in range(8)))
+        leftovers = [name for _, _, names in os.walk(tmp_path) for name in names]
+        assert leftovers == ["clave"]
+
+    asyncio.run(scenario())
+
+
+def test_cache_hit_skips_the_provider(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "openai_api_key", "sk-test")
+    monkeypatch.setattr(
+        tts_module, "tts_cache", TTSCache(1024 * 1024, directory=str(tmp_path))
+    )
+    tts = tts_module.TTSService()
+    profile = tts.profiles.default
+    calls = []
+
+    async def fake_provider(text, profile, audio_format):
+        calls.append(text)
+        return b"audio:" + text.encode()
+
+    monkeypatch.setattr(tts, "_generate_speech", fake_provider)
+
+    async def scenario():
+        first = await tts._generate_single_chunk("Hola.", profile, DEFAULT_AUDIO_FORMAT)
+        again = await tts._generate_single_chunk("Hola.", profile, DEFAULT_AUDIO_FORMAT)
+        assert first == again == b"audio:Hola."
+        assert calls == ["Hola."]
+
+        # Tras un reinicio la entrada sigue en disco
+        monkeypatch.setattr(
+            tts_module, "tts_cache", TTSCache(1024 * 1024, directory=str(tmp_path))
+        )
+        assert (
+            await tts._generate_single_chunk("Hola.", profile, DEFAULT_AUDIO_FORMAT)
+            == b"audio:Hola."
+        )
+        assert calls == ["Hola."]
+        assert tts_module.tts_cache.stats()["disk_hits"] == 1
+
+    asyncio.run(scenario())
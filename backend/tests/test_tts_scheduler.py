@@ -0,0 +1,62 @@
+from services.tts_scheduler import TTSScheduler
+import asyncio
+import time
+
+
+def test_cancelled_job_frees_its_slot():
+    async def scenario():
+        scheduler = TTSScheduler(max_concurrent=1)
+        provider_cancelled = asyncio.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(0.5)
+            except asyncio.CancelledError:
+                provider_cancelled.set()
+                raise
+            return "lento"
+
+        async def fast():
+            return "rápido"
+
+        first = asyncio.ensure_future(scheduler.submit("a", slow))
+        await asyncio.sleep(0.01)
+        assert scheduler.stats()["running"] == 1
+
+        # Barge-in: la sesión deja de esperar la síntesis en curso
+        first.cancel()
+        start = time.monotonic()
+        result = await scheduler.submit("b", fast)
+
+        assert result == "rápido"
+        assert time.monotonic() - start < 0.2
+        assert provider_cancelled.is_set()
+        assert scheduler.stats()["running"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_round_robin_between_sessions():
+    async def scenario():
+        scheduler = TTSScheduler(max_concurrent=1)
+        order = []
+
+        def job(name):
+            async def run():
+                order.append(name)
+                await asyncio.sleep(0)
+                return name
+
+            return run
+
+        # La primera ocupa el cupo mientras se encola el resto
+        await asyncio.gather(
+            scheduler.submit("x", job("x1")),
+            scheduler.submit("a", job("a1")),
+            scheduler.submit("a", job("a2")),
+            scheduler.submit("b", job("b1")),
+            scheduler.submit("c", job("c1"), priority=True),
+        )
+        assert order == ["x1", "c1", "a1", "b1", "a2"]
+
+    asyncio.run(scenario())
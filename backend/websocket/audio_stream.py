@@ -0,0 +1,75 @@
+from typing import Awaitable, Callable, List, Optional
+from services.audio_utils import AudioInvalidoError, pcm16_to_wav
+from services.stt_service import STTService
+from services.vad import EnergyVAD
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_ENCODINGS = ("pcm16",)
+
+
+class AudioStream:
+    """Respuesta del candidato que llega en streaming desde el micrófono.
+
+    El VAD corta el audio en segmentos de voz y cada segmento se transcribe
+    apenas termina, mientras el candidato sigue hablando. Al cerrar el turno
+    solo queda pendiente la transcripción del último segmento.
+    """
+
+    def __init__(
+        self,
+        stt_service: STTService,
+        sample_rate: int,
+        on_partial: Optional[Callable[[int, str], Awaitable[None]]] = None,
+    ):
+        self.stt_service = stt_service
+        self.sample_rate = sample_rate
+        self.vad = EnergyVAD(sample_rate)
+        self.on_partial = on_partial
+        self._transcriptions: List[asyncio.Task] = []
+
+    @property
+    def end_of_turn(self) -> bool:
+        return self.vad.end_of_turn
+
+    def push(self, pcm: bytes):
+        """Agrega un bloque de PCM16 y lanza la transcripción de los segmentos completos"""
+        for segment in self.vad.process(pcm):
+            self._transcribe(segment)
+
+    async def finish(self) -> str:
+        """Cierra el turno y devuelve la transcripción completa, en orden"""
+        segment = self.vad.flush()
+        if segment:
+            self._transcribe(segment)
+
+        texts = await asyncio.gather(*self._transcriptions)
+        return " ".join(text for text in texts if text)
+
+    def cancel(self):
+        for task in self._transcriptions:
+            task.cancel()
+
+    def _transcribe(self, segment: bytes):
+        index = len(self._transcriptions)
+        self._transcriptions.append(
+            asyncio.create_task(self._transcribe_segment(index, segment))
+        )
+
+    async def _transcribe_segment(self, index: int, segment: bytes) -> str:
+        wav = pcm16_to_wav(segment, self.sample_rate)
+        try:
+            text = await self.stt_service.transcribe_audio(wav)
+        except AudioInvalidoError:
+            # Segmentos demasiado cortos o ruido: no aportan texto
+            return ""
+
+        text = (text or "").strip()
+        if text and self.on_partial:
+            try:
+                await self.on_partial(index, text)
+            except Exception as e:
+                logger.error(f"Error enviando transcripción parcial: {e}")
+        return text
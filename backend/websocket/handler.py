@@ -1,14 +1,26 @@
 import asyncio
 import base64
 import json
+import logging
 import uuid
-from typing import Dict
+from typing import AsyncIterable, AsyncIterator, Coroutine, Dict, Optional, Union
 import time
 
-from fastapi import WebSocket
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.websockets import WebSocketState
+from services.audio_format import DEFAULT_AUDIO_FORMAT, AudioFormat
+from services.audio_utils import AudioInvalidoError
 from services.stt_service import STTService
 from services.chat_service import ChatService
-from services.tts_service import TTSService
+from services.interview_profiles import InterviewProfile
+from services.metrics import span
+from services.session_store import SesionExpiradaError
+from services.tts_service import SentenceChunker, TTSService
+from websocket import protocol
+from websocket.audio_stream import SUPPORTED_ENCODINGS, AudioStream
+from websocket.supervisor import SessionSupervisor
+
+logger = logging.getLogger(__name__)
 
 
 class WebSocketHandler:
@@ -17,135 +29,579 @@ class WebSocketHandler:
         self.chat_service = ChatService()
         self.tts_service = TTSService()
         self.active_sessions: Dict[str, WebSocket] = {}
+        # Opciones negociadas por sesión en el query string de /ws
+        self.session_options: Dict[str, Dict[str, bool]] = {}
+        # Perfil de entrevista de cada sesión (?perfil= al conectar)
+        self.session_profiles: Dict[str, InterviewProfile] = {}
+        # Formato del audio TTS de cada sesión (?audio_format= al conectar)
+        self.session_formats: Dict[str, AudioFormat] = {}
+        # Respuestas que están llegando en streaming desde el micrófono
+        self.audio_streams: Dict[str, AudioStream] = {}
+        # Tareas en curso (STT, chat, TTS) de cada sesión
+        self.supervisors: Dict[str, SessionSupervisor] = {}
+
+    async def connect(
+        self, websocket: WebSocket, session_id: str = None
+    ) -> Optional[str]:
+        options = self._parse_session_options(websocket)
+        # Confirmar el sub-protocolo binario solo si el cliente lo ofreció
+        subprotocol = (
+            protocol.SUBPROTOCOL
+            if protocol.SUBPROTOCOL in websocket.scope.get("subprotocols", [])
+            else None
+        )
+        await websocket.accept(subprotocol=subprotocol)
+
+        # ?perfil=<id>: qué entrevista se conduce (empresa, puesto, preguntas, voz)
+        profile_id = websocket.query_params.get("perfil") or None
+        try:
+            profile = self.chat_service.profiles.get(profile_id)
+        except KeyError:
+            await self._send_text(
+                websocket,
+                json.dumps(
+                    {
+                        "type": "error",
+                        "message": f"Perfil de entrevista desconocido: {profile_id}",
+                        "perfiles": self.chat_service.profiles.ids(),
+                    }
+                ),
+            )
+            await websocket.close(code=1008)
+            return None
 
-    async def connect(self, websocket: WebSocket, session_id: str = None) -> str:
-        await websocket.accept()
+        # ?audio_format=mp3|opus|pcm16|wav (y ?sample_rate= para PCM): formato del TTS
+        try:
+            audio_format = AudioFormat.parse(
+                websocket.query_params.get("audio_format"),
+                websocket.query_params.get("sample_rate"),
+            )
+        except ValueError as e:
+            await self._send_text(
+                websocket, json.dumps({"type": "error", "message": str(e)})
+            )
+            await websocket.close(code=1008)
+            return None
 
         # Usar session_id proporcionado o generar uno nuevo
         if not session_id:
             session_id = str(uuid.uuid4())
 
-        # Si es una sesión nueva con el mismo ID, limpiar la conversación anterior
-        if session_id in self.active_sessions:
-            # Limpiar conversación anterior
-            self.chat_service.clear_conversation(session_id)
-            print(f"Reiniciando sesión existente: {session_id}")
+        # La conversación vive en el almacén de sesiones: puede venir de otro worker
+        resumed = False
+        if await self.chat_service.has_conversation(session_id):
+            if options["resume"]:
+                resumed = True
+                logger.info(f"Retomando sesión existente: {session_id}")
+            else:
+                # Si es una sesión nueva con el mismo ID, limpiar la conversación anterior
+                await self.chat_service.clear_conversation(session_id)
+                logger.info(f"Reiniciando sesión existente: {session_id}")
+
+        # Lo que quedara en curso de una conexión anterior ya no tiene a quién responder
+        previous = self.supervisors.pop(session_id, None)
+        if previous:
+            await previous.close()
 
         self.active_sessions[session_id] = websocket
-        print(f"Conexión establecida: {session_id}")
+        self.session_options[session_id] = options
+        self.supervisors[session_id] = SessionSupervisor(session_id)
+        logger.info(f"Conexión establecida: {session_id}")
 
-        # María se presenta automáticamente al conectarse
-        await self._send_initial_presentation(websocket, session_id)
+        if resumed:
+            # Una sesión retomada conserva el perfil con el que empezó
+            profile = await self.chat_service.get_profile(session_id)
+        else:
+            await self.chat_service.start_conversation(session_id, profile.id)
+        self.session_profiles[session_id] = profile
+        self.session_formats[session_id] = audio_format
+        # Las líneas fijas de este perfil se sintetizan una vez por proceso y formato
+        self.tts_service.warm_up(profile, audio_format)
+
+        if resumed:
+            await self._send_text(
+                websocket,
+                json.dumps({"type": "session_resumed", "timestamp": time.time()}),
+            )
+        else:
+            # María se presenta automáticamente al conectarse
+            await self._send_initial_presentation(websocket, session_id)
 
         return session_id
 
+    def _parse_session_options(self, websocket: WebSocket) -> Dict[str, bool]:
+        """Lee las opciones de protocolo del query string de /ws"""
+        params = websocket.query_params
+        # ?stream=1: tokens del chat en vivo (chat_delta) y TTS por oración
+        stream = params.get("stream", "").lower() in ("1", "true")
+        # ?tts=chunks: audio progresivo (tts_chunk + tts_end) en vez de un único tts_result
+        progressive_tts = stream or params.get("tts", "").lower() == "chunks"
+        # ?binary=1 o sub-protocolo entre-vistas.bin.v1: audio en frames binarios
+        binary = params.get("binary", "").lower() in ("1", "true") or (
+            protocol.SUBPROTOCOL in websocket.scope.get("subprotocols", [])
+        )
+        # ?resume=1: continuar la conversación guardada (p. ej. tras un corte de red)
+        resume = params.get("resume", "").lower() in ("1", "true")
+        return {
+            "stream": stream,
+            "progressive_tts": progressive_tts,
+            "binary": binary,
+            "resume": resume,
+        }
+
     async def _send_initial_presentation(self, websocket: WebSocket, session_id: str):
         """Envía la presentación inicial de María automáticamente"""
         try:
-            print(f"[HANDLER] Iniciando presentación para sesión {session_id}")
+            logger.info(f"[HANDLER] Iniciando presentación para sesión {session_id}")
 
             # Obtener el mensaje inicial del chat service (devuelve el mensaje hardcodeado)
             initial_message = await self.chat_service.get_response("", session_id)
 
-            print(f"[HANDLER] Mensaje recibido del chat service: {initial_message}")
+            logger.info(
+                f"[HANDLER] Mensaje recibido del chat service: {initial_message}"
+            )
 
             if initial_message:
                 # Enviar el mensaje de chat inmediatamente
-                await websocket.send_text(
+                await self._send_text(
+                    websocket,
                     json.dumps(
                         {
                             "type": "chat_response",
                             "data": initial_message,
                             "timestamp": time.time(),
                         }
-                    )
+                    ),
                 )
 
-                print(f"[HANDLER] Mensaje enviado al frontend")
+                logger.info(f"[HANDLER] Mensaje enviado al frontend")
 
-                # Generar y enviar el audio en paralelo
-                asyncio.create_task(
-                    self._process_and_send_tts(websocket, initial_message, session_id)
+                # El audio de la presentación es fijo: se pre-renderiza una vez por
+                # proceso y, si ya está en memoria, sale junto con el saludo
+                profile = self.session_profiles.get(session_id)
+                audio_format = self.session_formats.get(
+                    session_id, DEFAULT_AUDIO_FORMAT
                 )
+                if (
+                    self.tts_service.prerendered_ready(
+                        initial_message, profile, audio_format
+                    )
+                    is not None
+                ):
+                    await self._process_and_send_tts(
+                        websocket, initial_message, session_id
+                    )
+                else:
+                    self._spawn(
+                        session_id,
+                        self._send_scripted_tts(websocket, initial_message, session_id),
+                        "tts",
+                    )
             else:
-                print("[HANDLER] No se recibió mensaje inicial del chat service")
+                logger.warning(
+                    "[HANDLER] No se recibió mensaje inicial del chat service"
+                )
 
         except Exception as e:
-            print(f"[HANDLER] Error en presentación inicial: {e}")
+            logger.error(f"[HANDLER] Error en presentación inicial: {e}")
+
+    async def _send_scripted_tts(
+        self, websocket: WebSocket, text: str, session_id: str
+    ):
+        """Espera el pre-renderizado compartido de una línea fija y envía su audio"""
+        await self.tts_service.get_prerendered(
+            text,
+            self.session_profiles.get(session_id),
+            self.session_formats.get(session_id, DEFAULT_AUDIO_FORMAT),
+        )
+        await self._process_and_send_tts(websocket, text, session_id)
+
+    async def _send_text(self, websocket: WebSocket, text: str):
+        with span("ws_send"):
+            await websocket.send_text(text)
+
+    async def _send_bytes(self, websocket: WebSocket, data: bytes):
+        with span("ws_send"):
+            await websocket.send_bytes(data)
+
+    def _spawn(self, session_id: str, coro: Coroutine, name: str):
+        """Lanza una tarea bajo el supervisor de la sesión"""
+        supervisor = self.supervisors.get(session_id)
+        if supervisor is None:
+            coro.close()
+            return None
+        return supervisor.spawn(coro, name)
+
+    async def _start_turn(self, websocket: WebSocket, session_id: str, coro: Coroutine):
+        """Nueva intervención del candidato: interrumpe lo anterior y la procesa en segundo plano"""
+        await self._barge_in(websocket, session_id)
+        self._spawn(session_id, coro, "turno")
+
+    async def _barge_in(self, websocket: WebSocket, session_id: str):
+        """Cancela la generación en curso (chat, TTS) que quedó obsoleta"""
+        supervisor = self.supervisors.get(session_id)
+        if supervisor is None:
+            return
+
+        cancelled = supervisor.cancel_all()
+        if cancelled:
+            logger.info(
+                f"[HANDLER] Barge-in en {session_id}: {cancelled} tareas canceladas"
+            )
+            await self._send_text(
+                websocket,
+                json.dumps(
+                    {
+                        "type": "barge_in",
+                        "cancelled": cancelled,
+                        "timestamp": time.time(),
+                    }
+                ),
+            )
+
+    async def disconnect(
+        self,
+        session_id: str,
+        websocket: WebSocket = None,
+        keep_conversation: bool = False,
+    ):
+        # Una conexión reemplazada por otra con el mismo ID no limpia la nueva
+        if (
+            websocket is not None
+            and self.active_sessions.get(session_id) is not websocket
+        ):
+            logger.info("connection closed")
+            return
+
+        supervisor = self.supervisors.pop(session_id, None)
+        if supervisor:
+            await supervisor.close()
 
-    async def disconnect(self, session_id: str):
         if session_id in self.active_sessions:
             del self.active_sessions[session_id]
-            self.chat_service.clear_conversation(session_id)
-        print("connection closed")
+            # Tras un corte abrupto se conserva la conversación para ?resume=1
+            if not keep_conversation:
+                await self.chat_service.clear_conversation(session_id)
+        self.session_options.pop(session_id, None)
+        self.session_profiles.pop(session_id, None)
+        self.session_formats.pop(session_id, None)
+        stream = self.audio_streams.pop(session_id, None)
+        if stream:
+            stream.cancel()
+        logger.info("connection closed")
+
+    async def sweep_stale_connections(self) -> int:
+        """Limpia el estado local de sockets que se cerraron sin pasar por disconnect"""
+        stale = [
+            (session_id, websocket)
+            for session_id, websocket in self.active_sessions.items()
+            if WebSocketState.DISCONNECTED
+            in (websocket.client_state, websocket.application_state)
+        ]
+        for session_id, websocket in stale:
+            await self.disconnect(session_id, websocket, keep_conversation=True)
+        return len(stale)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "connected": len(self.active_sessions),
+            "audio_streams": len(self.audio_streams),
+            "supervised_tasks": sum(s.active for s in self.supervisors.values()),
+        }
 
     async def handle_message(self, websocket: WebSocket, session_id: str):
         try:
             while True:
-                message = await websocket.receive_text()
-                data = json.loads(message)
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
+
+                # Frames binarios: cabecera + audio crudo
+                if message.get("bytes") is not None:
+                    try:
+                        # Solo el decodificado: la espera de receive() incluye lo
+                        # que el candidato tarda en hablar y no es latencia
+                        with span("ws_decode"):
+                            kind, _, payload = protocol.decode_frame(message["bytes"])
+                    except protocol.FrameError as e:
+                        await self._send_text(
+                            websocket,
+                            json.dumps(
+                                {
+                                    "type": "error",
+                                    "data": str(e),
+                                    "timestamp": time.time(),
+                                }
+                            ),
+                        )
+                        continue
+
+                    if kind == protocol.FRAME_AUDIO_UPLOAD:
+                        await self._start_turn(
+                            websocket,
+                            session_id,
+                            self._process_audio(websocket, payload, session_id),
+                        )
+                    elif kind == protocol.FRAME_AUDIO_STREAM:
+                        await self._push_audio_stream(websocket, payload, session_id)
+                    continue
+
+                with span("ws_decode"):
+                    data = json.loads(message["text"])
 
                 message_type = data.get("type")
 
                 if message_type == "audio":
-                    await self._process_audio_message(websocket, data, session_id)
+                    await self._start_turn(
+                        websocket,
+                        session_id,
+                        self._process_audio_message(websocket, data, session_id),
+                    )
                 elif message_type == "text":
-                    await self._process_text_message(websocket, data, session_id)
+                    await self._start_turn(
+                        websocket,
+                        session_id,
+                        self._process_text_message(websocket, data, session_id),
+                    )
+                elif message_type == "audio_stream_start":
+                    # El candidato empezó a hablar: María deja de hablar
+                    await self._barge_in(websocket, session_id)
+                    await self._start_audio_stream(websocket, data, session_id)
+                elif message_type == "audio_frame":
+                    await self._push_audio_frame_message(websocket, data, session_id)
+                elif message_type == "audio_stream_end":
+                    self._end_audio_stream(websocket, session_id)
+                elif message_type == "interrupt":
+                    await self._barge_in(websocket, session_id)
 
         except Exception as e:
-            print(f"Error manejando mensaje: {e}")
-            await self.disconnect(session_id)
+            logger.error(f"Error manejando mensaje: {e}")
+            # Cierre normal (1000/1001): la entrevista terminó; otro código: corte de red
+            abrupt = isinstance(e, WebSocketDisconnect) and e.code not in (1000, 1001)
+            await self.disconnect(session_id, websocket, keep_conversation=abrupt)
 
     async def _process_audio_message(
         self, websocket: WebSocket, data: dict, session_id: str
     ):
         try:
-            # Procesar STT
-            audio_data = base64.b64decode(data["data"])
+            with span("base64_decode"):
+                audio_data = base64.b64decode(data["data"])
+        except Exception as e:
+            logger.error(f"Error procesando audio: {e}")
+            await self._send_text(
+                websocket,
+                json.dumps(
+                    {
+                        "type": "error",
+                        "data": f"Error procesando audio: {str(e)}",
+                        "timestamp": time.time(),
+                    }
+                ),
+            )
+            return
+
+        await self._process_audio(websocket, audio_data, session_id)
 
-            await websocket.send_text(
-                json.dumps({"type": "stt_start", "timestamp": time.time()})
+    async def _push_audio_frame_message(
+        self, websocket: WebSocket, data: dict, session_id: str
+    ):
+        # Un frame malformado se descarta sin cerrar la entrevista
+        try:
+            with span("base64_decode"):
+                pcm = base64.b64decode(data["data"])
+        except Exception as e:
+            logger.error(f"Error procesando frame de audio: {e}")
+            await self._send_text(
+                websocket,
+                json.dumps(
+                    {
+                        "type": "error",
+                        "data": f"Error procesando audio: {str(e)}",
+                        "timestamp": time.time(),
+                    }
+                ),
             )
+            return
+
+        await self._push_audio_stream(websocket, pcm, session_id)
 
-            print("Transcribiendo con whisper-large-v3-turbo...")
-            transcription = await self.stt_service.transcribe_audio(audio_data)
+    async def _process_audio(
+        self, websocket: WebSocket, audio_data: bytes, session_id: str
+    ):
+        try:
+            # Procesar STT
+            await self._send_text(
+                websocket, json.dumps({"type": "stt_start", "timestamp": time.time()})
+            )
+
+            logger.info("Transcribiendo con whisper-large-v3-turbo...")
+            try:
+                transcription = await self.stt_service.transcribe_audio(audio_data)
+            except AudioInvalidoError as e:
+                await self._send_text(
+                    websocket,
+                    json.dumps(
+                        {
+                            "type": "error",
+                            "data": f"Audio inválido: {e}",
+                            "timestamp": time.time(),
+                        }
+                    ),
+                )
+                return
 
             if transcription:
-                print(f"Tú: {transcription}")
+                logger.info(f"Tú: {transcription}")
 
-                await websocket.send_text(
+                await self._send_text(
+                    websocket,
                     json.dumps(
                         {
                             "type": "stt_result",
                             "data": transcription,
                             "timestamp": time.time(),
                         }
-                    )
+                    ),
                 )
 
                 # Procesar chat y TTS en paralelo
                 await self._process_chat_and_tts(websocket, transcription, session_id)
             else:
-                await websocket.send_text(
+                await self._send_text(
+                    websocket,
                     json.dumps(
                         {
                             "type": "error",
                             "data": "No se pudo transcribir el audio",
                             "timestamp": time.time(),
                         }
-                    )
+                    ),
                 )
 
         except Exception as e:
-            print(f"Error procesando audio: {e}")
-            await websocket.send_text(
+            logger.error(f"Error procesando audio: {e}")
+            await self._send_text(
+                websocket,
                 json.dumps(
                     {
                         "type": "error",
                         "data": f"Error procesando audio: {str(e)}",
                         "timestamp": time.time(),
                     }
-                )
+                ),
+            )
+
+    async def _start_audio_stream(
+        self, websocket: WebSocket, data: dict, session_id: str
+    ):
+        """Inicia una respuesta en streaming: PCM16 mono en bloques pequeños"""
+        encoding = data.get("encoding", "pcm16")
+        sample_rate = data.get("sample_rate", 16000)
+        try:
+            sample_rate = int(sample_rate)
+        except (TypeError, ValueError):
+            # Se informa con el mismo error que una frecuencia fuera de rango
+            sample_rate_valid = False
+        else:
+            sample_rate_valid = 8000 <= sample_rate <= 48000
+
+        if encoding not in SUPPORTED_ENCODINGS or not sample_rate_valid:
+            await self._send_text(
+                websocket,
+                json.dumps(
+                    {
+                        "type": "error",
+                        "data": f"Audio en streaming no soportado: {encoding} a {sample_rate} Hz",
+                        "timestamp": time.time(),
+                    }
+                ),
+            )
+            return
+
+        previous = self.audio_streams.pop(session_id, None)
+        if previous:
+            previous.cancel()
+
+        async def send_partial(index: int, text: str):
+            await self._send_text(
+                websocket,
+                json.dumps(
+                    {
+                        "type": "stt_partial",
+                        "index": index,
+                        "data": text,
+                        "timestamp": time.time(),
+                    }
+                ),
+            )
+
+        self.audio_streams[session_id] = AudioStream(
+            self.stt_service, sample_rate, on_partial=send_partial
+        )
+        self.session_options.setdefault(session_id, {})["auto_end"] = bool(
+            data.get("auto_end", True)
+        )
+
+        await self._send_text(
+            websocket, json.dumps({"type": "stt_start", "timestamp": time.time()})
+        )
+
+    async def _push_audio_stream(
+        self, websocket: WebSocket, pcm: bytes, session_id: str
+    ):
+        stream = self.audio_streams.get(session_id)
+        if stream is None:
+            return
+
+        stream.push(pcm)
+
+        # Fin de turno detectado por el VAD (silencio prolongado tras hablar)
+        if stream.end_of_turn and self.session_options.get(session_id, {}).get(
+            "auto_end"
+        ):
+            self._end_audio_stream(websocket, session_id)
+
+    def _end_audio_stream(self, websocket: WebSocket, session_id: str):
+        """Cierra la respuesta en streaming; los frames que lleguen después se ignoran"""
+        stream = self.audio_streams.pop(session_id, None)
+        if stream is not None:
+            self._spawn(
+                session_id,
+                self._finish_audio_stream(websocket, stream, session_id),
+                "turno",
+            )
+
+    async def _finish_audio_stream(
+        self, websocket: WebSocket, stream: AudioStream, session_id: str
+    ):
+        """Espera la transcripción completa y continúa con chat y TTS"""
+        transcription = await stream.finish()
+
+        if transcription:
+            logger.info(f"Tú: {transcription}")
+
+            await self._send_text(
+                websocket,
+                json.dumps(
+                    {
+                        "type": "stt_result",
+                        "data": transcription,
+                        "timestamp": time.time(),
+                    }
+                ),
+            )
+
+            await self._process_chat_and_tts(websocket, transcription, session_id)
+        else:
+            await self._send_text(
+                websocket,
+                json.dumps(
+                    {
+                        "type": "error",
+                        "data": "No se pudo transcribir el audio",
+                        "timestamp": time.time(),
+                    }
+                ),
             )
 
     async def _process_text_message(
@@ -153,21 +609,22 @@ class WebSocketHandler:
     ):
         try:
             text = data.get("data", "")
-            print(f"Tú: {text}")
+            logger.info(f"Tú: {text}")
 
             # Procesar chat y TTS
             await self._process_chat_and_tts(websocket, text, session_id)
 
         except Exception as e:
-            print(f"Error procesando texto: {e}")
-            await websocket.send_text(
+            logger.error(f"Error procesando texto: {e}")
+            await self._send_text(
+                websocket,
                 json.dumps(
                     {
                         "type": "error",
                         "data": f"Error procesando texto: {str(e)}",
                         "timestamp": time.time(),
                     }
-                )
+                ),
             )
 
     async def _process_chat_and_tts(
@@ -175,88 +632,285 @@ class WebSocketHandler:
     ):
         """Procesa chat y TTS, enviando respuestas inmediatamente cuando estén listas"""
 
+        if self.session_options.get(session_id, {}).get("stream"):
+            await self._process_chat_and_tts_streaming(
+                websocket, user_message, session_id
+            )
+            return
+
         # Iniciar procesamiento de chat
-        await websocket.send_text(
-            json.dumps({"type": "chat_start", "timestamp": time.time()})
+        await self._send_text(
+            websocket, json.dumps({"type": "chat_start", "timestamp": time.time()})
         )
 
-        print("Generando respuesta con gpt-4.1-mini...")
-        chat_response = await self.chat_service.get_response(user_message, session_id)
+        logger.info("Generando respuesta con gpt-4.1-mini...")
+        try:
+            chat_response = await self.chat_service.get_response(
+                user_message, session_id
+            )
+        except SesionExpiradaError:
+            await self._send_session_expired(websocket, session_id)
+            return
 
         if chat_response:
-            print(f"María: {chat_response}")
+            logger.info(f"María: {chat_response}")
 
             # Enviar respuesta de chat inmediatamente
-            await websocket.send_text(
+            await self._send_text(
+                websocket,
                 json.dumps(
                     {
                         "type": "chat_response",
                         "data": chat_response,
                         "timestamp": time.time(),
                     }
-                )
+                ),
             )
 
             # Procesar TTS en paralelo (no bloqueante)
-            asyncio.create_task(
-                self._process_and_send_tts(websocket, chat_response, session_id)
+            self._spawn(
+                session_id,
+                self._process_and_send_tts(websocket, chat_response, session_id),
+                "tts",
             )
         else:
-            await websocket.send_text(
+            await self._send_text(
+                websocket,
                 json.dumps(
                     {
                         "type": "error",
                         "data": "Error al generar respuesta",
                         "timestamp": time.time(),
                     }
-                )
+                ),
             )
 
-    async def _process_and_send_tts(
-        self, websocket: WebSocket, text: str, session_id: str
+    async def _process_chat_and_tts_streaming(
+        self, websocket: WebSocket, user_message: str, session_id: str
     ):
-        """Procesa TTS y envía el audio cuando esté listo"""
-        try:
-            await websocket.send_text(
-                json.dumps({"type": "tts_start", "timestamp": time.time()})
-            )
+        """Reenvía los tokens del chat y sintetiza cada oración apenas se completa"""
 
-            chunks = self.tts_service._split_text_into_chunks(text)
-            print(f"Generando audio ({len(chunks)} fragmentos paralelos)...")
+        await self._send_text(
+            websocket, json.dumps({"type": "chat_start", "timestamp": time.time()})
+        )
 
-            audio_data = await self.tts_service.generate_speech(text)
+        chunker = SentenceChunker(self.tts_service.min_words)
+        sentences: asyncio.Queue = asyncio.Queue()
 
-            if audio_data:
-                audio_base64 = base64.b64encode(audio_data).decode("utf-8")
+        async def completed_sentences() -> AsyncIterator[str]:
+            while True:
+                sentence = await sentences.get()
+                if sentence is None:
+                    return
+                yield sentence
+
+        tts_task = self._spawn(
+            session_id,
+            self._process_and_send_tts(websocket, completed_sentences(), session_id),
+            "tts",
+        )
+        parts = []
 
-                await websocket.send_text(
+        try:
+            logger.info("Generando respuesta con gpt-4.1-mini (streaming)...")
+            async for delta in self.chat_service.stream_response(
+                user_message, session_id
+            ):
+                parts.append(delta)
+                await self._send_text(
+                    websocket,
                     json.dumps(
-                        {
-                            "type": "tts_result",
-                            "data": audio_base64,
-                            "timestamp": time.time(),
-                        }
-                    )
+                        {"type": "chat_delta", "data": delta, "timestamp": time.time()}
+                    ),
                 )
+                for sentence in chunker.feed(delta):
+                    sentences.put_nowait(sentence)
+
+            for sentence in chunker.flush():
+                sentences.put_nowait(sentence)
+        except SesionExpiradaError:
+            if tts_task:
+                tts_task.cancel()
+            await self._send_session_expired(websocket, session_id)
+            return
+        finally:
+            sentences.put_nowait(None)
+
+        chat_response = "".join(parts)
+        if chat_response:
+            logger.info(f"María: {chat_response}")
+
+            # Respuesta completa para la transcripción del cliente
+            await self._send_text(
+                websocket,
+                json.dumps(
+                    {
+                        "type": "chat_response",
+                        "data": chat_response,
+                        "timestamp": time.time(),
+                    }
+                ),
+            )
+        else:
+            if tts_task:
+                tts_task.cancel()
+            await self._send_text(
+                websocket,
+                json.dumps(
+                    {
+                        "type": "error",
+                        "data": "Error al generar respuesta",
+                        "timestamp": time.time(),
+                    }
+                ),
+            )
+
+    async def _send_session_expired(self, websocket: WebSocket, session_id: str):
+        """La conversación ya no está en el almacén: el cliente debe empezar otra"""
+        logger.warning(f"Sesión expirada durante la entrevista: {session_id}")
+        await self._send_text(
+            websocket,
+            json.dumps(
+                {
+                    "type": "error",
+                    "code": "session_expired",
+                    "data": "La sesión expiró; conéctate de nuevo para otra entrevista",
+                    "timestamp": time.time(),
+                }
+            ),
+        )
+
+    async def _process_and_send_tts(
+        self,
+        websocket: WebSocket,
+        text: Union[str, AsyncIterable[str]],
+        session_id: str,
+    ):
+        """Procesa TTS y envía el audio cuando esté listo"""
+        try:
+            await self._send_text(
+                websocket, json.dumps({"type": "tts_start", "timestamp": time.time()})
+            )
+
+            if self.session_options.get(session_id, {}).get("progressive_tts"):
+                sent = await self._send_tts_progressive(websocket, text, session_id)
             else:
-                await websocket.send_text(
+                sent = await self._send_tts_complete(websocket, text, session_id)
+
+            if not sent:
+                await self._send_text(
+                    websocket,
                     json.dumps(
                         {
                             "type": "error",
                             "data": "Error al generar audio",
                             "timestamp": time.time(),
                         }
-                    )
+                    ),
                 )
 
         except Exception as e:
-            print(f"Error en TTS: {e}")
-            await websocket.send_text(
+            logger.error(f"Error en TTS: {e}")
+            await self._send_text(
+                websocket,
                 json.dumps(
                     {
                         "type": "error",
                         "data": f"Error al generar audio: {str(e)}",
                         "timestamp": time.time(),
                     }
-                )
+                ),
             )
+
+    async def _send_tts_complete(
+        self,
+        websocket: WebSocket,
+        text: Union[str, AsyncIterable[str]],
+        session_id: str,
+    ) -> bool:
+        """Protocolo clásico: un único tts_result con todo el audio combinado"""
+        if isinstance(text, str):
+            chunks = self.tts_service._split_text_into_chunks(text)
+            logger.info(f"Generando audio ({len(chunks)} fragmentos paralelos)...")
+
+        audio_format = self.session_formats.get(session_id, DEFAULT_AUDIO_FORMAT)
+        audio_chunks = [
+            chunk
+            async for chunk in self.tts_service.stream_speech(
+                text, session_id, self.session_profiles.get(session_id), audio_format
+            )
+        ]
+        if not audio_chunks:
+            return False
+
+        binary = self.session_options.get(session_id, {}).get("binary")
+        with span("audio_assembly"):
+            audio_data = self.tts_service._combine_audio_chunks(
+                audio_chunks, audio_format
+            )
+
+        if binary:
+            with span("frame_encode"):
+                frame = protocol.encode_frame(protocol.FRAME_TTS_RESULT, 0, audio_data)
+            await self._send_bytes(websocket, frame)
+            return True
+
+        with span("base64_encode"):
+            audio_base64 = base64.b64encode(audio_data).decode("utf-8")
+
+        await self._send_text(
+            websocket,
+            json.dumps(
+                {
+                    "type": "tts_result",
+                    "data": audio_base64,
+                    "timestamp": time.time(),
+                }
+            ),
+        )
+        return True
+
+    async def _send_tts_progressive(
+        self,
+        websocket: WebSocket,
+        text: Union[str, AsyncIterable[str]],
+        session_id: str,
+    ) -> bool:
+        """Envía cada fragmento como tts_chunk numerado apenas está listo, y cierra con tts_end"""
+        binary = self.session_options.get(session_id, {}).get("binary")
+        index = 0
+        async for audio_data in self.tts_service.stream_speech(
+            text,
+            session_id,
+            self.session_profiles.get(session_id),
+            self.session_formats.get(session_id, DEFAULT_AUDIO_FORMAT),
+        ):
+            if binary:
+                with span("frame_encode"):
+                    frame = protocol.encode_frame(
+                        protocol.FRAME_TTS_CHUNK, index, audio_data
+                    )
+                await self._send_bytes(websocket, frame)
+                index += 1
+                continue
+
+            with span("base64_encode"):
+                audio_base64 = base64.b64encode(audio_data).decode("utf-8")
+            await self._send_text(
+                websocket,
+                json.dumps(
+                    {
+                        "type": "tts_chunk",
+                        "index": index,
+                        "data": audio_base64,
+                        "timestamp": time.time(),
+                    }
+                ),
+            )
+            index += 1
+
+        await self._send_text(
+            websocket,
+            json.dumps({"type": "tts_end", "chunks": index, "timestamp": time.time()}),
+        )
+        return index > 0
@@ -0,0 +1,49 @@
+from typing import Tuple
+import struct
+
+# Sub-protocolo binario de /ws: una cabecera fija de 8 bytes seguida del audio crudo.
+# Los mensajes de control (chat, estados, errores) siguen viajando como JSON en
+# frames de texto; solo el audio usa frames binarios.
+#
+#   0      2         3      4            8
+#   | "EV" | versión | tipo | secuencia  | audio...
+#
+# La secuencia es el índice del fragmento en tts_chunk y 0 en el resto.
+
+SUBPROTOCOL = "entre-vistas.bin.v1"
+MAGIC = b"EV"
+VERSION = 1
+HEADER = struct.Struct("!2sBBI")
+
+# Cliente -> servidor
+FRAME_AUDIO_UPLOAD = 0x01  # respuesta grabada completa (equivale a {"type": "audio"})
+FRAME_AUDIO_STREAM = (
+    0x02  # bloque PCM16 del micrófono en streaming (equivale a audio_frame)
+)
+
+# Servidor -> cliente
+FRAME_TTS_CHUNK = 0x10  # fragmento de audio progresivo (equivale a tts_chunk)
+FRAME_TTS_RESULT = 0x11  # audio completo (equivale a tts_result)
+
+
+class FrameError(ValueError):
+    """Frame binario con cabecera inválida"""
+
+
+def encode_frame(kind: int, sequence: int, payload: bytes) -> bytes:
+    """Arma un frame binario (una única copia del audio)"""
+    return HEADER.pack(MAGIC, VERSION, kind, sequence) + payload
+
+
+def decode_frame(data: bytes) -> Tuple[int, int, bytes]:
+    """Valida la cabecera y devuelve (tipo, secuencia, audio)"""
+    if len(data) < HEADER.size:
+        raise FrameError("Frame binario demasiado corto")
+
+    magic, version, kind, sequence = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise FrameError("Frame binario sin cabecera de Entre-Vistas")
+    if version != VERSION:
+        raise FrameError(f"Versión de protocolo binario no soportada: {version}")
+
+    return kind, sequence, data[HEADER.size :]
@@ -0,0 +1,63 @@
+from typing import Coroutine, Dict, Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SessionSupervisor:
+    """Dueño de todas las tareas en curso de una sesión (STT, chat y TTS).
+
+    Ninguna tarea de la sesión se lanza con un asyncio.create_task suelto:
+    así una nueva intervención del candidato (barge-in) puede cancelar la
+    generación que quedó obsoleta, y al desconectarse no queda trabajo
+    huérfano consumiendo cupo del proveedor ni escribiendo en un socket cerrado.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self._tasks: Dict[asyncio.Task, str] = {}
+        self._closed = False
+
+    @property
+    def active(self) -> int:
+        return len(self._tasks)
+
+    def spawn(self, coro: Coroutine, name: str) -> Optional[asyncio.Task]:
+        """Lanza una tarea supervisada; si la sesión ya cerró, descarta la corrutina"""
+        if self._closed:
+            coro.close()
+            return None
+
+        task = asyncio.create_task(coro, name=f"{self.session_id}:{name}")
+        self._tasks[task] = name
+        task.add_done_callback(self._on_done)
+        return task
+
+    def cancel_all(self) -> int:
+        """Cancela todo lo que esté en curso; devuelve cuántas tareas se cancelaron"""
+        current = asyncio.current_task()
+        cancelled = 0
+        for task in list(self._tasks):
+            # Una tarea supervisada puede iniciar un barge-in: no cancelarse a sí misma
+            if task is current or task.done():
+                continue
+            task.cancel()
+            cancelled += 1
+        return cancelled
+
+    async def close(self):
+        """Cancela todo, espera a que termine y no acepta más tareas"""
+        self._closed = True
+        self.cancel_all()
+        pending = [task for task in self._tasks if task is not asyncio.current_task()]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def _on_done(self, task: asyncio.Task):
+        name = self._tasks.pop(task, "tarea")
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            logger.error(f"[SUPERVISOR] {self.session_id}: {name} falló: {error}")